@@ -3,9 +3,18 @@
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 from alembic import context
 from app.core.config import settings
 from app.models.models import Base
+import app.models.jobs  # noqa: F401  (enregistre la table jobs dans les métadonnées)
+import app.models.indexes  # noqa: F401  (index pg_trgm sur applications)
+import app.models.user_stats  # noqa: F401  (compteurs des tableaux de bord)
+import app.models.application_insights  # noqa: F401  (métriques précalculées des candidatures)
+import app.models.revoked_tokens  # noqa: F401  (tokens révoqués à la déconnexion)
+import app.models.oauth_states  # noqa: F401  (states OAuth Gmail en attente)
+import app.models.user_gmail  # noqa: F401  (échecs de rafraîchissement des tokens Gmail)
+import app.models.email_bodies  # noqa: F401  (corps d'emails compressés)
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -69,6 +78,10 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # Extensions requises par les index déclarés dans les modèles
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.commit()
+
         context.configure(
             connection=connection, target_metadata=target_metadata
         )
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import applications, emails, ingestion, nlp, companies, job_offers, application_events, emails_ingestion, intelligent_tracker, auth, oauth
+from app.api.v1.endpoints import applications, emails, ingestion, nlp, companies, job_offers, application_events, emails_ingestion, intelligent_tracker, auth, oauth, jobs
 
 api_router = APIRouter()
 
@@ -14,3 +14,4 @@ api_router.include_router(application_events.router, prefix="/application-events
 api_router.include_router(ingestion.router, prefix="/ingestion", tags=["ingestion"])
 api_router.include_router(nlp.router, prefix="/nlp", tags=["nlp"])
 api_router.include_router(intelligent_tracker.router, prefix="/intelligent-tracker", tags=["intelligent-tracker"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
@@ -3,8 +3,6 @@ API endpoints for application events management
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.core.database import get_db
 from app.models.models import User
 from app.models.schemas import PaginatedResponse
 from app.api.v1.endpoints.auth import get_current_user
@@ -16,8 +14,7 @@ async def get_application_events(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     application_id: Optional[str] = Query(None),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """
     Récupérer la liste des événements de candidature avec pagination pour l'utilisateur connecté
@@ -37,8 +34,7 @@ async def get_application_events(
 @router.get("/{event_id}")
 async def get_application_event(
     event_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """
     Récupérer un événement de candidature par ID pour l'utilisateur connecté
@@ -47,8 +43,7 @@ async def get_application_event(
 
 @router.post("/")
 async def create_application_event(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """
     Créer un nouvel événement de candidature pour l'utilisateur connecté
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 from app.core.database import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
 from app.models.schemas import (
     Application, ApplicationCreate, ApplicationUpdate,
     ApplicationWithEvents, ApplicationFull
@@ -16,17 +17,26 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Application])
 def get_applications(
+    response: Response,
     skip: int = Query(0, ge=0, description="Nombre d'éléments à ignorer"),
     limit: int = Query(50, ge=1, le=100, description="Nombre d'éléments à retourner"),
     status: Optional[str] = Query(None, description="Filtrer par statut"),
     company: Optional[str] = Query(None, description="Filtrer par entreprise"),
     q: Optional[str] = Query(None, description="Recherche textuelle"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor), remplace skip"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Récupérer la liste des candidatures avec filtres optionnels pour l'utilisateur connecté
+    
+    Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor (absent sur la dernière page).
     """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         application_service = ApplicationService(db)
         applications = application_service.get_applications(
@@ -35,8 +45,12 @@ def get_applications(
             limit=limit, 
             status=status, 
             company=company, 
-            search_query=q
+            search_text=q,
+            after=after
         )
+        cursor_value = next_cursor(applications, limit, "updated_at")
+        if cursor_value:
+            response.headers[NEXT_CURSOR_HEADER] = cursor_value
         return applications
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -58,6 +72,24 @@ def create_application(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/search", response_model=List[Application])
+def search_applications(
+    q: str = Query(..., min_length=1, description="Recherche plein texte (syntaxe web : \"expression exacte\", -exclu, or)"),
+    limit: int = Query(20, ge=1, le=100, description="Nombre d'éléments à retourner"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Rechercher dans les candidatures de l'utilisateur connecté, par pertinence décroissante
+    """
+    try:
+        application_service = ApplicationService(db)
+        results = application_service.search_applications(current_user.id, q, limit=limit)
+        return [application for application, _rank in results]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{application_id}", response_model=ApplicationFull)
 def get_application(
     application_id: UUID,
@@ -154,7 +186,7 @@ def get_applications_summary(
     """
     try:
         application_service = ApplicationService(db)
-        return application_service.get_applications_summary()
+        return application_service.get_applications_summary(current_user.id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,17 +1,43 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.rate_limit import SlidingWindowRateLimiter, resolve_client_ip
 from app.models.schemas import UserCreate, UserRead, UserLogin
 from app.services.auth_service import (
     create_user, authenticate_user, create_access_token, 
-    verify_token, get_user_by_email
+    verify_token, get_user_by_email, get_user_for_token, revoke_token
 )
+from app.services.password_hashing import PasswordHashingBusy
+from app.services.token_cache import token_user_cache
 
 router = APIRouter()
 security = HTTPBearer()
 
+# Échecs de connexion par (adresse IP, email) : les connexions réussies ne comptent
+# pas, et un client ne peut pas bloquer les autres utilisateurs de la même adresse
+login_rate_limiter = SlidingWindowRateLimiter(
+    max_attempts=settings.LOGIN_RATE_LIMIT_ATTEMPTS,
+    window_seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+)
+# Échecs par adresse IP, tous emails confondus (limite plus large) : bloque
+# l'essai d'un mot de passe courant sur de nombreux comptes depuis une adresse
+login_ip_rate_limiter = SlidingWindowRateLimiter(
+    max_attempts=settings.LOGIN_RATE_LIMIT_IP_ATTEMPTS,
+    window_seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+)
+
+
+def _hashing_busy_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Service d'authentification surchargé, veuillez réessayer",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=UserRead, status_code=201)
 def register(user: UserCreate, db: Session = Depends(get_db)):
     """Inscription d'un nouvel utilisateur"""
@@ -24,19 +50,49 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Créer l'utilisateur
-    return create_user(db=db, user=user)
+    try:
+        return create_user(db=db, user=user)
+    except PasswordHashingBusy:
+        raise _hashing_busy_error()
 
 @router.post("/login")
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+def login(user_credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
     """Connexion d'un utilisateur"""
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    client_ip = resolve_client_ip(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for"),
+        request.headers.get("x-real-ip"),
+        settings.TRUSTED_PROXIES
+    )
+    throttle_key = (client_ip, user_credentials.email.lower())
+    retry_after = max(
+        login_rate_limiter.retry_after(throttle_key),
+        login_ip_rate_limiter.retry_after(client_ip)
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop de tentatives de connexion, veuillez réessayer plus tard",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+    
+    try:
+        user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    except PasswordHashingBusy:
+        raise _hashing_busy_error()
     if not user:
+        login_rate_limiter.record(throttle_key)
+        login_ip_rate_limiter.record(client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou mot de passe incorrect",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Seul le compteur de cet email est remis à zéro : une connexion réussie à
+    # son propre compte n'efface pas les échecs de l'adresse sur les autres
+    login_rate_limiter.reset(throttle_key)
+    
     access_token_expires = timedelta(hours=24)
     access_token = create_access_token(
         data={"sub": user.email, "user_id": str(user.id)}, 
@@ -56,32 +112,46 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Récupérer l'utilisateur actuel à partir du token JWT"""
     token = credentials.credentials
+    
+    # Token déjà vérifié récemment : ni décodage ni requête
+    snapshot = token_user_cache.get(token)
+    if snapshot is not None:
+        return token_user_cache.attach(db, snapshot)
+    
     payload = verify_token(token)
     
-    if payload is None:
+    if payload is None or (payload.get("user_id") is None and payload.get("sub") is None):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token invalide",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    email: str = payload.get("sub")
-    if email is None:
+    user = get_user_for_token(db, payload)
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide",
+            detail="Utilisateur non trouvé",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = get_user_by_email(db, email=email)
-    if user is None:
+    token_user_cache.put(token, user, token_expires_at=payload.get("exp"))
+    return user
+
+@router.post("/logout", status_code=204)
+def logout(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    """Déconnexion : le token courant est révoqué jusqu'à son expiration"""
+    token = credentials.credentials
+    payload = verify_token(token)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Utilisateur non trouvé",
+            detail="Token invalide",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
+    revoke_token(db, payload)
+    token_user_cache.invalidate_token(token)
 
 @router.get("/me", response_model=UserRead)
 def read_users_me(current_user = Depends(get_current_user)):
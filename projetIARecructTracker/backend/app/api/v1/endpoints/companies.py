@@ -3,8 +3,6 @@ API endpoints for companies management
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.core.database import get_db
 from app.models.models import User
 from app.models.schemas import PaginatedResponse
 from app.api.v1.endpoints.auth import get_current_user
@@ -16,8 +14,7 @@ async def get_companies(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     search: Optional[str] = Query(None),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """
     Récupérer la liste des entreprises avec pagination pour l'utilisateur connecté
@@ -35,14 +32,14 @@ async def get_companies(
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
 @router.get("/{company_id}")
-async def get_company(company_id: str, db: Session = Depends(get_db)):
+async def get_company(company_id: str):
     """
     Récupérer une entreprise par ID
     """
     raise HTTPException(status_code=404, detail="Entreprise non trouvée")
 
 @router.post("/")
-async def create_company(db: Session = Depends(get_db)):
+async def create_company():
     """
     Créer une nouvelle entreprise
     """
@@ -1,34 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 from app.core.database import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
 from app.models.schemas import Email, EmailCreate
 from app.models.models import User
 from app.services.email_service import EmailService
+from app.services.email_import_service import EmailImportService
+from app.services.job_queue import JobQueue
 from app.api.v1.endpoints.auth import get_current_user
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Email])
 def get_emails(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     unlinked: bool = Query(False, description="Afficher uniquement les emails non liés"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor), remplace skip"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Récupérer la liste des emails de l'utilisateur connecté
+    
+    Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor (absent sur la dernière page).
     """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         email_service = EmailService(db)
-        return email_service.get_emails(
+        emails = email_service.get_emails(
             user_id=current_user.id,
             skip=skip, 
             limit=limit, 
-            unlinked_only=unlinked
+            unlinked_only=unlinked,
+            after=after
         )
+        cursor_value = next_cursor(emails, limit, "created_at")
+        if cursor_value:
+            response.headers[NEXT_CURSOR_HEADER] = cursor_value
+        return emails
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -41,10 +58,18 @@ def import_emails(
 ):
     """
     Importer des emails depuis des fichiers .eml ou .mbox pour l'utilisateur connecté
+    
+    Les fichiers sont parsés en streaming et insérés par paquets ; l'analyse NLP
+    des emails importés est planifiée dans la file de jobs (workers).
     """
     try:
-        email_service = EmailService(db)
-        results = email_service.import_email_files(files, current_user.id)
+        import_service = EmailImportService(db)
+        job_queue = JobQueue(db)
+        results = import_service.import_files(
+            files,
+            user_id=current_user.id,
+            on_batch_inserted=lambda email_ids: job_queue.enqueue_email_analysis(email_ids, user_id=current_user.id)
+        )
         return {"message": f"Import réussi", "results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -72,6 +97,24 @@ def link_email_to_application(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/search", response_model=List[Email])
+def search_emails(
+    q: str = Query(..., min_length=1, description="Recherche plein texte (syntaxe web : \"expression exacte\", -exclu, or)"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Rechercher dans les emails de l'utilisateur connecté, par pertinence décroissante
+    """
+    try:
+        email_service = EmailService(db)
+        results = email_service.search_emails(current_user.id, q, limit=limit)
+        return [email for email, _rank in results]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{email_id}", response_model=Email)
 def get_email(
     email_id: UUID,
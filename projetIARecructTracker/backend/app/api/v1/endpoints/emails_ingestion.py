@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Dict, Any
 from pydantic import BaseModel
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
+from app.api.v1.endpoints.auth import get_current_user
+from app.models.models import Email, User
 from app.services.email_ingestion import EmailIngestionService
 from app.services.email_to_application_service import EmailToApplicationService
-from app.nlp.nlp_orchestrator import NLPOrchestrator
+from app.models.jobs import JobType
+from app.services.job_queue import JobQueue
 from loguru import logger
 
 router = APIRouter()
@@ -16,70 +21,43 @@ class EmailIngestionRequest(BaseModel):
     create_applications: bool = True
 
 @router.post("/ingest")
-async def ingest_emails(
+def ingest_emails(
     request: EmailIngestionRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
-    Ingérer les emails depuis la boîte mail de l'utilisateur
+    Planifier l'ingestion des emails depuis la boîte mail de l'utilisateur
+
+    L'ingestion et l'analyse NLP sont exécutées par les workers ;
+    l'avancement est consultable via GET /jobs/{job_id}.
     """
     try:
-        # Service d'ingestion
-        ingestion_service = EmailIngestionService(db)
-        
-        # Ingérer les emails
-        result = ingestion_service.ingest_emails(days_back=request.days_back)
-        
-        # Si des emails ont été ingérés et que l'analyse est demandée
-        if result["emails_saved"] > 0 and request.analyze_after_ingestion:
-            logger.info("Starting NLP analysis of newly ingested emails")
-            
-            # Analyser les nouveaux emails
-            orchestrator = NLPOrchestrator(db)
-            
-            # Récupérer les emails non classifiés
-            from app.models.models import Email
-            unclassified_emails = db.query(Email).filter(
-                Email.classification.is_(None)
-            ).all()
-            
-            processed_count = 0
-            errors = []
-            
-            for email in unclassified_emails:
-                try:
-                    await orchestrator.process_email_complete(email)
-                    processed_count += 1
-                except Exception as e:
-                    errors.append(f"Email {email.id}: {str(e)}")
-            
-            result["analysis"] = {
-                "processed_count": processed_count,
-                "errors": errors
-            }
-            
-            logger.info(f"Analyzed {processed_count} emails")
-            
-            # Créer des candidatures à partir des emails classifiés si demandé
-            if request.create_applications:
-                logger.info("Starting automatic application creation from classified emails")
-                
-                app_service = EmailToApplicationService(db)
-                app_results = app_service.process_classified_emails()
-                
-                result["applications"] = app_results
-                logger.info(f"Created {app_results['created_applications']} applications, linked {app_results['linked_applications']} emails")
-        
-        return result
+        job = JobQueue(db).enqueue(
+            JobType.IMAP_INGESTION,
+            payload={
+                "days_back": request.days_back,
+                "analyze_after_ingestion": request.analyze_after_ingestion,
+                "create_applications": request.create_applications
+            },
+            user_id=current_user.id
+        )
+
+        return {
+            "success": True,
+            "message": "Email ingestion scheduled",
+            "job_id": str(job.id),
+            "status": job.status
+        }
         
     except Exception as e:
         logger.error(f"Email ingestion failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/test-connection")
-async def test_email_connection(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def test_email_connection(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
-    Tester la connexion IMAP
+    Tester la connexion IMAP (bloquant : exécuté dans le pool de threads)
     """
     try:
         ingestion_service = EmailIngestionService(db)
@@ -110,9 +88,10 @@ async def test_email_connection(db: Session = Depends(get_db)) -> Dict[str, Any]
         }
 
 @router.post("/process-to-applications")
-async def process_emails_to_applications(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def process_emails_to_applications(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
     Traiter les emails classifiés pour créer automatiquement des candidatures
+    (traitement synchrone : exécuté dans le pool de threads)
     """
     try:
         app_service = EmailToApplicationService(db)
@@ -129,13 +108,14 @@ async def process_emails_to_applications(db: Session = Depends(get_db)) -> Dict[
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/unprocessed-count")
-async def get_unprocessed_emails_count(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def get_unprocessed_emails_count(db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
     """
     Obtenir le nombre d'emails classifiés qui n'ont pas encore de candidature associée
     """
     try:
-        app_service = EmailToApplicationService(db)
-        count = app_service.get_unprocessed_emails_count()
+        count = await db.scalar(
+            select(func.count(Email.id)).where(*EmailToApplicationService.unprocessed_emails_criteria())
+        )
         
         return {
             "unprocessed_count": count
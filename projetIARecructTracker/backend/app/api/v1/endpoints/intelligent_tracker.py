@@ -1,11 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 from datetime import datetime
+from uuid import UUID
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.models import User
 from app.services.intelligent_application_tracker import IntelligentApplicationTracker
+from app.services.application_insights_service import ApplicationInsightsService
+from app.services.application_export_service import ApplicationExportService, EXPORT_COLUMNS
+from app.services.spreadsheet_writer import CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, iter_csv, iter_xlsx
 from app.api.v1.endpoints.auth import get_current_user
+from app.core.scheduler import (
+    SchedulerUnavailable, schedule_user_auto_processing, unschedule_user_auto_processing, get_user_auto_processing_next_run
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -78,18 +87,26 @@ def get_processing_summary(
 @router.post("/auto-process", response_model=Dict[str, Any])
 def enable_auto_processing(
     enabled: bool = Query(True, description="Activer/désactiver le traitement automatique"),
-    interval_minutes: int = Query(15, description="Intervalle en minutes pour le traitement automatique"),
-    db: Session = Depends(get_db)
+    interval_minutes: Optional[int] = Query(
+        None, ge=1,
+        description="Intervalle en minutes pour le traitement automatique (INGESTION_INTERVAL_MINUTES par défaut)"
+    ),
+    current_user: User = Depends(get_current_user)
 ):
     """
     Active ou désactive le traitement automatique des emails.
     
-    Quand activé, le système analysera automatiquement les nouveaux emails
-    et mettra à jour les candidatures selon l'intervalle spécifié.
+    Quand activé, le système synchronise périodiquement les nouveaux emails de
+    l'utilisateur (Gmail / IMAP), les analyse et met à jour les candidatures
+    selon l'intervalle spécifié. La planification est conservée entre les redémarrages.
     """
+    interval_minutes = interval_minutes or settings.INGESTION_INTERVAL_MINUTES
     try:
-        # Pour l'instant, nous retournons juste la configuration
-        # Dans une implémentation complète, on utiliserait Celery ou un scheduler
+        if enabled:
+            next_run = schedule_user_auto_processing(current_user.id, interval_minutes)
+        else:
+            unschedule_user_auto_processing(current_user.id)
+            next_run = None
         
         return {
             "success": True,
@@ -97,10 +114,12 @@ def enable_auto_processing(
             "config": {
                 "enabled": enabled,
                 "interval_minutes": interval_minutes,
-                "next_run": "Non implémenté dans cette version"
+                "next_run": next_run.isoformat() if next_run else None
             }
         }
         
+    except SchedulerUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Erreur lors de la configuration automatique: {str(e)}")
         raise HTTPException(
@@ -109,6 +128,20 @@ def enable_auto_processing(
         )
 
 
+@router.get("/auto-process", response_model=Dict[str, Any])
+def get_auto_processing_status(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Indique si le traitement automatique est actif pour l'utilisateur connecté.
+    """
+    next_run = get_user_auto_processing_next_run(current_user.id)
+    return {
+        "enabled": next_run is not None,
+        "next_run": next_run.isoformat() if next_run else None
+    }
+
+
 @router.get("/application-insights/{application_id}", response_model=Dict[str, Any])
 def get_application_insights(
     application_id: str,
@@ -124,83 +157,20 @@ def get_application_insights(
     - Recommandations d'actions
     """
     try:
-        from app.models.models import Application, Email
+        from app.models.models import Application
         
         # Récupérer la candidature
         application = db.query(Application).filter(Application.id == application_id).first()
         if not application:
             raise HTTPException(status_code=404, detail="Candidature non trouvée")
         
-        # Récupérer les emails liés
-        linked_emails = db.query(Email).filter(Email.application_id == application_id).all()
-        
-        # Analyser la progression
-        email_timeline = []
-        for email in sorted(linked_emails, key=lambda x: x.received_date):
-            email_timeline.append({
-                "date": email.received_date.isoformat(),
-                "subject": email.subject,
-                "sender": email.sender,
-                "classification": email.classification,
-                "snippet": email.snippet[:100] if email.snippet else None
-            })
-        
-        # Calculer des métriques
-        response_times = []
-        if len(linked_emails) > 1:
-            for i in range(1, len(linked_emails)):
-                prev_date = linked_emails[i-1].received_date
-                curr_date = linked_emails[i].received_date
-                diff = (curr_date - prev_date).days
-                response_times.append(diff)
-        
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-        
-        # Générer des recommandations
-        recommendations = []
-        
-        # Si pas de réponse depuis longtemps
-        if linked_emails:
-            last_email_date = max(email.received_date for email in linked_emails)
-            days_since_last = (datetime.utcnow() - last_email_date).days
-            
-            if days_since_last > 7 and application.status not in ['REJECTED', 'ACCEPTED']:
-                recommendations.append({
-                    "type": "follow_up",
-                    "message": f"Aucune nouvelle depuis {days_since_last} jours. Considérer un suivi.",
-                    "priority": "medium"
-                })
-        
-        # Si entretien programmé mais pas de date
-        if application.status == 'INTERVIEW' and not application.interview_date:
-            recommendations.append({
-                "type": "missing_date",
-                "message": "Statut entretien détecté mais aucune date programmée.",
-                "priority": "high"
-            })
-        
         return {
             "success": True,
-            "data": {
-                "application": {
-                    "id": application.id,
-                    "job_title": application.job_title,
-                    "company_name": application.company_name,
-                    "status": application.status,
-                    "created_date": application.created_at.isoformat(),
-                    "last_update": application.updated_at.isoformat()
-                },
-                "email_count": len(linked_emails),
-                "email_timeline": email_timeline,
-                "metrics": {
-                    "average_response_time_days": round(avg_response_time, 1),
-                    "total_interactions": len(linked_emails),
-                    "days_since_last_contact": days_since_last if linked_emails else None
-                },
-                "recommendations": recommendations
-            }
+            "data": ApplicationInsightsService(db).get_insights(application)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des insights: {str(e)}")
         raise HTTPException(
@@ -213,6 +183,8 @@ def get_application_insights(
 def simulate_excel_import(
     company_filter: Optional[str] = Query(None, description="Filtrer par entreprise"),
     status_filter: Optional[str] = Query(None, description="Filtrer par statut"),
+    cursor: Optional[UUID] = Query(None, description="Curseur de la page suivante (next_cursor de la page précédente)"),
+    limit: int = Query(1000, ge=1, le=5000, description="Nombre de candidatures par page"),
     db: Session = Depends(get_db)
 ):
     """
@@ -220,64 +192,23 @@ def simulate_excel_import(
     
     Retourne les données dans un format qui pourrait être exporté vers Excel,
     avec toutes les informations extraites automatiquement des emails.
+    Les candidatures sont paginées : passer `next_cursor` en `cursor` pour la page suivante.
     """
     try:
-        from app.models.models import Application, Email
-        
-        # Construire la requête avec filtres
-        query = db.query(Application)
-        
-        if company_filter:
-            query = query.filter(Application.company_name.ilike(f"%{company_filter}%"))
-        
-        if status_filter:
-            query = query.filter(Application.status == status_filter)
-        
-        applications = query.all()
-        
-        # Construire les données style Excel
-        excel_data = []
-        
-        for app in applications:
-            # Récupérer les emails liés
-            emails = db.query(Email).filter(Email.application_id == app.id).all()
-            
-            # Calculer des métriques
-            email_count = len(emails)
-            last_interaction = max(email.received_date for email in emails) if emails else app.created_at
-            
-            # Extraire le dernier statut détecté
-            latest_status_email = None
-            if emails:
-                latest_status_email = max(emails, key=lambda x: x.received_date)
-            
-            excel_row = {
-                "ID": app.id,
-                "Entreprise": app.company_name,
-                "Poste": app.job_title,
-                "Statut": app.status,
-                "Date candidature": app.created_at.strftime("%d/%m/%Y"),
-                "Dernière interaction": last_interaction.strftime("%d/%m/%Y"),
-                "Nombre d'emails": email_count,
-                "Contact": app.contact_person or "Non renseigné",
-                "Localisation": app.location or "Non renseignée",
-                "Source": app.source,
-                "Urgence": getattr(app, 'urgency_level', 'NORMAL'),
-                "Date entretien": app.interview_date.strftime("%d/%m/%Y") if app.interview_date else None,
-                "Dernière classification": latest_status_email.classification if latest_status_email else None,
-                "Dernier expéditeur": latest_status_email.sender if latest_status_email else None,
-                "Notes automatiques": app.notes[:100] + "..." if app.notes and len(app.notes) > 100 else app.notes,
-                "Création automatique": "Oui" if app.source and "Détecté automatiquement" in app.source else "Non"
-            }
-            
-            excel_data.append(excel_row)
+        excel_data, next_cursor = ApplicationExportService(db).get_page(
+            company_filter=company_filter,
+            status_filter=status_filter,
+            after_id=cursor,
+            limit=limit
+        )
         
         return {
             "success": True,
             "data": {
                 "total_records": len(excel_data),
                 "records": excel_data,
-                "columns": list(excel_data[0].keys()) if excel_data else [],
+                "columns": EXPORT_COLUMNS if excel_data else [],
+                "next_cursor": str(next_cursor) if next_cursor else None,
                 "export_date": datetime.utcnow().isoformat(),
                 "filters_applied": {
                     "company": company_filter,
@@ -292,3 +223,37 @@ def simulate_excel_import(
             status_code=500,
             detail=f"Erreur lors de la simulation d'export: {str(e)}"
         )
+
+
+@router.get("/export")
+def export_applications(
+    export_format: str = Query("xlsx", alias="format", pattern="^(xlsx|csv)$", description="Format du fichier (xlsx ou csv)"),
+    company_filter: Optional[str] = Query(None, description="Filtrer par entreprise"),
+    status_filter: Optional[str] = Query(None, description="Filtrer par statut"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exporte les candidatures de l'utilisateur connecté en fichier XLSX ou CSV.
+    
+    Même contenu que /simulate-excel-import, mais envoyé en flux ligne par ligne :
+    la mémoire utilisée est constante et le téléchargement commence immédiatement,
+    quel que soit le nombre de candidatures.
+    """
+    rows = ApplicationExportService.stream_rows(
+        company_filter=company_filter,
+        status_filter=status_filter,
+        user_id=current_user.id
+    )
+    filename = f"candidatures_{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+    
+    if export_format == "csv":
+        content, media_type = iter_csv(rows, EXPORT_COLUMNS), CSV_MEDIA_TYPE
+    else:
+        content, media_type = iter_xlsx(rows, EXPORT_COLUMNS, sheet_name="Candidatures"), XLSX_MEDIA_TYPE
+    
+    logger.info(f"Export {export_format} des candidatures pour {current_user.email}")
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
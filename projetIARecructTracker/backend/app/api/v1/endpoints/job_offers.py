@@ -2,9 +2,7 @@
 API endpoints for job offers management
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, HTTPException, Query
 from app.models.schemas import PaginatedResponse
 
 router = APIRouter()
@@ -13,8 +11,7 @@ router = APIRouter()
 async def get_job_offers(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
-    search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    search: Optional[str] = Query(None)
 ):
     """
     Récupérer la liste des offres d'emploi avec pagination
@@ -32,14 +29,14 @@ async def get_job_offers(
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
 @router.get("/{offer_id}")
-async def get_job_offer(offer_id: str, db: Session = Depends(get_db)):
+async def get_job_offer(offer_id: str):
     """
     Récupérer une offre d'emploi par ID
     """
     raise HTTPException(status_code=404, detail="Offre d'emploi non trouvée")
 
 @router.post("/")
-async def create_job_offer(db: Session = Depends(get_db)):
+async def create_job_offer():
     """
     Créer une nouvelle offre d'emploi
     """
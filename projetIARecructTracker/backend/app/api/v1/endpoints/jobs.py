@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Dict, Any
+from uuid import UUID
+from app.core.database import get_db
+from app.models.models import User
+from app.services.job_queue import JobQueue
+from app.api.v1.endpoints.auth import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+def get_job_status(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Statut d'un job en arrière-plan et avancement de ses sous-jobs
+    """
+    job_queue = JobQueue(db)
+    # Seuls les jobs de l'utilisateur sont visibles (ni ceux des autres, ni les jobs système)
+    job = job_queue.get_job(job_id, user_id=current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_queue.get_progress(job)
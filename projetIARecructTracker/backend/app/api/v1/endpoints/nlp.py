@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import Dict, Any, Optional
 from uuid import UUID
 from datetime import datetime, timedelta
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.nlp.nlp_orchestrator import NLPOrchestrator
-from app.nlp.matching_service import EmailMatchingService
+from app.services.user_stats_service import UserStatsService
+from app.nlp.registry import NLPServices, get_nlp_orchestrator, get_nlp_services
+from app.nlp.extraction_pool import email_tuples, extract_entities_batch
 from app.models.models import Email
 from pydantic import BaseModel
 
@@ -29,32 +33,26 @@ class BatchProcessRequest(BaseModel):
 @router.post("/process")
 async def process_email_nlp(
     email_id: UUID,
-    db: Session = Depends(get_db)
+    orchestrator: NLPOrchestrator = Depends(get_nlp_orchestrator)
 ):
     """
     Traiter un email avec tous les services NLP
     """
-    email = db.query(Email).filter(Email.id == email_id).first()
-    if not email:
+    result = await orchestrator.run_in_thread(orchestrator.process_email_by_id, email_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Email not found")
     
-    orchestrator = NLPOrchestrator(db)
-    result = await orchestrator.process_email_complete(email)
-    
     return result
 
 @router.post("/extract")
 async def extract_entities(
     request: EmailProcessingRequest,
-    db: Session = Depends(get_db)
+    services: NLPServices = Depends(get_nlp_services)
 ):
     """
     Extraire les entités d'un email
     """
-    from app.nlp.extraction_service import EmailExtractionService
-    
-    service = EmailExtractionService()
-    entities = await service.extract_entities(
+    entities = await services.extraction_service.extract_entities(
         request.subject, 
         request.body, 
         request.sender_email
@@ -65,15 +63,12 @@ async def extract_entities(
 @router.post("/classify")
 async def classify_email(
     request: EmailProcessingRequest,
-    db: Session = Depends(get_db)
+    services: NLPServices = Depends(get_nlp_services)
 ):
     """
     Classifier un email
     """
-    from app.nlp.classification_service import EmailClassificationService
-    
-    service = EmailClassificationService()
-    classification = await service.classify_email(
+    classification = await services.classification_service.classify_email(
         request.subject,
         request.body,
         request.sender_email
@@ -84,13 +79,14 @@ async def classify_email(
 @router.post("/match")
 async def find_matching_applications(
     request: MatchingRequest,
-    db: Session = Depends(get_db)
+    orchestrator: NLPOrchestrator = Depends(get_nlp_orchestrator)
 ):
     """
     Trouver les candidatures correspondant à un email
     """
-    matching_service = EmailMatchingService(db)
-    matches = await matching_service.find_matching_applications(
+    matches = await orchestrator.run_in_thread(
+        orchestrator.matching_service.find_matching_applications,
+        orchestrator.db,
         request.email_subject,
         request.email_body,
         request.sender_email
@@ -101,32 +97,26 @@ async def find_matching_applications(
 @router.post("/reprocess/{email_id}")
 async def reprocess_email(
     email_id: UUID,
-    db: Session = Depends(get_db)
+    orchestrator: NLPOrchestrator = Depends(get_nlp_orchestrator)
 ):
     """
     Retraiter un email avec les services NLP
     """
-    orchestrator = NLPOrchestrator(db)
-    result = await orchestrator.reprocess_email(str(email_id))
+    result = await orchestrator.run_in_thread(orchestrator.reprocess_email, str(email_id))
     
     return result
 
 @router.get("/stats")
-async def get_nlp_stats(db: Session = Depends(get_db)):
+async def get_nlp_stats(db: AsyncSession = Depends(get_async_db)):
     """
     Statistiques sur le traitement NLP des emails
     """
-    # Statistiques sur les emails traités
-    total_emails = db.query(Email).count()
-    classified_emails = db.query(Email).filter(Email.classification.isnot(None)).count()
-    linked_emails = db.query(Email).filter(Email.application_id.isnot(None)).count()
-    
-    # Répartition par type de classification
-    from sqlalchemy import func
-    classification_stats = db.query(
-        Email.classification,
-        func.count(Email.id).label('count')
-    ).filter(Email.classification.isnot(None)).group_by(Email.classification).all()
+    # Compteurs matérialisés, sommés sur tous les utilisateurs
+    rows = (await db.execute(UserStatsService.counters_statement())).all()
+    counters = {row.name: int(row.value) for row in rows}
+    total_emails = counters.get("emails.total", 0)
+    classified_emails = counters.get("emails.classified", 0)
+    linked_emails = counters.get("emails.linked", 0)
     
     return {
         "total_emails": total_emails,
@@ -134,15 +124,14 @@ async def get_nlp_stats(db: Session = Depends(get_db)):
         "linked_emails": linked_emails,
         "classification_rate": classified_emails / total_emails if total_emails > 0 else 0,
         "linking_rate": linked_emails / total_emails if total_emails > 0 else 0,
-        "classification_breakdown": {
-            result.classification: result.count for result in classification_stats
-        }
+        "classification_breakdown": UserStatsService.breakdown(counters, "emails.classification")
     }
 
 @router.post("/batch-process")
 async def batch_process_emails(
     request: BatchProcessRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    orchestrator: NLPOrchestrator = Depends(get_nlp_orchestrator)
 ):
     """
     Traiter en lot les emails d'un intervalle de temps donné
@@ -154,13 +143,14 @@ async def batch_process_emails(
         start_date = datetime.utcnow() - timedelta(days=request.days_back or 30)
     
     # Récupérer les emails dans l'intervalle
-    query = db.query(Email).filter(Email.created_at >= start_date)
+    # Corps compressés chargés en une requête pour tout le lot (lus à défaut d'extrait)
+    query = db.query(Email).options(selectinload(Email.body_blob)).filter(Email.created_at >= start_date)
     
     # Si force_reprocess est False, exclure les emails déjà traités
     if not request.force_reprocess:
         query = query.filter(Email.classification.is_(None))
     
-    emails_to_process = query.all()
+    emails_to_process = await run_in_threadpool(query.all)
     
     if not emails_to_process:
         return {
@@ -170,22 +160,19 @@ async def batch_process_emails(
             "interval": f"Derniers {request.hours_back} heures" if request.hours_back else f"Derniers {request.days_back} jours"
         }
     
-    # Traiter les emails avec l'orchestrateur
-    orchestrator = NLPOrchestrator(db)
-    processed_count = 0
-    errors = []
+    # Extraction par règles de tout le lot (sur plusieurs processus si configuré)
+    # (y compris la lecture des corps : décompression hors de la boucle d'événements)
+    rule_extractions = await run_in_threadpool(
+        lambda: extract_entities_batch(email_tuples(emails_to_process, body_attributes=("snippet", "body_text")))
+    )
     
-    for email in emails_to_process:
-        try:
-            await orchestrator.process_email_complete(email)
-            processed_count += 1
-        except Exception as e:
-            errors.append(f"Email {email.id}: {str(e)}")
+    # Traiter les emails avec l'orchestrateur
+    batch_result = await orchestrator.run_in_thread(orchestrator.process_emails, emails_to_process, rule_extractions)
     
     return {
         "message": f"Traitement terminé",
-        "processed_count": processed_count,
+        "processed_count": batch_result["processed_count"],
         "total_found": len(emails_to_process),
-        "errors": errors,
+        "errors": batch_result["errors"],
         "interval": f"Derniers {request.hours_back} heures" if request.hours_back else f"Derniers {request.days_back} jours"
     }
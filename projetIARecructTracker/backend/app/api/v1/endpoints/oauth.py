@@ -240,9 +240,14 @@ async def sync_emails_from_gmail(
     try:
         from app.services.gmail_api_service import GmailAPIService
         
+        from app.services.job_queue import JobQueue
+        
         gmail_service = GmailAPIService(db)
         result = await gmail_service.sync_emails_from_gmail(current_user, max_emails, days_back)
         
+        # Analyse NLP des nouveaux emails par les workers
+        result["analysis_jobs"] = JobQueue(db).enqueue_email_analysis(result["email_ids"], user_id=current_user.id)
+        
         return result
         
     except Exception as e:
@@ -1,17 +1,41 @@
 from pydantic_settings import BaseSettings
 from pydantic import validator
-from typing import List, Union
+from typing import List, Union, Dict, Any
 import os
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Durée maximale d'une requête SQL côté serveur (0 = illimitée)
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
     
     # Security
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_HOURS: int = 24
+    # Cache en mémoire des tokens vérifiés (0 = désactivé)
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # Hachage des mots de passe (scrypt : N = 2^rounds, r = block_size, p = parallelism)
+    PASSWORD_SCRYPT_ROUNDS: int = 16
+    PASSWORD_SCRYPT_BLOCK_SIZE: int = 8
+    PASSWORD_SCRYPT_PARALLELISM: int = 1
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    # Échecs de connexion par adresse IP et email (0 = illimité)
+    LOGIN_RATE_LIMIT_ATTEMPTS: int = 10
+    # Échecs de connexion par adresse IP, tous emails confondus (0 = illimité)
+    LOGIN_RATE_LIMIT_IP_ATTEMPTS: int = 50
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    # Proxys (adresses ou réseaux) dont les en-têtes X-Forwarded-For / X-Real-IP
+    # sont crus : le nginx du frontend sur le réseau Docker par défaut
+    TRUSTED_PROXIES: Union[List[str], str] = ["127.0.0.1", "::1", "172.16.0.0/12"]
     
     # CORS - will be parsed from comma-separated string
     ALLOWED_ORIGINS: Union[List[str], str]
@@ -22,15 +46,50 @@ class Settings(BaseSettings):
     # Email providers
     GMAIL_CLIENT_ID: str
     GMAIL_CLIENT_SECRET: str
+    # Rafraîchissement anticipé des tokens Gmail (scheduler)
+    GMAIL_TOKEN_REFRESH_INTERVAL_MINUTES: int = 5
+    GMAIL_TOKEN_REFRESH_AHEAD_MINUTES: int = 10
+    GMAIL_TOKEN_REFRESH_BATCH_SIZE: int = 50
+    GMAIL_TOKEN_REFRESH_RETRY_MINUTES: int = 60
     
     # IMAP settings
     IMAP_HOST: str = "imap.gmail.com"
     IMAP_USER: str
     IMAP_PASSWORD: str
+    IMAP_FOLDERS: Union[List[str], str] = ["INBOX"]
+    IMAP_TIMEOUT_SECONDS: int = 30
+    
+    # Comptes IMAP supplémentaires (JSON) :
+    # [{"host": "...", "user": "...", "password": "...", "folders": ["INBOX", "Sent"], "user_id": "..."}]
+    IMAP_ACCOUNTS: List[Dict[str, Any]] = []
+    IMAP_WORKERS_PER_ACCOUNT: int = 2
+    IMAP_MAX_CONNECTIONS_PER_HOST: int = 4
+    
+    # Taille maximale du corps texte décodé et conservé par email
+    EMAIL_BODY_MAX_BYTES: int = 262144
+    
+    # Import de fichiers .eml / .mbox
+    IMPORT_BATCH_SIZE: int = 500
+    IMPORT_MAX_MESSAGE_MB: int = 25
+    
+    # File de jobs (workers : python run_worker.py)
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_LOCK_TIMEOUT_MINUTES: int = 15
+    JOB_WORKER_POLL_SECONDS: float = 2.0
     
     # Scheduler
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_JITTER_SECONDS: int = 120
     INGESTION_INTERVAL_MINUTES: int = 10
     REMINDER_CHECK_INTERVAL_HOURS: int = 24
+    AUTO_PROCESS_BATCH_LIMIT: int = 50
+    # Nombre d'emails traités par transaction dans IntelligentApplicationTracker
+    TRACKER_COMMIT_CHUNK_SIZE: int = 50
+    # Recalcul complet des statistiques matérialisées (corrige les dérives)
+    STATS_RECONCILE_INTERVAL_MINUTES: int = 60
+    # Processus dédiés à l'extraction par règles des gros lots (1 = désactivé)
+    EXTRACTION_PROCESSES: int = 1
+    EXTRACTION_POOL_MIN_BATCH: int = 200
     
     # Classification
     CLASSIFICATION_MODEL_PATH: str = "models/classification_model.pkl"
@@ -46,6 +105,8 @@ class Settings(BaseSettings):
     
     # NLP Settings
     SIMILARITY_THRESHOLD: float = 0.7
+    # Seuil pg_trgm de rapprochement email -> candidature par nom d'entreprise
+    COMPANY_MATCH_THRESHOLD: float = 0.3
     CLASSIFICATION_CONFIDENCE_THRESHOLD: float = 0.8
     
     @validator('ALLOWED_ORIGINS', pre=True)
@@ -55,6 +116,20 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in v.split(',') if origin.strip()]
         return v
     
+    @validator('TRUSTED_PROXIES', pre=True)
+    def parse_trusted_proxies(cls, v):
+        """Parse comma-separated proxy addresses/networks from .env"""
+        if isinstance(v, str):
+            return [proxy.strip() for proxy in v.split(',') if proxy.strip()]
+        return v
+    
+    @validator('IMAP_FOLDERS', pre=True)
+    def parse_imap_folders(cls, v):
+        """Parse comma-separated IMAP folders from .env"""
+        if isinstance(v, str):
+            return [folder.strip() for folder in v.split(',') if folder.strip()]
+        return v
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
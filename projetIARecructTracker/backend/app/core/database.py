@@ -1,16 +1,55 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+# Réglages communs aux deux engines : le driver psycopg 3 (postgresql+psycopg)
+# fournit à la fois l'API synchrone et l'API asyncio
+engine_options = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    "connect_args": {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+}
+
+engine = create_engine(settings.DATABASE_URL, **engine_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine asyncio pour les endpoints `async def` : les requêtes ne bloquent pas la boucle d'événements
+async_engine = create_async_engine(settings.DATABASE_URL, **engine_options)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    # Les objets restent lisibles après commit sans nouvel aller-retour implicite
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
+def lift_statement_timeout(db):
+    """
+    Lever DB_STATEMENT_TIMEOUT_MS jusqu'à la fin de la transaction courante
+
+    Pour les traitements de maintenance (recalculs, migrations) dont les requêtes
+    dépassent légitimement la durée maximale des requêtes de l'API.
+    Accepte une Session ou une Connection.
+    """
+    db.execute(text("SET LOCAL statement_timeout = 0"))
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engine():
+    await async_engine.dispose()
@@ -0,0 +1,71 @@
+"""
+Curseurs opaques de pagination keyset
+
+Un curseur encode la clé de tri (date, id) du dernier élément d'une page ; la
+page suivante reprend strictement après cette clé, sans OFFSET. Le coût d'une
+page ne dépend donc pas de sa profondeur.
+
+Les dates de tri NULL sont remplacées par -infinity (sort_key), dans le tri,
+le filtre et le curseur : ces lignes viennent en fin de liste et restent
+atteignables page après page.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func, literal_column, tuple_
+
+# En-tête de réponse portant le curseur de la page suivante
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Clé de tri des dates NULL (littéral non typé : prend le type de la colonne)
+NULL_SORT_VALUE = literal_column("'-infinity'")
+
+# Date de tri None : ligne dont la date est NULL
+CursorKey = Tuple[Optional[datetime], UUID]
+
+
+def sort_key(column):
+    """Expression de tri keyset d'une date (identique dans le tri, le filtre et les index)"""
+    return func.coalesce(column, NULL_SORT_VALUE)
+
+
+def after_key(column, item_id_column, after: CursorKey):
+    """Filtre des lignes strictement après la clé `after` en tri décroissant"""
+    sort_value, item_id = after
+    return tuple_(sort_key(column), item_id_column) < tuple_(
+        NULL_SORT_VALUE if sort_value is None else sort_value,
+        item_id
+    )
+
+
+def encode_cursor(sort_value: Optional[datetime], item_id: UUID) -> str:
+    payload = json.dumps(
+        [sort_value.isoformat() if sort_value is not None else None, str(item_id)],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """
+    Raises:
+        ValueError: curseur malformé
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, UUID(item_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Curseur de pagination invalide: {cursor}") from e
+
+
+def next_cursor(items: List[Any], limit: int, sort_attribute: str) -> Optional[str]:
+    """Curseur de la page suivante, ou None si la page n'est pas pleine"""
+    if len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(getattr(last, sort_attribute), last.id)
@@ -0,0 +1,108 @@
+"""
+Limitation de débit en mémoire par clé (fenêtre glissante)
+
+Utilisée pour les échecs de connexion par (adresse IP, email) et par adresse IP. L'état est
+propre à chaque processus : avec N processus API, la limite effective est au
+plus N fois la limite configurée.
+"""
+import ipaddress
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, Iterable, Optional
+
+
+class SlidingWindowRateLimiter:
+    """Au plus `max_attempts` tentatives par clé sur les `window_seconds` dernières secondes"""
+
+    def __init__(self, max_attempts: int, window_seconds: float):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self._attempts: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def retry_after(self, key: Hashable) -> float:
+        """
+        Returns:
+            0 si une nouvelle tentative est autorisée, sinon le nombre de
+            secondes avant la prochaine tentative possible
+        """
+        if self.max_attempts <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            attempts = self._attempts.get(key)
+            if not attempts:
+                return 0
+            while attempts and attempts[0] <= now - self.window_seconds:
+                attempts.popleft()
+            if len(attempts) >= self.max_attempts:
+                return attempts[0] + self.window_seconds - now
+            return 0
+
+    def record(self, key: Hashable):
+        """Compter une tentative (par exemple un échec de connexion)"""
+        if self.max_attempts <= 0:
+            return
+        with self._lock:
+            self._attempts.setdefault(key, deque()).append(time.monotonic())
+
+    def reset(self, key: Hashable):
+        """Oublier les tentatives d'une clé (par exemple après une connexion réussie)"""
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def _sweep(self, now: float):
+        """Oublier les clés sans tentative récente (au plus une fois par fenêtre)"""
+        if now - self._last_sweep < self.window_seconds:
+            return
+        self._last_sweep = now
+        for key in [key for key, attempts in self._attempts.items()
+                    if not attempts or attempts[-1] <= now - self.window_seconds]:
+            del self._attempts[key]
+
+
+def _parse_address(value: str):
+    try:
+        return ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+
+
+def resolve_client_ip(
+    peer: Optional[str],
+    forwarded_for: Optional[str],
+    real_ip: Optional[str],
+    trusted_proxies: Iterable[str]
+) -> str:
+    """
+    Adresse IP du client derrière des proxys de confiance
+
+    Les en-têtes X-Forwarded-For / X-Real-IP ne sont crus que si la connexion
+    vient d'un proxy de confiance. X-Forwarded-For est lu de droite à gauche :
+    la première adresse qui n'est pas un proxy de confiance est celle du
+    client (les adresses plus à gauche peuvent être forgées par le client).
+    """
+    networks = [ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies]
+
+    def trusted(address) -> bool:
+        return address is not None and any(address in network for network in networks)
+
+    peer_address = _parse_address(peer) if peer else None
+    if not trusted(peer_address):
+        return peer or "unknown"
+
+    if forwarded_for:
+        for hop in reversed(forwarded_for.split(",")):
+            address = _parse_address(hop)
+            if address is None:
+                break
+            if not trusted(address):
+                return str(address)
+
+    real_address = _parse_address(real_ip) if real_ip else None
+    if real_address is not None:
+        return str(real_address)
+    return peer
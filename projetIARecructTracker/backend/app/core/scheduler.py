@@ -0,0 +1,203 @@
+"""
+Planificateur du traitement automatique des emails (APScheduler)
+
+Les jobs sont persistés dans la table `apscheduler_jobs` : la planification
+de chaque utilisateur survit aux redémarrages de l'API.
+"""
+import asyncio
+import zlib
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from loguru import logger
+
+# Espace de noms des verrous consultatifs PostgreSQL du traitement automatique
+AUTO_PROCESS_LOCK_NAMESPACE = zlib.crc32(b"auto-process") - 2 ** 31
+# Verrou du rafraîchissement des tokens Gmail : chaque processus de l'API
+# planifie le job, un seul passage doit rafraîchir les tokens
+GMAIL_TOKEN_REFRESH_LOCK_KEY = zlib.crc32(b"gmail-token-refresh") - 2 ** 31
+
+USER_STATS_RECONCILE_JOB_ID = "user-stats-reconcile"
+GMAIL_TOKEN_REFRESH_JOB_ID = "gmail-token-refresh"
+
+scheduler = BackgroundScheduler(
+    jobstores={"default": SQLAlchemyJobStore(engine=engine, tablename="apscheduler_jobs")},
+    job_defaults={
+        # Un seul cycle à la fois par utilisateur dans ce processus,
+        # les exécutions manquées pendant un arrêt sont fusionnées en une seule
+        "max_instances": 1,
+        "coalesce": True,
+        "misfire_grace_time": 300
+    },
+    timezone="UTC"
+)
+
+
+class SchedulerUnavailable(Exception):
+    """Le planificateur n'est pas démarré (SCHEDULER_ENABLED désactivé)"""
+
+
+def _user_job_id(user_id: UUID) -> str:
+    return f"auto-process:{user_id}"
+
+
+def _user_lock_key(user_id: UUID) -> int:
+    """Clé du verrou consultatif d'un utilisateur (entier 32 bits signé)"""
+    return zlib.crc32(str(user_id).encode()) - 2 ** 31
+
+
+def start_scheduler():
+    if settings.SCHEDULER_ENABLED and not scheduler.running:
+        scheduler.start()
+        # Premier recalcul des statistiques dès le démarrage (table vide ou dérive)
+        scheduler.add_job(
+            run_user_stats_reconciliation,
+            trigger=IntervalTrigger(minutes=settings.STATS_RECONCILE_INTERVAL_MINUTES),
+            id=USER_STATS_RECONCILE_JOB_ID,
+            name="User stats reconciliation",
+            next_run_time=datetime.utcnow(),
+            replace_existing=True
+        )
+        # Rafraîchissement anticipé des tokens Gmail : les synchronisations n'ont
+        # presque jamais à attendre un rafraîchissement
+        scheduler.add_job(
+            run_gmail_token_refresh,
+            trigger=IntervalTrigger(minutes=settings.GMAIL_TOKEN_REFRESH_INTERVAL_MINUTES),
+            id=GMAIL_TOKEN_REFRESH_JOB_ID,
+            name="Gmail token refresh",
+            next_run_time=datetime.utcnow(),
+            replace_existing=True
+        )
+        logger.info(f"Scheduler started with {len(scheduler.get_jobs())} persisted jobs")
+
+
+def shutdown_scheduler():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+        logger.info("Scheduler stopped")
+
+
+def schedule_user_auto_processing(user_id: UUID, interval_minutes: Optional[int] = None) -> Optional[datetime]:
+    """
+    Planifier (ou replanifier) le traitement automatique d'un utilisateur
+
+    Le jitter décale chaque exécution d'un délai aléatoire pour que les
+    cycles des différents utilisateurs ne partent pas tous en même temps.
+    """
+    if not scheduler.running:
+        raise SchedulerUnavailable("Le traitement automatique est désactivé sur ce serveur")
+    job = scheduler.add_job(
+        run_user_auto_processing,
+        trigger=IntervalTrigger(
+            minutes=interval_minutes or settings.INGESTION_INTERVAL_MINUTES,
+            jitter=settings.SCHEDULER_JITTER_SECONDS
+        ),
+        args=[str(user_id)],
+        id=_user_job_id(user_id),
+        name=f"Auto-processing for user {user_id}",
+        replace_existing=True
+    )
+    return job.next_run_time
+
+
+def unschedule_user_auto_processing(user_id: UUID) -> bool:
+    """Supprimer le traitement automatique d'un utilisateur"""
+    job = scheduler.get_job(_user_job_id(user_id))
+    if not job:
+        return False
+    job.remove()
+    return True
+
+
+def get_user_auto_processing_next_run(user_id: UUID) -> Optional[datetime]:
+    if not scheduler.running:
+        return None
+    job = scheduler.get_job(_user_job_id(user_id))
+    return job.next_run_time if job else None
+
+
+def run_user_auto_processing(user_id: str):
+    """
+    Cycle de traitement automatique d'un utilisateur
+
+    Un verrou consultatif PostgreSQL, tenu sur une connexion dédiée pendant tout
+    le cycle, garantit que deux cycles d'un même utilisateur ne se chevauchent
+    jamais, y compris entre plusieurs processus de l'API.
+    """
+    from app.models.models import User
+    from app.services.auto_processing_service import AutoProcessingService
+
+    lock_args = {"namespace": AUTO_PROCESS_LOCK_NAMESPACE, "key": _user_lock_key(user_id)}
+
+    with engine.connect() as lock_conn:
+        acquired = lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:namespace, :key)"), lock_args
+        ).scalar()
+        if not acquired:
+            logger.info(f"Auto-processing already running for user {user_id}, skipping")
+            return
+
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.id == UUID(user_id)).first()
+            if not user:
+                logger.warning(f"User {user_id} not found, removing auto-processing job")
+                unschedule_user_auto_processing(UUID(user_id))
+                return
+
+            AutoProcessingService(db).run_for_user(user)
+        except Exception as e:
+            logger.error(f"Auto-processing failed for user {user_id}: {e}")
+        finally:
+            db.close()
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:namespace, :key)"), lock_args)
+            lock_conn.commit()
+
+
+def run_user_stats_reconciliation():
+    """Recalcul périodique des compteurs matérialisés des tableaux de bord"""
+    from app.services.user_stats_service import UserStatsService
+
+    db = SessionLocal()
+    try:
+        written = UserStatsService(db).reconcile()
+        logger.info(f"User stats reconciled ({written} counters)")
+    except Exception as e:
+        logger.error(f"User stats reconciliation failed: {e}")
+    finally:
+        db.close()
+
+
+def run_gmail_token_refresh():
+    """
+    Rafraîchissement des tokens Gmail qui expirent avant le prochain passage
+
+    Sans le verrou, chaque processus de l'API rafraîchirait les mêmes tokens.
+    """
+    from app.services.gmail_oauth_service import GmailOAuthService
+
+    lock_args = {"key": GMAIL_TOKEN_REFRESH_LOCK_KEY}
+
+    with engine.connect() as lock_conn:
+        acquired = lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), lock_args).scalar()
+        if not acquired:
+            logger.info("Gmail token refresh already running in another process, skipping")
+            return
+
+        db = SessionLocal()
+        try:
+            result = asyncio.run(GmailOAuthService(db).refresh_expiring_tokens())
+            if result["refreshed"] or result["failed"]:
+                logger.info(f"Gmail tokens refreshed: {result['refreshed']}, failed: {result['failed']}")
+        except Exception as e:
+            logger.error(f"Gmail token refresh failed: {e}")
+        finally:
+            db.close()
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), lock_args)
+            lock_conn.commit()
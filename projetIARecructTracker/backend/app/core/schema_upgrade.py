@@ -0,0 +1,76 @@
+"""
+Mise à jour idempotente du schéma d'une base existante
+
+create_all crée les tables manquantes mais ne modifie jamais une table déjà
+créée : les colonnes ajoutées aux modèles existants par les modules
+complémentaires (app.models.indexes, app.models.email_bodies) n'y seraient
+jamais ajoutées, et toute requête les lisant échouerait. upgrade_schema ajoute
+les colonnes déclarées dans les métadonnées et absentes de la base, avec leurs
+clés étrangères, puis crée les index déclarés manquants (recherche plein
+texte, trigrammes, pagination keyset...). Peut être relancé sans risque.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import AddConstraint, CreateIndex, ExecutableDDLElement
+from app.core.database import lift_statement_timeout
+from app.models.models import Base
+import app.models.jobs  # noqa: F401  (enregistre la table jobs dans les métadonnées)
+import app.models.indexes  # noqa: F401  (colonnes générées et index complémentaires)
+import app.models.user_stats  # noqa: F401  (compteurs des tableaux de bord)
+import app.models.application_insights  # noqa: F401  (métriques précalculées des candidatures)
+import app.models.revoked_tokens  # noqa: F401  (tokens révoqués à la déconnexion)
+import app.models.oauth_states  # noqa: F401  (states OAuth Gmail en attente)
+import app.models.user_gmail  # noqa: F401  (échecs de rafraîchissement des tokens Gmail)
+import app.models.email_bodies  # noqa: F401  (corps d'emails compressés)
+from loguru import logger
+
+
+# Index remplacés par une autre définition (sous un autre nom), à supprimer
+OBSOLETE_INDEXES = (
+    # Clé de tri sans coalesce : remplacés par les index *_key (app.core.pagination.sort_key)
+    "ix_applications_user_updated_at_id",
+    "ix_emails_user_created_at_id",
+    "ix_emails_user_application_created_at",
+)
+
+
+class AddColumn(ExecutableDDLElement):
+    """ALTER TABLE ... ADD COLUMN IF NOT EXISTS, avec la définition complète de la colonne"""
+
+    def __init__(self, column):
+        self.column = column
+
+
+@compiles(AddColumn)
+def _compile_add_column(element, compiler, **kw):
+    return "ALTER TABLE %s ADD COLUMN IF NOT EXISTS %s" % (
+        compiler.preparer.format_table(element.column.table),
+        compiler.get_column_specification(element.column)
+    )
+
+
+def upgrade_schema(connection: Connection):
+    """Créer les tables, colonnes et index déclarés et absents de la base"""
+    # Création d'index et colonnes générées sur des tables remplies
+    lift_statement_timeout(connection)
+    # Extensions requises par les index (recherche floue pg_trgm)
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(connection)
+
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            logger.info(f"Adding column {table.name}.{column.name}")
+            connection.execute(AddColumn(column))
+            for foreign_key in column.foreign_keys:
+                connection.execute(AddConstraint(foreign_key.constraint))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+    for name in OBSOLETE_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
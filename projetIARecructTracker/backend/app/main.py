@@ -2,6 +2,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.core.scheduler import start_scheduler, shutdown_scheduler
+from app.nlp.extraction_pool import shutdown_extraction_pool
+from app.services.password_hashing import shutdown_password_hashing
+from app.nlp.registry import init_nlp_services
+from app.core.database import dispose_async_engine
+from app.core.pagination import NEXT_CURSOR_HEADER
+import app.services.user_stats_service  # noqa: F401  (écouteurs de mise à jour des statistiques)
+import app.services.application_insights_service  # noqa: F401  (écouteur de recalcul des insights)
+import app.models.email_bodies  # noqa: F401  (Email.body_text, corps compressés chargés à la demande)
 
 app = FastAPI(
     title="AI Recruit Tracker",
@@ -16,11 +25,25 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
     allow_credentials=True,
+    # Curseur de pagination keyset, lisible par le frontend
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+def on_startup():
+    init_nlp_services()
+    start_scheduler()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    shutdown_scheduler()
+    shutdown_extraction_pool()
+    shutdown_password_hashing()
+    await dispose_async_engine()
+
 @app.get("/health")
 def health_check():
     return {"status": "ok", "message": "AI Recruit Tracker API is running"}
@@ -0,0 +1,27 @@
+"""
+Métriques précalculées par candidature (insights du tracker intelligent)
+
+Une ligne par candidature, recalculée en SQL (fonctions de fenêtre) à chaque
+rattachement ou détachement d'un email. Les valeurs dépendant de la date du
+jour (jours depuis le dernier contact, recommandations) sont dérivées à la
+lecture à partir de `last_email_at`.
+"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.models import Base
+
+
+class ApplicationInsight(Base):
+    __tablename__ = "application_insights"
+
+    application_id = Column(
+        UUID(as_uuid=True), ForeignKey("applications.id", ondelete="CASCADE"), primary_key=True
+    )
+    email_count = Column(Integer, nullable=False, default=0)
+    first_email_at = Column(DateTime)
+    last_email_at = Column(DateTime)
+    # Écart entre deux emails consécutifs de la candidature, en jours
+    avg_response_gap_days = Column(Float)
+    median_response_gap_days = Column(Float)
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,69 @@
+"""
+Stockage froid compressé des corps et en-têtes bruts des emails
+
+Les textes volumineux et rarement lus (corps complet, en-têtes bruts) sont
+stockés compressés dans email_bodies, adressés par le SHA-256 du texte : un
+même corps reçu plusieurs fois (relances, listes de diffusion) n'est stocké
+qu'une fois. La table emails ne garde que l'empreinte ; le corps n'est chargé
+qu'à l'accès à `Email.body_text` (consultation d'un email, pipeline NLP).
+
+Les lignes antérieures gardent leur corps dans emails.raw_body jusqu'à leur
+migration (EmailBodyStore.migrate_inline_bodies) : `body_text` lit l'un ou
+l'autre.
+"""
+import zlib
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, LargeBinary, String
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
+from app.models.models import Base, Email
+
+CODEC_ZLIB = "zlib"
+
+
+class EmailBody(Base):
+    __tablename__ = "email_bodies"
+
+    # SHA-256 hexadécimal du texte non compressé (UTF-8)
+    digest = Column(String(64), primary_key=True)
+    codec = Column(String(16), nullable=False, default=CODEC_ZLIB)
+    data = Column(LargeBinary, nullable=False)
+    # Taille du texte non compressé, en octets
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Recherche plein texte des corps (EmailService.search_emails), calculée
+    # avant compression à l'enregistrement ; NULL pour les en-têtes
+    search_vector = deferred(Column(TSVECTOR))
+
+    __table_args__ = (
+        Index("ix_email_bodies_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(self.data).decode("utf-8")
+
+
+Email.body_digest = Column(String(64), ForeignKey("email_bodies.digest"), index=True)
+Email.headers_digest = Column(String(64), ForeignKey("email_bodies.digest"), index=True)
+
+# Chargées à l'accès seulement (selectinload pour un lot)
+Email.body_blob = relationship(EmailBody, foreign_keys=[Email.body_digest], viewonly=True)
+Email.headers_blob = relationship(EmailBody, foreign_keys=[Email.headers_digest], viewonly=True)
+
+
+def _body_text(email: Email) -> Optional[str]:
+    if email.body_digest:
+        return email.body_blob.text
+    return email.raw_body
+
+
+def _headers_text(email: Email) -> Optional[str]:
+    if email.headers_digest:
+        return email.headers_blob.text
+    return email.raw_headers
+
+
+Email.body_text = property(_body_text)
+Email.headers_text = property(_headers_text)
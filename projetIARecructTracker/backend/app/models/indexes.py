@@ -0,0 +1,132 @@
+"""
+Index et colonnes calculées complémentaires sur les tables principales
+
+Déclarés ici pour être pris en compte par Base.metadata (create_all et
+autogénération Alembic) sans modifier les définitions des modèles.
+"""
+from functools import reduce
+from sqlalchemy import Boolean, Column, Computed, Index, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
+from app.core.pagination import sort_key
+from app.models.models import Application, Email
+
+# Préfixe de `source` des candidatures créées par IntelligentApplicationTracker
+AUTO_CREATED_SOURCE_MARKER = "Détecté automatiquement"
+
+# Candidature créée automatiquement : colonne générée par PostgreSQL à partir
+# de `source`, toujours cohérente et indexable (remplace un LIKE '%...%' non indexable)
+Application.is_auto_created = Column(
+    Boolean,
+    Computed(f"coalesce(source LIKE '%{AUTO_CREATED_SOURCE_MARKER}%', false)", persisted=True),
+    nullable=False
+)
+
+# Configurations de recherche plein texte : les contenus sont en français ou en anglais
+SEARCH_CONFIGS = ("french", "english")
+
+# Taille maximale de corps indexée (un tsvector est limité à 1 Mo)
+SEARCH_BODY_MAX_CHARS = 100000
+
+
+def _search_vector_expression(weighted_columns) -> str:
+    """Expression SQL concaténant les tsvector pondérés des colonnes dans chaque configuration"""
+    return " || ".join(
+        f"setweight(to_tsvector('{config}', coalesce({column}, '')), '{weight}')"
+        for config in SEARCH_CONFIGS
+        for column, weight in weighted_columns
+    )
+
+
+def search_query(text: str):
+    """tsquery d'une saisie utilisateur (syntaxe websearch : "expression", -exclu, or) dans chaque configuration"""
+    return reduce(
+        lambda left, right: left.op("||")(right),
+        [func.websearch_to_tsquery(config, text) for config in SEARCH_CONFIGS]
+    )
+
+
+def search_vector_value(text: str, weight: str):
+    """tsvector pondéré d'un texte dans chaque configuration, pour une colonne non générée"""
+    return reduce(
+        lambda left, right: left.op("||")(right),
+        [func.setweight(func.to_tsvector(config, text), weight) for config in SEARCH_CONFIGS]
+    )
+
+
+# Recherche plein texte des candidatures (ApplicationService.search_applications) :
+# colonne générée, toujours à jour, interrogée via l'index GIN ci-dessous ; non
+# chargée avec les objets (deferred)
+Application.search_vector = deferred(Column(
+    TSVECTOR,
+    Computed(_search_vector_expression([
+        ("job_title", "A"), ("company_name", "A"), ("notes", "C")
+    ]), persisted=True)
+))
+Index("ix_applications_search_vector", Application.search_vector, postgresql_using="gin")
+
+# Idem pour les emails (EmailService.search_emails) : objet et extrait ; le corps
+# est indexé dans email_bodies.search_vector, rempli à son enregistrement
+Email.search_vector = deferred(Column(
+    TSVECTOR,
+    Computed(_search_vector_expression([
+        ("subject", "A"), ("snippet", "B")
+    ]), persisted=True)
+))
+Index("ix_emails_search_vector", Email.search_vector, postgresql_using="gin")
+
+# Résumé par utilisateur (IntelligentApplicationTracker.get_processing_summary) :
+# comptage par statut et par mode de création en parcours d'index seul
+Index(
+    "ix_applications_user_status_auto_created",
+    Application.user_id,
+    Application.status,
+    Application.is_auto_created
+)
+
+# Recherche floue sur les noms d'entreprise et intitulés de poste (extension pg_trgm) :
+# utilisés par les opérateurs % et similarity() de ApplicationService.find_similar_applications
+Index(
+    "ix_applications_company_name_trgm",
+    Application.company_name,
+    postgresql_using="gin",
+    postgresql_ops={"company_name": "gin_trgm_ops"}
+)
+Index(
+    "ix_applications_job_title_trgm",
+    Application.job_title,
+    postgresql_using="gin",
+    postgresql_ops={"job_title": "gin_trgm_ops"}
+)
+
+# Dernier email de chaque candidature (DISTINCT ON de ApplicationExportService)
+# et agrégats par candidature : parcours d'index par application_id, sent_at décroissant
+Index(
+    "ix_emails_application_id_sent_at",
+    Email.application_id,
+    Email.sent_at.desc()
+)
+
+# Pagination keyset des listes (ApplicationService.get_applications, EmailService.get_emails) :
+# parcours d'index dans l'ordre du tri, à partir de la clé du curseur. Même
+# expression que le tri (sort_key : dates NULL ramenées à -infinity)
+Index(
+    "ix_applications_user_updated_at_key",
+    Application.user_id,
+    sort_key(Application.updated_at).desc(),
+    Application.id.desc()
+)
+Index(
+    "ix_emails_user_created_at_key",
+    Email.user_id,
+    sort_key(Email.created_at).desc(),
+    Email.id.desc()
+)
+# Liste des emails non liés (application_id IS NULL) d'un utilisateur
+Index(
+    "ix_emails_user_application_created_at_key",
+    Email.user_id,
+    Email.application_id,
+    sort_key(Email.created_at).desc(),
+    Email.id.desc()
+)
@@ -0,0 +1,51 @@
+"""
+Modèle de la file de jobs persistée en base (traitements en arrière-plan)
+"""
+import uuid
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from app.models.models import Base
+
+
+class JobStatus(str, Enum):
+    """Statuts d'un job"""
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class JobType(str, Enum):
+    """Types de jobs pris en charge par les workers"""
+    EMAIL_INSERTED = "email_inserted"    # Analyse NLP d'un email nouvellement inséré
+    IMAP_INGESTION = "imap_ingestion"    # Ingestion IMAP puis analyse des emails récupérés
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default=JobStatus.PENDING.value)
+    payload = Column(JSONB, nullable=False, default=dict)
+    result = Column(JSONB)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+
+    # Un job d'ingestion est le parent des jobs NLP qu'il a créés (suivi de progression)
+    parent_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="CASCADE"), index=True)
+    user_id = Column(UUID(as_uuid=True), index=True)
+
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Index partiel utilisé par le SELECT ... FOR UPDATE SKIP LOCKED des workers
+        Index("ix_jobs_pending_run_after", "run_after", postgresql_where=text("status = 'PENDING'")),
+    )
@@ -0,0 +1,21 @@
+"""
+States OAuth en attente de callback
+
+Partagés par tous les processus de l'API : le callback Google peut arriver sur
+un autre processus que celui qui a généré l'URL d'autorisation. Un state est
+consommé (supprimé) à son premier usage ; les states expirés sont purgés à la
+génération des suivants.
+"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, String
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.models import Base
+
+
+class OAuthState(Base):
+    __tablename__ = "oauth_states"
+
+    state = Column(String(64), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,16 @@
+"""
+Tokens JWT révoqués (déconnexion)
+
+Les tokens restent sans état : seul l'identifiant (`jti`) des tokens révoqués
+avant leur expiration est conservé, jusqu'à cette expiration.
+"""
+from sqlalchemy import Column, DateTime, String
+from app.models.models import Base
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    # Date d'expiration du token : la ligne peut être supprimée ensuite
+    expires_at = Column(DateTime, nullable=False, index=True)
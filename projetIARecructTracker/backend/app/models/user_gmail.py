@@ -0,0 +1,32 @@
+"""
+Suivi du rafraîchissement des tokens Gmail
+
+Le rafraîchissement anticipé (app.core.scheduler) parcourt les comptes dont le
+token expire bientôt ; le dernier échec est conservé pour être signalé dans
+/oauth/gmail/status avant que la synchronisation n'échoue. Table séparée de
+users : les requêtes sur les utilisateurs (authentification) ne la lisent pas.
+"""
+from datetime import datetime
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Text, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.models import Base, User
+
+
+class GmailRefreshFailure(Base):
+    """Dernier échec de rafraîchissement du token d'un utilisateur (supprimé au premier succès)"""
+    __tablename__ = "gmail_refresh_failures"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    error = Column(Text, nullable=False)
+    failed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Refresh token refusé par Google (révoqué, expiré) : seule une nouvelle
+    # autorisation le remplace ; les autres erreurs (réseau, 5xx) sont retentées
+    requires_reauthorization = Column(Boolean, nullable=False, default=False)
+
+
+# Comptes à rafraîchir, par date d'expiration (GmailOAuthService.refresh_expiring_tokens)
+Index(
+    "ix_users_gmail_token_expires_at",
+    User.gmail_token_expires_at,
+    postgresql_where=text("gmail_connected AND gmail_refresh_token IS NOT NULL")
+)
@@ -0,0 +1,25 @@
+"""
+Compteurs matérialisés par utilisateur pour les tableaux de bord
+
+Une ligne par (utilisateur, compteur) : les mises à jour incrémentales sont des
+upserts `value = value + delta` sur quelques lignes, les lectures ne dépendent
+plus de la taille des tables applications et emails.
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.models import Base
+
+# Emails sans utilisateur (ingestion IMAP globale) : comptés sous l'UUID nul
+UNASSIGNED_USER_ID = uuid.UUID(int=0)
+
+
+class UserStatCounter(Base):
+    __tablename__ = "user_stat_counters"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    # Ex. "applications.total", "applications.status.INTERVIEW", "emails.classification.ACK"
+    name = Column(String(100), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
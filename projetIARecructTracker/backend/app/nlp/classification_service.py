@@ -29,11 +29,20 @@ class ClassificationResult(BaseModel):
 
 
 class EmailClassificationService:
-    """Service de classification des emails de recrutement"""
+    """
+    Service de classification des emails de recrutement
+
+    Les règles sont chargées et compilées une seule fois : une instance est
+    partagée par le processus (voir app.nlp.registry).
+    """
     
     def __init__(self):
         self.rules_path = settings.CLASSIFICATION_RULES_PATH
         self.rules = self._load_classification_rules()
+        self.compiled_rules = {
+            email_type: [(pattern, re.compile(pattern, re.IGNORECASE)) for pattern in patterns]
+            for email_type, patterns in self.rules.items()
+        }
     
     def _load_classification_rules(self) -> Dict[str, List[str]]:
         """Charger les règles de classification depuis les fichiers YAML"""
@@ -127,11 +136,8 @@ class EmailClassificationService:
             method_used="rules"
         )
         
-        for email_type, patterns in self.rules.items():
-            matches = []
-            for pattern in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
-                    matches.append(pattern)
+        for email_type, patterns in self.compiled_rules.items():
+            matches = [pattern for pattern, regex in patterns if regex.search(text)]
             
             if matches:
                 # Calculer la confiance basée sur le nombre de matches
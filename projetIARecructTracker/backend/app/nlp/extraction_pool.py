@@ -0,0 +1,114 @@
+"""
+Extraction par règles en parallèle sur plusieurs processus
+
+Les règles d'extraction sont purement CPU (expressions régulières) et limitées
+par le GIL dans un seul processus. Pour les gros lots (retraitement de tout
+l'historique d'un utilisateur), les emails sont envoyés sous forme de tuples
+légers à un ProcessPoolExecutor et seuls les résultats extraits reviennent :
+les objets SQLAlchemy et toutes les écritures en base restent dans le
+processus parent.
+
+Le pool est désactivé par défaut (EXTRACTION_PROCESSES=1) et n'est utilisé
+que pour les lots d'au moins EXTRACTION_POOL_MIN_BATCH emails, en dessous
+desquels le coût d'envoi entre processus dépasse le gain.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.nlp.extraction_service import ExtractedEntity, extract_entities_with_rules
+from app.nlp.rule_extractor import extract_application_fields
+from loguru import logger
+
+# (id, sujet, corps, expéditeur, classification)
+EmailTuple = Tuple[Hashable, Optional[str], Optional[str], Optional[str], Optional[str]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    """Pool partagé, créé au premier usage et réutilisé entre les lots"""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn : les workers n'héritent ni des connexions ni des verrous du parent
+            _pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_size = processes
+            logger.info(f"Extraction pool started with {processes} processes")
+        return _pool
+
+
+def shutdown_extraction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _application_fields_worker(email: EmailTuple) -> Tuple[Hashable, Dict[str, Any]]:
+    email_id, subject, body, sender, classification = email
+    return email_id, extract_application_fields(subject, body, sender, classification)
+
+
+def _entities_worker(email: EmailTuple) -> Tuple[Hashable, ExtractedEntity]:
+    email_id, subject, body, sender, _ = email
+    return email_id, extract_entities_with_rules(subject or "", body or "", sender or "")
+
+
+def _run(worker, emails: Sequence[EmailTuple], processes: Optional[int]) -> Dict[Hashable, Any]:
+    processes = processes or settings.EXTRACTION_PROCESSES
+    if processes <= 1 or len(emails) < settings.EXTRACTION_POOL_MIN_BATCH:
+        return dict(map(worker, emails))
+
+    # Des paquets de plusieurs emails par envoi amortissent la sérialisation
+    chunksize = max(1, len(emails) // (processes * 4))
+    return dict(_get_pool(processes).map(worker, emails, chunksize=chunksize))
+
+
+def extract_application_fields_batch(
+    emails: Sequence[EmailTuple],
+    processes: Optional[int] = None
+) -> Dict[Hashable, Dict[str, Any]]:
+    """
+    Informations de candidature (voir rule_extractor) pour un lot d'emails, par id
+    """
+    return _run(_application_fields_worker, emails, processes)
+
+
+def extract_entities_batch(
+    emails: Sequence[EmailTuple],
+    processes: Optional[int] = None
+) -> Dict[Hashable, ExtractedEntity]:
+    """
+    Entités extraites par règles (EmailExtractionService) pour un lot d'emails, par id
+    """
+    return _run(_entities_worker, emails, processes)
+
+
+def email_tuples(emails: List[Any], body_attributes: Sequence[str] = ("body_text", "snippet")) -> List[EmailTuple]:
+    """
+    Convertir des emails SQLAlchemy en tuples envoyables aux workers
+
+    Args:
+        body_attributes: Attributs essayés dans l'ordre pour le corps de l'email
+    """
+    tuples = []
+    for email in emails:
+        body = None
+        for name in body_attributes:
+            # Chaque attribut n'est lu qu'une fois (body_text décompresse le corps)
+            value = getattr(email, name)
+            if value:
+                body = value
+                break
+        tuples.append((email.id, email.subject, body, email.sender, email.classification))
+    return tuples
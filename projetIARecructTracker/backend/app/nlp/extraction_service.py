@@ -6,6 +6,36 @@ from loguru import logger
 import re
 
 
+# Règles de l'extraction simple, compilées une fois à l'import
+STATUS_PATTERNS = {
+    status: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for status, patterns in {
+        'acknowledgment': [
+            r'accusé de réception', r'reçu votre candidature', r'received your application',
+            r'nous avons bien reçu', r'thank you for applying'
+        ],
+        'rejection': [
+            r'ne donnerons pas suite', r'candidature non retenue', r'not selected',
+            r'unfortunately', r'regret to inform', r'other candidates'
+        ],
+        'interview': [
+            r'entretien', r'interview', r'convocation', r'rencontrer',
+            r'meeting', r'disponibilité', r'availability'
+        ],
+        'offer': [
+            r'offre', r'proposition d\'embauche', r'offer', r'congratulations',
+            r'pleased to offer', r'job offer'
+        ]
+    }.items()
+}
+
+DATE_PATTERNS = [
+    re.compile(r'\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}'),
+    re.compile(r'\d{1,2} \w+ \d{4}'),
+    re.compile(r'\w+ \d{1,2}, \d{4}')
+]
+
+
 class ExtractedEntity(BaseModel):
     """Modèle pour les entités extraites d'un email"""
     company_name: Optional[str] = Field(None, description="Nom de l'entreprise")
@@ -62,7 +92,8 @@ class EmailExtractionService:
         self, 
         email_subject: str, 
         email_body: str, 
-        sender_email: str = ""
+        sender_email: str = "",
+        rule_extraction: Optional[ExtractedEntity] = None
     ) -> ExtractedEntity:
         """
         Extraire les entités d'un email avec Mistral AI
@@ -71,6 +102,7 @@ class EmailExtractionService:
             email_subject: Sujet de l'email
             email_body: Corps de l'email
             sender_email: Adresse de l'expéditeur
+            rule_extraction: Extraction par règles déjà calculée (traitement par lot)
             
         Returns:
             ExtractedEntity avec les informations extraites
@@ -79,7 +111,7 @@ class EmailExtractionService:
         full_text = f"Expéditeur: {sender_email}\nSujet: {email_subject}\n\nCorps:\n{email_body}"
         
         # Essayer d'abord l'extraction avec des règles simples
-        simple_extraction = self._extract_with_rules(email_subject, email_body, sender_email)
+        simple_extraction = rule_extraction or self._extract_with_rules(email_subject, email_body, sender_email)
         
         # Si les règles simples sont insuffisantes, utiliser Mistral
         if simple_extraction.confidence < 0.6:
@@ -100,74 +132,7 @@ class EmailExtractionService:
         """
         Extraction basique avec des règles regex et mots-clés
         """
-        extracted = ExtractedEntity()
-        
-        # Extraction du nom d'entreprise depuis l'email
-        if sender_email:
-            domain = sender_email.split('@')[-1].lower()
-            # Nettoyer le domaine pour obtenir le nom d'entreprise probable
-            company_guess = domain.split('.')[0]
-            if company_guess not in ['gmail', 'yahoo', 'hotmail', 'outlook']:
-                extracted.company_name = company_guess.title()
-        
-        # Extraction de mots-clés de statut
-        status_patterns = {
-            'acknowledgment': [
-                r'accusé de réception', r'reçu votre candidature', r'received your application',
-                r'nous avons bien reçu', r'thank you for applying'
-            ],
-            'rejection': [
-                r'ne donnerons pas suite', r'candidature non retenue', r'not selected',
-                r'unfortunately', r'regret to inform', r'other candidates'
-            ],
-            'interview': [
-                r'entretien', r'interview', r'convocation', r'rencontrer',
-                r'meeting', r'disponibilité', r'availability'
-            ],
-            'offer': [
-                r'offre', r'proposition d\'embauche', r'offer', r'congratulations',
-                r'pleased to offer', r'job offer'
-            ]
-        }
-        
-        full_text = f"{subject} {body}".lower()
-        detected_keywords = []
-        
-        for status, patterns in status_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, full_text, re.IGNORECASE):
-                    detected_keywords.append(status)
-                    break
-        
-        extracted.status_keywords = list(set(detected_keywords))
-        
-        # Extraction de dates (format simple)
-        date_patterns = [
-            r'\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}',
-            r'\d{1,2} \w+ \d{4}',
-            r'\w+ \d{1,2}, \d{4}'
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, full_text)
-            if match:
-                extracted.date_mentioned = match.group()
-                break
-        
-        # Calculer un score de confiance basique
-        confidence = 0.0
-        if extracted.company_name:
-            confidence += 0.3
-        if extracted.status_keywords:
-            confidence += 0.4
-        if extracted.date_mentioned:
-            confidence += 0.2
-        if sender_email and '@' in sender_email:
-            confidence += 0.1
-        
-        extracted.confidence = min(confidence, 1.0)
-        
-        return extracted
+        return extract_entities_with_rules(subject, body, sender_email)
     
     async def _extract_with_mistral(self, text: str) -> Optional[Dict[str, Any]]:
         """
@@ -207,3 +172,57 @@ class EmailExtractionService:
         merged.status_keywords = list(set(merged.status_keywords))
         
         return merged
+
+
+def extract_entities_with_rules(
+    subject: str, 
+    body: str, 
+    sender_email: str
+) -> ExtractedEntity:
+    """
+    Extraction basique avec des règles regex et mots-clés
+
+    Fonction de module (sans état) : peut être exécutée dans un processus
+    worker, voir app.nlp.extraction_pool
+    """
+    extracted = ExtractedEntity()
+    
+    # Extraction du nom d'entreprise depuis l'email
+    if sender_email:
+        domain = sender_email.split('@')[-1].lower()
+        # Nettoyer le domaine pour obtenir le nom d'entreprise probable
+        company_guess = domain.split('.')[0]
+        if company_guess not in ['gmail', 'yahoo', 'hotmail', 'outlook']:
+            extracted.company_name = company_guess.title()
+    
+    # Extraction de mots-clés de statut
+    full_text = f"{subject} {body}".lower()
+    detected_keywords = []
+    
+    for status, patterns in STATUS_PATTERNS.items():
+        if any(pattern.search(full_text) for pattern in patterns):
+            detected_keywords.append(status)
+    
+    extracted.status_keywords = list(set(detected_keywords))
+    
+    # Extraction de dates (format simple)
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(full_text)
+        if match:
+            extracted.date_mentioned = match.group()
+            break
+    
+    # Calculer un score de confiance basique
+    confidence = 0.0
+    if extracted.company_name:
+        confidence += 0.3
+    if extracted.status_keywords:
+        confidence += 0.4
+    if extracted.date_mentioned:
+        confidence += 0.2
+    if sender_email and '@' in sender_email:
+        confidence += 0.1
+    
+    extracted.confidence = min(confidence, 1.0)
+    
+    return extracted
@@ -5,8 +5,17 @@ from app.core.config import settings
 from app.models.models import Application, Email
 from sqlalchemy.orm import Session
 from loguru import logger
+from functools import lru_cache
 import re
 
+# Mots vides ignorés dans les intitulés de poste et le texte des emails
+STOP_WORDS = frozenset({
+    'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'et', 'ou', 'pour', 'dans',
+    'the', 'a', 'an', 'and', 'or', 'for', 'in', 'at', 'to', 'of', 'with'
+})
+WORD_PATTERN = re.compile(r'\b[a-zA-Z]{3,}\b')
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^a-zA-Z0-9]')
+
 def cosine_similarity_simple(a, b):
     """Simple cosine similarity calculation"""
     # Mock implementation for now
@@ -25,14 +34,19 @@ class MatchingResult(BaseModel):
 
 
 class EmailMatchingService:
-    """Service de rapprochement sémantique email ↔ candidature"""
+    """
+    Service de rapprochement sémantique email ↔ candidature
+
+    Sans état lié à une requête : une seule instance est partagée par le
+    processus (voir app.nlp.registry), la session est passée à chaque appel.
+    """
     
-    def __init__(self, db: Session):
-        self.db = db
+    def __init__(self):
         self.similarity_threshold = settings.SIMILARITY_THRESHOLD
     
     async def find_matching_applications(
         self, 
+        db: Session,
         email_subject: str,
         email_body: str,
         sender_email: str,
@@ -42,6 +56,7 @@ class EmailMatchingService:
         Trouver les candidatures correspondant à un email
         
         Args:
+            db: Session de la requête
             email_subject: Sujet de l'email
             email_body: Corps de l'email  
             sender_email: Email de l'expéditeur
@@ -51,7 +66,7 @@ class EmailMatchingService:
             Liste des candidatures correspondantes triées par score
         """
         # Récupérer toutes les candidatures actives
-        applications = self.db.query(Application).filter(
+        applications = db.query(Application).filter(
             Application.status.in_(['APPLIED', 'ACKNOWLEDGED', 'SCREENING', 'INTERVIEW'])
         ).all()
         
@@ -59,11 +74,13 @@ class EmailMatchingService:
             return []
         
         results = []
+        # Mots-clés de l'email calculés une seule fois pour toutes les candidatures
+        email_words = set(self._extract_keywords(f"{email_subject} {email_body}"))
         
         for app in applications:
             # Matching par règles simples d'abord
             rule_match = self._match_with_rules(
-                app, email_subject, email_body, sender_email, sender_domain
+                app, email_subject, email_body, sender_email, sender_domain, email_words
             )
             
             # Si le matching par règles est faible, essayer le matching sémantique
@@ -92,7 +109,8 @@ class EmailMatchingService:
         email_subject: str,
         email_body: str, 
         sender_email: str,
-        sender_domain: str = None
+        sender_domain: str = None,
+        email_words: Optional[set] = None
     ) -> MatchingResult:
         """
         Matching basé sur des règles simples
@@ -123,10 +141,11 @@ class EmailMatchingService:
         
         # 2. Correspondance intitulé de poste
         if application.job_title:
-            job_words = self._extract_keywords(application.job_title.lower())
-            email_words = self._extract_keywords(email_text)
+            job_words = _title_keywords(application.job_title.lower())
+            if email_words is None:
+                email_words = set(self._extract_keywords(email_text))
             
-            matching_words = set(job_words) & set(email_words)
+            matching_words = set(job_words) & email_words
             if matching_words:
                 word_score = len(matching_words) / len(job_words) * 0.3
                 score += word_score
@@ -207,7 +226,7 @@ class EmailMatchingService:
         Vérifier si un domaine correspond au nom d'entreprise
         """
         # Nettoyer le nom d'entreprise (enlever espaces, caractères spéciaux)
-        clean_company = re.sub(r'[^a-zA-Z0-9]', '', company_name).lower()
+        clean_company = NON_ALPHANUMERIC_PATTERN.sub('', company_name).lower()
         clean_domain = domain.lower().split('.')[0]  # Prendre seulement la partie avant le TLD
         
         # Correspondances possibles
@@ -223,24 +242,13 @@ class EmailMatchingService:
     
     def _extract_keywords(self, text: str) -> List[str]:
         """
-        Extraire les mots-clés pertinents d'un texte
+        Extraire les mots-clés pertinents d'un texte (mots d'au moins 3 caractères, hors mots vides)
         """
-        # Mots vides à ignorer
-        stop_words = {
-            'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'et', 'ou', 'pour', 'dans',
-            'the', 'a', 'an', 'and', 'or', 'for', 'in', 'at', 'to', 'of', 'with'
-        }
-        
-        # Extraire les mots (minimum 3 caractères)
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
-        
-        # Filtrer les mots vides
-        keywords = [w for w in words if w not in stop_words]
-        
-        return keywords
+        return [w for w in WORD_PATTERN.findall(text.lower()) if w not in STOP_WORDS]
     
     async def auto_link_email(
         self, 
+        db: Session,
         email: Email,
         min_confidence: float = 0.8
     ) -> Optional[str]:
@@ -248,6 +256,7 @@ class EmailMatchingService:
         Lier automatiquement un email à une candidature si la confiance est élevée
         
         Args:
+            db: Session de la requête
             email: Email à traiter
             min_confidence: Seuil minimum de confiance pour le linking automatique
             
@@ -258,8 +267,9 @@ class EmailMatchingService:
             return str(email.application_id)
         
         matches = await self.find_matching_applications(
+            db,
             email.subject or "",
-            email.snippet or email.raw_body or "",
+            email.snippet or email.body_text or "",
             email.sender or "",
         )
         
@@ -268,7 +278,7 @@ class EmailMatchingService:
             
             # Lier l'email à l'application
             email.application_id = best_match.application_id
-            self.db.commit()
+            db.commit()
             
             logger.info(f"Auto-linked email {email.id} to application {best_match.application_id} "
                        f"with confidence {best_match.confidence}")
@@ -276,3 +286,9 @@ class EmailMatchingService:
             return best_match.application_id
         
         return None
+
+
+@lru_cache(maxsize=4096)
+def _title_keywords(job_title: str) -> tuple:
+    """Mots-clés d'un intitulé de poste, mis en cache entre les emails"""
+    return tuple(w for w in WORD_PATTERN.findall(job_title) if w not in STOP_WORDS)
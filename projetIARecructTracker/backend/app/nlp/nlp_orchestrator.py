@@ -1,8 +1,10 @@
-from typing import Dict, Any, List, Optional
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.nlp.extraction_service import EmailExtractionService, ExtractedEntity
-from app.nlp.classification_service import EmailClassificationService, ClassificationResult
-from app.nlp.matching_service import EmailMatchingService, MatchingResult
+from app.nlp.extraction_service import ExtractedEntity
+from app.nlp.classification_service import ClassificationResult
+from app.nlp.matching_service import MatchingResult
 from app.models.models import Email, Application
 from loguru import logger
 
@@ -12,24 +14,79 @@ class NLPOrchestrator:
     Service orchestrateur pour tous les traitements NLP d'emails
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, services=None):
+        """
+        Args:
+            services: Services NLP partagés (app.nlp.registry.NLPServices),
+                ceux du processus par défaut
+        """
+        if services is None:
+            from app.nlp.registry import get_nlp_services
+            services = get_nlp_services()
+        
         self.db = db
-        self.extraction_service = EmailExtractionService()
-        self.classification_service = EmailClassificationService()
-        self.matching_service = EmailMatchingService(db)
+        self.extraction_service = services.extraction_service
+        self.classification_service = services.classification_service
+        self.matching_service = services.matching_service
+    
+    async def run_in_thread(self, method: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Exécuter un traitement de l'orchestrateur dans le pool de threads, avec sa
+        propre boucle d'événements : les accès à la session synchrone ne
+        bloquent pas la boucle de l'API
+        """
+        return await run_in_threadpool(lambda: asyncio.run(method(*args, **kwargs)))
+    
+    async def process_email_by_id(self, email_id) -> Optional[Dict[str, Any]]:
+        """
+        Traitement NLP complet d'un email à partir de son identifiant (None s'il n'existe pas)
+        """
+        email = self.db.query(Email).filter(Email.id == email_id).first()
+        if not email:
+            return None
+        return await self.process_email_complete(email)
+    
+    async def process_emails(
+        self,
+        emails: List[Email],
+        rule_extractions: Optional[Dict[Any, ExtractedEntity]] = None
+    ) -> Dict[str, Any]:
+        """
+        Traitement NLP complet d'un lot d'emails
+        
+        Args:
+            rule_extractions: Extractions par règles déjà calculées, par id d'email
+        """
+        rule_extractions = rule_extractions or {}
+        processed_count = 0
+        errors = []
+        
+        for email in emails:
+            try:
+                await self.process_email_complete(email, rule_extraction=rule_extractions.get(email.id))
+                processed_count += 1
+            except Exception as e:
+                errors.append(f"Email {email.id}: {str(e)}")
+        
+        return {"processed_count": processed_count, "errors": errors}
     
     async def process_email_complete(
         self, 
-        email: Email
+        email: Email,
+        rule_extraction: Optional[ExtractedEntity] = None
     ) -> Dict[str, Any]:
         """
         Traitement NLP complet d'un email
         
+        Args:
+            rule_extraction: Extraction par règles déjà calculée pour un lot
+                (voir app.nlp.extraction_pool)
+        
         Returns:
             Dictionnaire avec tous les résultats du traitement
         """
         subject = email.subject or ""
-        body = email.snippet or email.raw_body or ""
+        body = email.snippet or email.body_text or ""
         sender = email.sender or ""
         
         results = {
@@ -44,7 +101,9 @@ class NLPOrchestrator:
         try:
             # 1. Extraction d'entités
             logger.info(f"Starting NLP processing for email {email.id}")
-            extraction = await self.extraction_service.extract_entities(subject, body, sender)
+            extraction = await self.extraction_service.extract_entities(
+                subject, body, sender, rule_extraction=rule_extraction
+            )
             results["extraction"] = extraction.model_dump()
             
             # 2. Classification
@@ -56,7 +115,7 @@ class NLPOrchestrator:
             
             # 3. Matching avec candidatures existantes
             matches = await self.matching_service.find_matching_applications(
-                subject, body, sender
+                self.db, subject, body, sender
             )
             results["matching"] = [m.model_dump() for m in matches]
             
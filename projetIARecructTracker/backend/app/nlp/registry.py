@@ -0,0 +1,55 @@
+"""
+Registre des services NLP partagés par le processus
+
+Les services d'extraction, de classification et de matching sont construits
+une seule fois (règles compilées, schémas, caches, modèles) au démarrage de
+l'API ou au premier usage dans un worker, puis réutilisés par toutes les
+requêtes. Seule la session de base de données change d'un appel à l'autre.
+"""
+import threading
+from typing import Optional
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.nlp.classification_service import EmailClassificationService
+from app.nlp.extraction_service import EmailExtractionService
+from app.nlp.matching_service import EmailMatchingService
+from app.nlp.nlp_orchestrator import NLPOrchestrator
+from loguru import logger
+
+
+class NLPServices:
+    """Instances partagées des services NLP"""
+
+    def __init__(self):
+        self.extraction_service = EmailExtractionService()
+        self.classification_service = EmailClassificationService()
+        self.matching_service = EmailMatchingService()
+
+    def orchestrator(self, db: Session) -> NLPOrchestrator:
+        """Orchestrateur léger lié à une session, réutilisant les services partagés"""
+        return NLPOrchestrator(db, services=self)
+
+
+_services: Optional[NLPServices] = None
+_services_lock = threading.Lock()
+
+
+def init_nlp_services() -> NLPServices:
+    """Construire les services (au démarrage de l'API)"""
+    global _services
+    with _services_lock:
+        if _services is None:
+            _services = NLPServices()
+            logger.info("NLP services initialized")
+        return _services
+
+
+def get_nlp_services() -> NLPServices:
+    """Services partagés, construits au premier appel hors de l'API (workers, scheduler)"""
+    return _services or init_nlp_services()
+
+
+def get_nlp_orchestrator(db: Session = Depends(get_db)) -> NLPOrchestrator:
+    """Dépendance FastAPI : orchestrateur lié à la session de la requête"""
+    return get_nlp_services().orchestrator(db)
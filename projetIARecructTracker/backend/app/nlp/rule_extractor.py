@@ -0,0 +1,288 @@
+"""
+Extraction par règles des informations de candidature d'un email
+
+Le texte est mis en minuscules une seule fois par email et toutes les
+expressions régulières sont compilées à l'import. Pour chaque champ, les motifs
+sont essayés dans l'ordre et la recherche s'arrête au premier qui correspond.
+
+Regrouper les motifs d'un champ en une seule alternative a été mesuré plus lent
+avec le moteur `re` de CPython (perte de l'optimisation sur préfixe littéral) :
+voir benchmark_extraction.py.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional, Pattern, Sequence, Tuple, Union
+from app.models.schemas import ApplicationStatus, EmailClassification
+
+# Motif compilé et littéraux dont l'un doit être présent pour qu'il puisse correspondre
+RulePattern = Tuple[Pattern, Tuple[str, ...]]
+
+GENERIC_EMAIL_DOMAINS = {'gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com'}
+
+MONTHS = {
+    'janvier': 1, 'février': 2, 'mars': 3, 'avril': 4,
+    'mai': 5, 'juin': 6, 'juillet': 7, 'août': 8,
+    'septembre': 9, 'octobre': 10, 'novembre': 11, 'décembre': 12
+}
+
+# Mots-clés détectés par simple présence dans le texte (en minuscules)
+KEYWORD_GROUPS: Dict[str, Sequence[str]] = {
+    "outgoing_application": ['votre candidature', 'votre cv', 'candidature envoyée'],
+    "rejected": ['rejeté', 'refusé', 'pas retenu', 'n\'avons pas'],
+    "interview": ['entretien', 'interview', 'rencontre', 'rendez-vous'],
+    "offer": ['offre', 'proposition', 'contrat'],
+    "acknowledged": ['reçu', 'accusé', 'bien reçue'],
+    "urgent": ['urgent', 'rapidement', 'dès que possible', 'immédiatement'],
+    "high": ['bientôt', 'prochainement', 'dans les plus brefs délais'],
+}
+
+TECH_KEYWORDS = [
+    'python', 'java', 'javascript', 'react', 'angular', 'vue', 'node.js',
+    'machine learning', 'ia', 'intelligence artificielle', 'data science',
+    'sql', 'postgresql', 'mongodb', 'aws', 'azure', 'docker', 'kubernetes',
+    'agile', 'scrum', 'devops', 'ci/cd', 'git'
+]
+
+
+def _compile_all(patterns: Sequence[Union[str, Tuple[str, Tuple[str, ...]]]]) -> Tuple[RulePattern, ...]:
+    """
+    Compiler une liste de motifs. Un motif peut être accompagné de littéraux
+    dont l'un au moins doit figurer dans le texte : ce pré-filtre (recherche de
+    sous-chaîne) évite d'exécuter les motifs sans préfixe littéral, coûteux,
+    sur les textes qui ne peuvent pas correspondre.
+    """
+    compiled = []
+    for pattern in patterns:
+        regex, required = pattern if isinstance(pattern, tuple) else (pattern, ())
+        compiled.append((re.compile(regex), required))
+    return tuple(compiled)
+
+
+COMPANY_PATTERNS = _compile_all([
+    r"équipe (\w+)",
+    r"société (\w+)",
+    r"entreprise (\w+)",
+    r"groupe (\w+)",
+    (r"(\w+) recrute", (" recrute",)),
+    r"rejoindre (\w+)",
+    r"poste chez (\w+)",
+    r"candidature (\w+)",
+])
+
+JOB_TITLE_PATTERNS = _compile_all([
+    r"poste de ([^,\.\n]+)",
+    r"poste ([^,\.\n]+)",
+    r"développeur ([^,\.\n]+)",
+    r"ingénieur ([^,\.\n]+)",
+    r"chef de projet ([^,\.\n]+)",
+    r"manager ([^,\.\n]+)",
+    r"analyste ([^,\.\n]+)",
+    r"consultant ([^,\.\n]+)",
+    r"pour le poste ([^,\.\n]+)",
+    r"offre d'emploi ([^,\.\n]+)",
+    r"candidature ([^,\.\n]+)",
+])
+JOB_TITLE_CLEANUP = re.compile(r'[^\w\s-]')
+SUBJECT_JOB_KEYWORDS = (
+    (('développeur', 'developer', 'ingénieur', 'engineer'), "Développeur"),
+    (('manager', 'chef', 'lead'), "Manager"),
+    (('analyste', 'analyst'), "Analyste"),
+)
+
+SALARY_PATTERNS = _compile_all([
+    (r'(\d+\.?\d*k?)\s*€?\s*(?:par an|annuel|k€)', ('par an', 'annuel', 'k€')),
+    r'salaire.*?(\d+\.?\d*k?)\s*€',
+    r'rémunération.*?(\d+\.?\d*k?)\s*€',
+    (r'(\d+)\s*à\s*(\d+)\s*k€', ('k€',)),
+])
+
+DATE_PATTERNS = _compile_all([
+    (r'(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})', ('/', '-')),
+    (r'(\d{1,2})\s+(' + '|'.join(MONTHS) + r')\s+(\d{4})', tuple(MONTHS)),
+])
+
+DEADLINE_DATE_PATTERNS = _compile_all([
+    r'avant le (\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',
+    r'deadline.*?(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',
+])
+DEADLINE_DAYS_PATTERN = re.compile(r'réponse.*?(\d{1,2})\s+jours?')
+
+REFERENCE_PATTERNS = _compile_all([
+    r'ref[erence]*[:\s]*([A-Za-z0-9\-_]+)',
+    r'référence[:\s]*([A-Za-z0-9\-_]+)',
+    r'job[:\s]*([A-Za-z0-9\-_]+)',
+])
+
+LOCATION_PATTERNS = _compile_all([
+    r'localisation[:\s]*([^,\.\n]+)',
+    r'lieu[:\s]*([^,\.\n]+)',
+    r'basé[e]? à ([^,\.\n]+)',
+    r'situé[e]? à ([^,\.\n]+)',
+])
+REMOTE_KEYWORDS = ('télétravail', 'remote')
+CITY_PATTERN = re.compile(r'paris|lyon|marseille|toulouse|nantes|strasbourg|bordeaux|lille')
+
+SENDER_NAME_SEPARATORS = re.compile(r'[.\-_]')
+
+
+def extract_application_fields(
+    subject: Optional[str],
+    body: Optional[str],
+    sender: Optional[str],
+    classification: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Extraire toutes les informations de candidature d'un email
+
+    Args:
+        subject: Sujet de l'email
+        body: Corps (ou extrait) de l'email
+        sender: Adresse de l'expéditeur
+        classification: Classification NLP de l'email, si connue
+    """
+    subject = subject or ""
+    sender = sender or ""
+    content = f"{subject} {body or ''}".lower()
+    sender_domain = sender.split('@')[1].lower() if '@' in sender else None
+
+    if _contains_any(content, "urgent"):
+        urgency_level = "URGENT"
+    elif _contains_any(content, "high"):
+        urgency_level = "HIGH"
+    else:
+        urgency_level = "NORMAL"
+
+    return {
+        "email_type": classification,
+        "sender_domain": sender_domain,
+        "company_name": _company_name(content, sender, sender_domain),
+        "job_title": _job_title(content, subject.lower()),
+        "detected_status": _application_status(classification, content),
+        "salary_info": _salary(content),
+        "interview_date": _interview_date(content),
+        "contact_person": _contact_person(sender),
+        "urgency_level": urgency_level,
+        "response_deadline": _deadline(content),
+        "job_reference": _job_reference(content),
+        "location": _location(content),
+        "keywords": [keyword for keyword in TECH_KEYWORDS if keyword in content]
+    }
+
+
+def _contains_any(content: str, group: str) -> bool:
+    return any(keyword in content for keyword in KEYWORD_GROUPS[group])
+
+
+def _matches(patterns: Sequence[RulePattern], content: str) -> Iterator[re.Match]:
+    """Première correspondance de chaque motif, dans l'ordre de la liste"""
+    for pattern, required in patterns:
+        if required and not any(literal in content for literal in required):
+            continue
+        match = pattern.search(content)
+        if match:
+            yield match
+
+
+def _first_match(patterns: Sequence[RulePattern], content: str) -> Optional[re.Match]:
+    return next(_matches(patterns, content), None)
+
+
+def _company_name(content: str, sender: str, sender_domain: Optional[str]) -> str:
+    match = _first_match(COMPANY_PATTERNS, content)
+    if match:
+        return match.group(1).title()
+
+    if sender_domain and sender_domain not in GENERIC_EMAIL_DOMAINS:
+        company_from_domain = sender_domain.replace('.com', '').replace('.fr', '').replace('.org', '')
+        return company_from_domain.split('.')[0].title()
+
+    sender_name = sender.split('@')[0] if '@' in sender else sender
+    return sender_name.title()
+
+
+def _job_title(content: str, subject_lower: str) -> str:
+    match = _first_match(JOB_TITLE_PATTERNS, content)
+    if match:
+        return JOB_TITLE_CLEANUP.sub('', match.group(1).strip()).title()
+
+    for keywords, job_title in SUBJECT_JOB_KEYWORDS:
+        if any(keyword in subject_lower for keyword in keywords):
+            return job_title
+    return "Poste non spécifié"
+
+
+def _application_status(classification: Optional[str], content: str) -> ApplicationStatus:
+    if classification == EmailClassification.ACK.value:
+        return ApplicationStatus.ACKNOWLEDGED
+    if classification == EmailClassification.REJECTED.value:
+        return ApplicationStatus.REJECTED
+    if classification == EmailClassification.INTERVIEW.value:
+        return ApplicationStatus.INTERVIEW
+    if classification == EmailClassification.OFFER.value:
+        return ApplicationStatus.OFFER
+    if classification == EmailClassification.REQUEST.value:
+        # Pour les demandes, déterminer s'il s'agit d'une candidature sortante
+        return ApplicationStatus.APPLIED if _contains_any(content, "outgoing_application") else ApplicationStatus.SCREENING
+
+    # Détection basée sur les mots-clés du contenu
+    for group, status in (
+        ("rejected", ApplicationStatus.REJECTED),
+        ("interview", ApplicationStatus.INTERVIEW),
+        ("offer", ApplicationStatus.OFFER),
+        ("acknowledged", ApplicationStatus.ACKNOWLEDGED),
+    ):
+        if _contains_any(content, group):
+            return status
+    return ApplicationStatus.APPLIED
+
+
+def _salary(content: str) -> Optional[str]:
+    match = _first_match(SALARY_PATTERNS, content)
+    return match.group(0) if match else None
+
+
+def _interview_date(content: str) -> Optional[datetime]:
+    for match in _matches(DATE_PATTERNS, content):
+        day, month, year = match.groups()
+        try:
+            month_number = int(month) if month.isdigit() else MONTHS.get(month, 1)
+            return datetime(int(year), month_number, int(day))
+        except ValueError:
+            continue
+    return None
+
+
+def _deadline(content: str) -> Optional[datetime]:
+    for match in _matches(DEADLINE_DATE_PATTERNS, content):
+        try:
+            return datetime(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+        except ValueError:
+            continue
+
+    match = DEADLINE_DAYS_PATTERN.search(content)
+    if match:
+        return datetime.now() + timedelta(days=int(match.group(1)))
+    return None
+
+
+def _job_reference(content: str) -> Optional[str]:
+    match = _first_match(REFERENCE_PATTERNS, content)
+    return match.group(1).upper() if match else None
+
+
+def _location(content: str) -> Optional[str]:
+    match = _first_match(LOCATION_PATTERNS, content)
+    if match:
+        return match.group(1).title()
+    if any(keyword in content for keyword in REMOTE_KEYWORDS):
+        return 'Télétravail'
+    match = CITY_PATTERN.search(content)
+    return match.group(0).title() if match else None
+
+
+def _contact_person(sender: str) -> Optional[str]:
+    if '@' in sender:
+        name_parts = SENDER_NAME_SEPARATORS.split(sender.split('@')[0])
+        if len(name_parts) >= 2:
+            return ' '.join(part.title() for part in name_parts[:2])
+    return None
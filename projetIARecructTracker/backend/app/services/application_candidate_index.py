@@ -0,0 +1,117 @@
+"""
+Index en mémoire des candidatures d'un utilisateur pour le rapprochement email -> candidature
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from app.models.models import Application
+
+# Mots trop fréquents dans les noms d'entreprise pour discriminer les candidats
+COMPANY_STOPWORDS = {"sa", "sas", "sarl", "inc", "ltd", "llc", "gmbh", "group", "groupe", "the", "de", "la", "le", "et"}
+
+# Domaines de messagerie génériques : ne permettent pas d'identifier une entreprise
+GENERIC_DOMAINS = {"gmail.com", "yahoo.com", "yahoo.fr", "hotmail.com", "hotmail.fr", "outlook.com", "outlook.fr", "live.com", "orange.fr", "free.fr"}
+
+EMAIL_DOMAIN_PATTERN = re.compile(r"@([\w.-]+\.[a-z]{2,})", re.IGNORECASE)
+
+
+def normalize_company_name(name: str) -> str:
+    """Minuscules, sans accents ni ponctuation"""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def company_tokens(normalized_name: str) -> Set[str]:
+    return {token for token in normalized_name.split() if len(token) > 1 and token not in COMPANY_STOPWORDS}
+
+
+def trigrams(normalized_name: str) -> Set[str]:
+    compact = f"  {normalized_name.replace(' ', '')} "
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+class ApplicationCandidateIndex:
+    """
+    Index construit pour un lot d'emails : tokens normalisés du nom d'entreprise,
+    trigrammes et domaines email -> candidatures.
+
+    Pour chaque email, seules quelques candidatures proches sont retournées et
+    scorées exactement, au lieu de comparer l'email à toutes les candidatures.
+    Les candidatures déjà en base sont retrouvées par l'index pg_trgm
+    (ApplicationService.find_similar_applications) ; cet index couvre celles
+    créées pendant le lot.
+    """
+
+    def __init__(self, applications: Iterable[Application] = (), max_candidates: int = 10):
+        self.max_candidates = max_candidates
+        self._applications: Dict[object, Application] = {}
+        self._by_token: Dict[str, Set[object]] = defaultdict(set)
+        self._by_trigram: Dict[str, Set[object]] = defaultdict(set)
+        self._by_domain: Dict[str, Set[object]] = defaultdict(set)
+        self._trigram_counts: Dict[object, int] = {}
+
+        for application in applications:
+            self.add(application)
+
+    def __len__(self) -> int:
+        return len(self._applications)
+
+    def add(self, application: Application):
+        """Indexer une candidature (y compris celles créées pendant le lot)"""
+        if not application.company_name:
+            return
+
+        key = application.id
+        self._applications[key] = application
+
+        normalized = normalize_company_name(application.company_name)
+        for token in company_tokens(normalized):
+            self._by_token[token].add(key)
+
+        application_trigrams = trigrams(normalized)
+        self._trigram_counts[key] = len(application_trigrams)
+        for trigram in application_trigrams:
+            self._by_trigram[trigram].add(key)
+
+        for domain in self._application_domains(application):
+            self._by_domain[domain].add(key)
+
+    def candidates(self, company_name: str, sender_domain: Optional[str] = None) -> List[Application]:
+        """
+        Candidatures proches d'un nom d'entreprise / domaine expéditeur,
+        triées par pertinence décroissante
+        """
+        normalized = normalize_company_name(company_name)
+        scores: Dict[object, float] = defaultdict(float)
+
+        # Domaine identique ou token commun : candidats forts
+        sender_domain = sender_domain.lower().strip("<> ") if sender_domain else None
+        if sender_domain and sender_domain not in GENERIC_DOMAINS:
+            for key in self._by_domain.get(sender_domain, ()):
+                scores[key] += 2.0
+        for token in company_tokens(normalized):
+            for key in self._by_token.get(token, ()):
+                scores[key] += 1.0
+
+        # Trigrammes communs (coefficient de Dice) : tolère fautes et variantes d'écriture
+        query_trigrams = trigrams(normalized)
+        shared: Dict[object, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for key in self._by_trigram.get(trigram, ()):
+                shared[key] += 1
+        for key, count in shared.items():
+            dice = 2 * count / (len(query_trigrams) + self._trigram_counts[key])
+            if dice >= 0.3:
+                scores[key] += dice
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self.max_candidates]
+        return [self._applications[key] for key in ranked]
+
+    def _application_domains(self, application: Application) -> Set[str]:
+        """Domaines connus de la candidature (contact, expéditeur de l'email d'origine)"""
+        text = " ".join(filter(None, [application.contact_email, application.source]))
+        return {
+            domain.lower() for domain in EMAIL_DOMAIN_PATTERN.findall(text)
+            if domain.lower() not in GENERIC_DOMAINS
+        }
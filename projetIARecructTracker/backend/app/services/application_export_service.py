@@ -0,0 +1,164 @@
+"""
+Export tableur des candidatures (vue « Excel intelligent » du tracker)
+
+Les candidatures sont parcourues par pagination keyset sur leur id. Pour chaque
+page, une seule requête joint aux candidatures :
+- les agrégats de leurs emails (nombre, date du dernier email) ;
+- le dernier email de chaque candidature (DISTINCT ON), pour la dernière
+  classification et le dernier expéditeur.
+Les corps des emails ne sont jamais chargés.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.models import Application, Email
+import app.models.indexes  # noqa: F401  (colonne is_auto_created)
+
+EXPORT_COLUMNS = [
+    "ID", "Entreprise", "Poste", "Statut", "Date candidature", "Dernière interaction",
+    "Nombre d'emails", "Contact", "Localisation", "Source", "Urgence", "Date entretien",
+    "Dernière classification", "Dernier expéditeur", "Notes automatiques", "Création automatique"
+]
+
+
+class ApplicationExportService:
+    """Lignes d'export des candidatures, page par page"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_page(
+        self,
+        company_filter: Optional[str] = None,
+        status_filter: Optional[str] = None,
+        user_id: Optional[UUID] = None,
+        after_id: Optional[UUID] = None,
+        limit: int = 1000
+    ) -> Tuple[List[Dict[str, Any]], Optional[UUID]]:
+        """
+        Une page de lignes d'export
+
+        Returns:
+            (lignes, id de la dernière candidature à passer en `after_id` pour la
+            page suivante, ou None s'il n'y en a plus)
+        """
+        rows = self.db.execute(self._page_statement(company_filter, status_filter, user_id, after_id, limit)).all()
+        records = [self.export_row(*row) for row in rows]
+        next_after_id = rows[-1][0].id if len(rows) == limit else None
+        return records, next_after_id
+
+    def iter_rows(
+        self,
+        company_filter: Optional[str] = None,
+        status_filter: Optional[str] = None,
+        user_id: Optional[UUID] = None,
+        page_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Toutes les lignes d'export, chargées une page à la fois"""
+        after_id = None
+        while True:
+            records, after_id = self.get_page(company_filter, status_filter, user_id, after_id, page_size)
+            yield from records
+            if after_id is None:
+                return
+            # Les candidatures de la page précédente ne sont plus utiles
+            self.db.expunge_all()
+
+    @staticmethod
+    def stream_rows(
+        company_filter: Optional[str] = None,
+        status_filter: Optional[str] = None,
+        user_id: Optional[UUID] = None,
+        page_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Comme iter_rows, sur une session dédiée fermée à la fin du parcours :
+        la session de la requête peut être libérée avant la fin d'une réponse en flux
+        """
+        db = SessionLocal()
+        try:
+            yield from ApplicationExportService(db).iter_rows(company_filter, status_filter, user_id, page_size)
+        finally:
+            db.close()
+
+    def _page_statement(
+        self,
+        company_filter: Optional[str],
+        status_filter: Optional[str],
+        user_id: Optional[UUID],
+        after_id: Optional[UUID],
+        limit: int
+    ):
+        page_ids = select(Application.id)
+        if company_filter:
+            page_ids = page_ids.where(Application.company_name.ilike(f"%{company_filter}%"))
+        if status_filter:
+            page_ids = page_ids.where(Application.status == status_filter)
+        if user_id is not None:
+            page_ids = page_ids.where(Application.user_id == user_id)
+        if after_id is not None:
+            page_ids = page_ids.where(Application.id > after_id)
+        page_ids = page_ids.order_by(Application.id).limit(limit).cte("page_ids")
+
+        in_page = Email.application_id.in_(select(page_ids.c.id))
+
+        email_stats = select(
+            Email.application_id,
+            func.count(Email.id).label("email_count"),
+            func.max(Email.sent_at).label("last_email_at")
+        ).where(in_page).group_by(Email.application_id).subquery("email_stats")
+
+        # Dernier email de chaque candidature (index emails(application_id, sent_at DESC))
+        latest_email = select(
+            Email.application_id,
+            Email.classification,
+            Email.sender
+        ).where(in_page).distinct(Email.application_id).order_by(
+            Email.application_id, Email.sent_at.desc().nulls_last()
+        ).subquery("latest_email")
+
+        return (
+            select(
+                Application,
+                email_stats.c.email_count,
+                email_stats.c.last_email_at,
+                latest_email.c.classification,
+                latest_email.c.sender
+            )
+            .join(page_ids, page_ids.c.id == Application.id)
+            .outerjoin(email_stats, email_stats.c.application_id == Application.id)
+            .outerjoin(latest_email, latest_email.c.application_id == Application.id)
+            .order_by(Application.id)
+        )
+
+    @staticmethod
+    def export_row(
+        app: Application,
+        email_count: Optional[int],
+        last_email_at: Optional[datetime],
+        latest_classification: Optional[str],
+        latest_sender: Optional[str]
+    ) -> Dict[str, Any]:
+        """Ligne d'export d'une candidature (colonnes EXPORT_COLUMNS)"""
+        last_interaction = last_email_at or app.created_at
+        return {
+            "ID": app.id,
+            "Entreprise": app.company_name,
+            "Poste": app.job_title,
+            "Statut": app.status,
+            "Date candidature": app.created_at.strftime("%d/%m/%Y"),
+            "Dernière interaction": last_interaction.strftime("%d/%m/%Y"),
+            "Nombre d'emails": email_count or 0,
+            "Contact": app.contact_person or "Non renseigné",
+            "Localisation": app.location or "Non renseignée",
+            "Source": app.source,
+            "Urgence": getattr(app, 'urgency_level', 'NORMAL'),
+            "Date entretien": app.interview_date.strftime("%d/%m/%Y") if app.interview_date else None,
+            "Dernière classification": latest_classification,
+            "Dernier expéditeur": latest_sender,
+            "Notes automatiques": app.notes[:100] + "..." if app.notes and len(app.notes) > 100 else app.notes,
+            "Création automatique": "Oui" if app.is_auto_created else "Non"
+        }
@@ -0,0 +1,184 @@
+"""
+Insights des candidatures : métriques calculées en SQL et mises en cache
+
+Les écarts entre emails consécutifs sont calculés par lag() sur les emails
+triés par date d'envoi, puis agrégés (nombre, moyenne, médiane) et stockés dans
+application_insights. Un écouteur `after_flush` recalcule le cache des
+candidatures dont un email a été rattaché, détaché ou redaté, dans la même
+transaction. Les écritures en masse qui échappent à l'écouteur sont couvertes
+par un recalcul à la lecture quand la ligne de cache manque.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+from sqlalchemy import event, extract, func, inspect, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, load_only
+from app.models.application_insights import ApplicationInsight
+from app.models.models import Application, Email
+
+# Sans nouvelles au-delà de ce délai, une relance est recommandée
+FOLLOW_UP_AFTER_DAYS = 7
+CLOSED_STATUSES = ("REJECTED", "ACCEPTED")
+
+
+def _affected_application_ids(email: Email, include_current: bool) -> Set[UUID]:
+    """Candidatures dont les métriques dépendent de l'email, avant et après le flush"""
+    history = inspect(email).attrs.application_id.history
+    ids = {*history.added, *history.deleted, *history.unchanged}
+    if include_current:
+        ids.add(email.application_id)
+    return {application_id for application_id in ids if application_id}
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_insights(session: Session, flush_context):
+    """Recalculer les insights des candidatures touchées par le flush"""
+    application_ids = set()
+
+    for obj in session.new:
+        if isinstance(obj, Email):
+            application_ids |= _affected_application_ids(obj, include_current=True)
+
+    for obj in session.deleted:
+        if isinstance(obj, Email):
+            application_ids |= _affected_application_ids(obj, include_current=False)
+
+    for obj in session.dirty:
+        if isinstance(obj, Email):
+            state = inspect(obj)
+            if state.attrs.application_id.history.has_changes() or state.attrs.sent_at.history.has_changes():
+                application_ids |= _affected_application_ids(obj, include_current=True)
+
+    if application_ids:
+        ApplicationInsightsService.refresh(session.connection(), application_ids)
+
+
+class ApplicationInsightsService:
+    """Lecture et recalcul des insights d'une candidature"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def refresh_statement(application_ids: Iterable[UUID]):
+        """
+        Upsert des métriques des candidatures données, en une requête
+
+        Les candidatures sans email obtiennent une ligne à zéro.
+        """
+        application_ids = list(application_ids)
+        gaps = select(
+            Email.id,
+            Email.application_id,
+            Email.sent_at,
+            (
+                extract(
+                    "epoch",
+                    Email.sent_at - func.lag(Email.sent_at).over(
+                        partition_by=Email.application_id, order_by=Email.sent_at
+                    )
+                ) / 86400.0
+            ).label("gap_days")
+        ).where(Email.application_id.in_(application_ids)).subquery("gaps")
+
+        metrics = select(
+            Application.id,
+            func.count(gaps.c.id),
+            func.min(gaps.c.sent_at),
+            func.max(gaps.c.sent_at),
+            func.avg(gaps.c.gap_days),
+            func.percentile_cont(0.5).within_group(gaps.c.gap_days),
+            literal(datetime.utcnow())
+        ).select_from(Application).outerjoin(
+            gaps, gaps.c.application_id == Application.id
+        ).where(Application.id.in_(application_ids)).group_by(Application.id)
+
+        columns = [
+            "application_id", "email_count", "first_email_at", "last_email_at",
+            "avg_response_gap_days", "median_response_gap_days", "computed_at"
+        ]
+        stmt = pg_insert(ApplicationInsight).from_select(columns, metrics)
+        return stmt.on_conflict_do_update(
+            index_elements=[ApplicationInsight.application_id],
+            set_={column: stmt.excluded[column] for column in columns[1:]}
+        )
+
+    @classmethod
+    def refresh(cls, connection, application_ids: Iterable[UUID]):
+        # Ordre stable des verrous de lignes entre transactions concurrentes
+        connection.execute(cls.refresh_statement(sorted(application_ids, key=str)))
+
+    def get_metrics(self, application_id: UUID) -> ApplicationInsight:
+        """Métriques en cache, recalculées si la ligne manque"""
+        insight = self.db.get(ApplicationInsight, application_id)
+        if insight is None:
+            self.refresh(self.db.connection(), [application_id])
+            self.db.commit()
+            insight = self.db.get(ApplicationInsight, application_id)
+        return insight
+
+    def get_timeline(self, application_id: UUID) -> List[Dict[str, Any]]:
+        """Emails liés par date d'envoi croissante, sans charger les corps"""
+        emails = self.db.execute(
+            select(Email)
+            .options(load_only(Email.sent_at, Email.subject, Email.sender, Email.classification, Email.snippet))
+            .where(Email.application_id == application_id)
+            .order_by(Email.sent_at.asc().nulls_last())
+        ).scalars().all()
+        return [
+            {
+                "date": email.sent_at.isoformat() if email.sent_at else None,
+                "subject": email.subject,
+                "sender": email.sender,
+                "classification": email.classification,
+                "snippet": email.snippet[:100] if email.snippet else None
+            }
+            for email in emails
+        ]
+
+    @staticmethod
+    def recommendations(application: Application, days_since_last: Optional[int]) -> List[Dict[str, str]]:
+        recommendations = []
+
+        # Si pas de réponse depuis longtemps
+        if days_since_last is not None and days_since_last > FOLLOW_UP_AFTER_DAYS and application.status not in CLOSED_STATUSES:
+            recommendations.append({
+                "type": "follow_up",
+                "message": f"Aucune nouvelle depuis {days_since_last} jours. Considérer un suivi.",
+                "priority": "medium"
+            })
+
+        # Si entretien programmé mais pas de date
+        if application.status == 'INTERVIEW' and not application.interview_date:
+            recommendations.append({
+                "type": "missing_date",
+                "message": "Statut entretien détecté mais aucune date programmée.",
+                "priority": "high"
+            })
+
+        return recommendations
+
+    def get_insights(self, application: Application) -> Dict[str, Any]:
+        insight = self.get_metrics(application.id)
+        days_since_last = (datetime.utcnow() - insight.last_email_at).days if insight.last_email_at else None
+
+        return {
+            "application": {
+                "id": application.id,
+                "job_title": application.job_title,
+                "company_name": application.company_name,
+                "status": application.status,
+                "created_date": application.created_at.isoformat(),
+                "last_update": application.updated_at.isoformat()
+            },
+            "email_count": insight.email_count,
+            "email_timeline": self.get_timeline(application.id),
+            "metrics": {
+                "average_response_time_days": round(insight.avg_response_gap_days or 0, 1),
+                "median_response_time_days": round(insight.median_response_gap_days or 0, 1),
+                "total_interactions": insight.email_count,
+                "days_since_last_contact": days_since_last
+            },
+            "recommendations": self.recommendations(application, days_since_last)
+        }
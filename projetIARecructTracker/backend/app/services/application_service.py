@@ -1,8 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy import func, text
+from typing import List, Optional, Tuple
 from uuid import UUID
+from app.core.config import settings
+from app.core.pagination import CursorKey, after_key, sort_key
 from app.models.models import Application, ApplicationEvent
+from app.models.indexes import search_query
+from app.services.user_stats_service import UserStatsService
 from app.models.schemas import (
     ApplicationCreate, ApplicationUpdate, ApplicationStatus,
     ApplicationEventCreate, EventType
@@ -11,8 +15,23 @@ from datetime import datetime, timedelta
 
 
 class ApplicationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, autocommit: bool = True):
+        """
+        Args:
+            autocommit: si False (unité de travail), les modifications sont seulement
+                envoyées à la base (flush) ; l'appelant décide quand valider la transaction
+        """
         self.db = db
+        self.autocommit = autocommit
+
+    def _save(self, instance=None):
+        """Valider la transaction, ou seulement flusher en mode unité de travail"""
+        if self.autocommit:
+            self.db.commit()
+            if instance is not None:
+                self.db.refresh(instance)
+        else:
+            self.db.flush()
 
     def get_applications(
         self, 
@@ -21,10 +40,14 @@ class ApplicationService:
         limit: int = 50, 
         status: Optional[str] = None,
         company: Optional[str] = None,
-        search_query: Optional[str] = None
+        search_text: Optional[str] = None,
+        after: Optional[CursorKey] = None
     ) -> List[Application]:
         """
         Récupérer les candidatures avec filtres optionnels pour un utilisateur spécifique
+
+        Tri par (updated_at, id) décroissants. Avec `after` (clé du dernier élément
+        de la page précédente), la page reprend après cette clé et `skip` est ignoré.
         """
         query = self.db.query(Application).filter(Application.user_id == user_id)
         
@@ -34,14 +57,65 @@ class ApplicationService:
         if company:
             query = query.filter(Application.company_name.ilike(f"%{company}%"))
             
-        if search_query:
-            query = query.filter(
-                (Application.job_title.ilike(f"%{search_query}%")) |
-                (Application.company_name.ilike(f"%{search_query}%")) |
-                (Application.notes.ilike(f"%{search_query}%"))
-            )
+        if search_text:
+            # Recherche plein texte (index GIN sur la colonne générée search_vector)
+            query = query.filter(Application.search_vector.op("@@")(search_query(search_text)))
+        
+        if after is not None:
+            # Parcours de l'index (user_id, coalesce(updated_at) DESC, id DESC) à partir de la clé
+            query = query.filter(after_key(Application.updated_at, Application.id, after))
+        else:
+            query = query.offset(skip)
+        
+        return query.order_by(sort_key(Application.updated_at).desc(), Application.id.desc()).limit(limit).all()
+
+    def search_applications(self, user_id: UUID, text: str, limit: int = 20) -> List[Tuple[Application, float]]:
+        """
+        Candidatures de l'utilisateur correspondant à une recherche plein texte,
+        triées par pertinence (ts_rank_cd, l'intitulé et l'entreprise pesant plus que les notes)
+        """
+        tsquery = search_query(text)
+        rank = func.ts_rank_cd(Application.search_vector, tsquery).label("rank")
+        
+        rows = self.db.query(Application, rank).filter(
+            Application.user_id == user_id,
+            Application.search_vector.op("@@")(tsquery)
+        ).order_by(rank.desc(), Application.updated_at.desc()).limit(limit).all()
+        
+        return [(application, float(application_rank)) for application, application_rank in rows]
+
+    def find_similar_applications(
+        self,
+        company_name: str,
+        user_id: UUID,
+        job_title: Optional[str] = None,
+        threshold: Optional[float] = None,
+        limit: int = 5
+    ) -> List[Tuple[Application, float]]:
+        """
+        Candidatures de l'utilisateur dont le nom d'entreprise est proche (pg_trgm)
+
+        Le filtre `company_name % :name` s'appuie sur l'index GIN trigramme ;
+        le score combine la similarité entreprise (70%) et poste (30%) quand
+        un intitulé de poste est fourni.
+        """
+        # Seuil de l'opérateur %, limité à la transaction courante
+        self.db.execute(
+            text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+            {"threshold": str(threshold or settings.COMPANY_MATCH_THRESHOLD)}
+        )
         
-        return query.order_by(Application.updated_at.desc()).offset(skip).limit(limit).all()
+        score = func.similarity(Application.company_name, company_name)
+        if job_title:
+            score = score * 0.7 + func.coalesce(func.similarity(Application.job_title, job_title), 0) * 0.3
+        score = score.label("score")
+        
+        rows = self.db.query(Application, score).filter(
+            Application.user_id == user_id,
+            Application.company_name.op("%")(company_name)
+        ).order_by(score.desc()).limit(limit).all()
+        
+        return [(application, float(application_score)) for application, application_score in rows]
 
     def create_application(self, application: ApplicationCreate, user_id: UUID) -> Application:
         """
@@ -75,8 +149,7 @@ class ApplicationService:
         )
         
         self.db.add(db_application)
-        self.db.commit()
-        self.db.refresh(db_application)
+        self._save(db_application)
         
         # Créer un événement pour la création
         self._create_event(
@@ -117,8 +190,7 @@ class ApplicationService:
             setattr(db_application, field, value)
         
         db_application.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(db_application)
+        self._save(db_application)
         
         # Créer un événement si le statut a changé
         if "status" in update_data and previous_status != db_application.status:
@@ -146,7 +218,7 @@ class ApplicationService:
             return False
         
         self.db.delete(db_application)
-        self.db.commit()
+        self._save()
         return True
 
     def get_application_events(self, application_id: UUID, user_id: UUID):
@@ -176,28 +248,26 @@ class ApplicationService:
             for event in events
         ]
 
-    def get_applications_summary(self):
-        """
-        Récupérer un résumé statistique des candidatures
+    def get_applications_summary(self, user_id: UUID):
         """
-        # Comptage par statut
-        status_counts = self.db.query(
-            Application.status,
-            func.count(Application.id).label('count')
-        ).group_by(Application.status).all()
+        Récupérer un résumé statistique des candidatures de l'utilisateur
         
-        # Total des candidatures
-        total = self.db.query(func.count(Application.id)).scalar()
+        Total et répartition par statut viennent des compteurs matérialisés ;
+        seules les actions en retard, qui dépendent de l'heure, sont comptées
+        à la demande (sur les candidatures de l'utilisateur uniquement).
+        """
+        counters = UserStatsService(self.db).get_counters(user_id)
         
         # Candidatures avec prochaine action en retard
         overdue_count = self.db.query(func.count(Application.id))\
-            .filter(Application.next_action_at < datetime.utcnow())\
+            .filter(Application.user_id == user_id)\
             .filter(Application.status.in_(['APPLIED', 'ACKNOWLEDGED', 'SCREENING']))\
+            .filter(Application.next_action_at < datetime.utcnow())\
             .scalar()
         
         return {
-            "total": total,
-            "status_breakdown": {status: count for status, count in status_counts},
+            "total": counters.get("applications.total", 0),
+            "status_breakdown": UserStatsService.breakdown(counters, "applications.status"),
             "overdue_actions": overdue_count
         }
 
@@ -211,4 +281,4 @@ class ApplicationService:
             payload=payload
         )
         self.db.add(event)
-        self.db.commit()
+        self._save()
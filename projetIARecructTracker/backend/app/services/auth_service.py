@@ -1,22 +1,24 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import delete, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.models.models import User
+from app.models.revoked_tokens import RevokedToken
+from app.services.password_hashing import hash_password, verify_and_update
 from app.models.schemas import UserCreate
 
-# Utiliser scrypt qui n'a pas de limite de longueur pour éviter les problèmes bcrypt
-pwd_context = CryptContext(schemes=["scrypt"], deprecated="auto")
-
 def get_password_hash(password: str) -> str:
-    """Hasher un mot de passe avec scrypt"""
-    return pwd_context.hash(password)
+    """Hasher un mot de passe avec scrypt (pool de hachage borné)"""
+    return hash_password(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Vérifier un mot de passe avec scrypt"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Vérifier un mot de passe avec scrypt (pool de hachage borné)"""
+    valid, _ = verify_and_update(plain_password, hashed_password)
+    return valid
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Créer un token JWT"""
@@ -26,7 +28,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(hours=settings.JWT_EXPIRATION_HOURS)
     
-    to_encode.update({"exp": expire})
+    # Identifiant unique du token, permettant de le révoquer à la déconnexion
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
@@ -42,6 +45,36 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Récupérer un utilisateur par email"""
     return db.query(User).filter(User.email == email).first()
 
+def get_user_for_token(db: Session, payload: dict) -> Optional[User]:
+    """
+    Utilisateur d'un token décodé, par clé primaire, si le token n'a pas été révoqué
+
+    Les tokens émis sans `user_id` ou sans `jti` sont résolus par email, sans
+    contrôle de révocation.
+    """
+    user_id = payload.get("user_id")
+    if user_id is None:
+        email = payload.get("sub")
+        return get_user_by_email(db, email) if email else None
+
+    query = db.query(User).filter(User.id == uuid.UUID(user_id))
+    jti = payload.get("jti")
+    if jti:
+        query = query.filter(~exists().where(RevokedToken.jti == jti))
+    return query.first()
+
+def revoke_token(db: Session, payload: dict):
+    """Révoquer un token jusqu'à son expiration, et purger les révocations expirées"""
+    jti = payload.get("jti")
+    if not jti:
+        return
+    expires_at = datetime.utcfromtimestamp(payload["exp"])
+    db.execute(
+        pg_insert(RevokedToken).values(jti=jti, expires_at=expires_at).on_conflict_do_nothing()
+    )
+    db.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow()))
+    db.commit()
+
 def create_user(db: Session, user: UserCreate) -> User:
     """Créer un nouvel utilisateur"""
     hashed_password = get_password_hash(user.password)
@@ -60,6 +93,11 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     user = get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = verify_and_update(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Paramètres scrypt modifiés depuis la création du hash : mise à niveau transparente
+        user.hashed_password = new_hash
+        db.commit()
     return user
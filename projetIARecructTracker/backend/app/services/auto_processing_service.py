@@ -0,0 +1,75 @@
+"""
+Traitement automatique périodique : synchronisation incrémentale des emails
+d'un utilisateur puis mise à jour de ses candidatures
+"""
+import asyncio
+from datetime import timedelta
+from typing import Any, Dict
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import Email, User
+from app.services.email_ingestion import EmailIngestionService
+from app.services.gmail_api_service import GmailAPIService
+from app.services.intelligent_application_tracker import IntelligentApplicationTracker
+from app.services.job_queue import JobQueue
+from loguru import logger
+
+
+class AutoProcessingService:
+    """
+    Exécute un cycle de traitement automatique pour un utilisateur :
+    1. synchronisation Gmail incrémentale (depuis le dernier email connu)
+    2. ingestion IMAP des comptes rattachés à l'utilisateur
+    3. planification de l'analyse NLP des nouveaux emails
+    4. création / mise à jour des candidatures à partir des emails déjà classifiés
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def run_for_user(self, user: User) -> Dict[str, Any]:
+        results = {"user_id": str(user.id), "gmail_synced": 0, "imap_saved": 0, "analysis_jobs": 0}
+        new_email_ids = []
+
+        if user.gmail_connected:
+            try:
+                sync_result = asyncio.run(
+                    GmailAPIService(self.db).sync_emails_from_gmail(user, since=self._last_gmail_email_date(user))
+                )
+                new_email_ids.extend(sync_result["email_ids"])
+                results["gmail_synced"] = sync_result["synced_emails"]
+            except Exception as e:
+                logger.error(f"Gmail sync failed for user {user.id}: {e}")
+                results["gmail_error"] = str(e)
+
+        ingestion_service = EmailIngestionService(self.db)
+        if any(account.user_id == user.id for account in ingestion_service.get_accounts()):
+            try:
+                emails = ingestion_service.fetch_all_accounts(days_back=1, user_id=user.id)
+                imap_ids = ingestion_service.bulk_save_emails_to_db(emails)
+                new_email_ids.extend(imap_ids)
+                results["imap_saved"] = len(imap_ids)
+            except Exception as e:
+                logger.error(f"IMAP ingestion failed for user {user.id}: {e}")
+                results["imap_error"] = str(e)
+
+        if new_email_ids:
+            results["analysis_jobs"] = JobQueue(self.db).enqueue_email_analysis(new_email_ids, user_id=user.id)
+
+        tracker = IntelligentApplicationTracker(self.db)
+        batch_results = tracker.process_email_batch(user_id=user.id, limit=settings.AUTO_PROCESS_BATCH_LIMIT)
+        results["processed_emails"] = batch_results["processed_emails"]
+        results["created_applications"] = batch_results["created_applications"]
+        results["updated_applications"] = batch_results["updated_applications"]
+
+        logger.info(f"Auto-processing done for user {user.id}: {results}")
+        return results
+
+    def _last_gmail_email_date(self, user: User):
+        """Date du dernier email Gmail connu (avec une marge pour les emails arrivés en retard)"""
+        last_sent_at = self.db.query(func.max(Email.sent_at)).filter(
+            Email.user_id == user.id,
+            Email.gmail_message_id.isnot(None)
+        ).scalar()
+        return last_sent_at - timedelta(hours=1) if last_sent_at else None
@@ -0,0 +1,159 @@
+"""
+Écriture et migration des corps d'emails vers le stockage compressé (email_bodies)
+"""
+import hashlib
+import zlib
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, exists, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.core.database import lift_statement_timeout
+from app.models.email_bodies import CODEC_ZLIB, EmailBody
+from app.models.indexes import SEARCH_BODY_MAX_CHARS, search_vector_value
+from app.models.models import Email
+from app.services.mime_body import html_to_text
+from loguru import logger
+
+# Compromis vitesse / taux pour du texte d'email (écrit une fois, lu rarement)
+COMPRESSION_LEVEL = 6
+
+# Verrou consultatif PostgreSQL entre les écritures (partagé, jusqu'à la fin de
+# leur transaction) et la suppression des textes orphelins (exclusif) : un texte
+# déjà stocké n'est ni réécrit ni verrouillé par ON CONFLICT DO NOTHING, il ne
+# doit pas être supprimé avant l'insertion de l'email qui le référence
+BODY_STORE_LOCK_KEY = zlib.crc32(b"email-bodies") - 2 ** 31
+
+
+class EmailBodyStore:
+    """Stockage adressé par contenu des textes volumineux des emails"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def store_many(self, texts: Iterable[Optional[str]], searchable: bool = False) -> List[Optional[str]]:
+        """
+        Stocker des textes (compressés, sans doublon) et renvoyer leurs empreintes
+
+        Les textes vides donnent None. Les textes déjà stockés ne sont pas
+        réécrits. Les lignes sont insérées dans la transaction courante, qui
+        doit aussi insérer les emails référençant les empreintes renvoyées.
+
+        Args:
+            searchable: Indexer les textes pour la recherche plein texte (corps
+                des emails), y compris ceux déjà stockés sans index
+        """
+        digests = []
+        rows: Dict[str, dict] = {}
+        for value in texts:
+            if not value:
+                digests.append(None)
+                continue
+            encoded = value.encode("utf-8")
+            digest = hashlib.sha256(encoded).hexdigest()
+            digests.append(digest)
+            if digest not in rows:
+                rows[digest] = {
+                    "digest": digest,
+                    "codec": CODEC_ZLIB,
+                    "data": zlib.compress(encoded, COMPRESSION_LEVEL),
+                    "size": len(encoded)
+                }
+                if searchable:
+                    rows[digest]["search_vector"] = search_vector_value(value[:SEARCH_BODY_MAX_CHARS], "D")
+
+        if rows:
+            self.db.execute(text("SELECT pg_advisory_xact_lock_shared(:key)"), {"key": BODY_STORE_LOCK_KEY})
+            # Ordre stable des insertions entre transactions concurrentes
+            stmt = pg_insert(EmailBody).values([rows[digest] for digest in sorted(rows)])
+            if searchable:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[EmailBody.digest],
+                    set_={"search_vector": stmt.excluded.search_vector},
+                    where=EmailBody.search_vector.is_(None)
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=[EmailBody.digest])
+            self.db.execute(stmt)
+        return digests
+
+    def store(self, text: Optional[str], searchable: bool = False) -> Optional[str]:
+        return self.store_many([text], searchable)[0]
+
+    def migrate_inline_bodies(self, batch_size: int = 500) -> int:
+        """
+        Déplacer les corps et en-têtes encore stockés dans la table emails
+
+        Traité par lots validés un à un (SKIP LOCKED : plusieurs migrations
+        peuvent tourner en parallèle). Le corps HTML n'est conservé que converti
+        en texte, quand il n'y a pas de corps texte. L'espace libéré est rendu
+        par le VACUUM de la table emails.
+
+        Returns:
+            Nombre d'emails migrés
+        """
+        migrated = 0
+        while True:
+            # Un lot (recherche des emails à migrer, compression) peut dépasser
+            # la durée maximale des requêtes de l'API
+            lift_statement_timeout(self.db)
+            emails = self.db.execute(
+                select(Email.id, Email.raw_body, Email.html_body, Email.raw_headers)
+                .where(or_(
+                    Email.raw_body.isnot(None),
+                    Email.html_body.isnot(None),
+                    Email.raw_headers.isnot(None)
+                ))
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not emails:
+                return migrated
+
+            bodies = [row.raw_body or (html_to_text(row.html_body) if row.html_body else None) for row in emails]
+            body_digests = self.store_many(bodies, searchable=True)
+            header_digests = self.store_many(row.raw_headers for row in emails)
+
+            for row, body_digest_value, headers_digest_value in zip(emails, body_digests, header_digests):
+                self.db.execute(
+                    update(Email).where(Email.id == row.id).values(
+                        body_digest=body_digest_value,
+                        headers_digest=headers_digest_value,
+                        raw_body=None,
+                        html_body=None,
+                        raw_headers=None
+                    )
+                )
+            self.db.commit()
+            migrated += len(emails)
+            logger.info(f"Migrated {migrated} email bodies to compressed storage")
+
+    def delete_orphans(self, batch_size: int = 1000) -> int:
+        """
+        Supprimer les textes qui ne sont plus référencés par aucun email
+
+        Chaque lot est supprimé sous le verrou exclusif BODY_STORE_LOCK_KEY :
+        il attend la fin des transactions d'écriture en cours, et les écritures
+        n'attendent que la durée d'un lot.
+
+        Returns:
+            Nombre de textes supprimés
+        """
+        orphans = select(EmailBody.digest).where(
+            ~exists().where(Email.body_digest == EmailBody.digest),
+            ~exists().where(Email.headers_digest == EmailBody.digest)
+        ).limit(batch_size)
+
+        deleted = 0
+        while True:
+            try:
+                # Recherche des orphelins (anti-jointure sur emails) et attente du verrou
+                lift_statement_timeout(self.db)
+                self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": BODY_STORE_LOCK_KEY})
+                result = self.db.execute(delete(EmailBody).where(EmailBody.digest.in_(orphans)))
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                return deleted
@@ -0,0 +1,164 @@
+"""
+Service d'import d'emails depuis des fichiers .eml / .mbox en streaming
+"""
+import email.utils
+import hashlib
+from email.feedparser import BytesFeedParser
+from email.message import Message
+from email.parser import BytesParser
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+from uuid import UUID
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.services.email_ingestion import EmailIngestionService
+from loguru import logger
+
+
+class EmailImportService:
+    """
+    Importe des emails depuis des fichiers uploadés sans les charger entièrement en mémoire.
+
+    Les archives .mbox sont découpées message par message en lisant le flux ligne à ligne,
+    les fichiers .eml sont parsés par blocs avec BytesParser, et les emails sont insérés
+    par paquets via le chemin bulk de l'ingestion.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.ingestion_service = EmailIngestionService(db)
+        self.batch_size = settings.IMPORT_BATCH_SIZE
+        self.max_message_bytes = settings.IMPORT_MAX_MESSAGE_MB * 1024 * 1024
+
+    def import_files(
+        self,
+        files: List[UploadFile],
+        user_id: Optional[UUID] = None,
+        on_batch_inserted: Optional[Callable[[List[UUID]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Importer une liste de fichiers .eml / .mbox
+
+        Args:
+            files: Fichiers uploadés
+            user_id: Utilisateur propriétaire des emails importés
+            on_batch_inserted: Appelé avec les ids insérés après chaque paquet
+                (typiquement pour planifier le traitement NLP)
+        """
+        results = []
+
+        for file in files:
+            stats = {"filename": file.filename, "parsed": 0, "imported": 0, "already_exists": 0, "skipped": 0}
+            batch: List[Dict[str, Any]] = []
+
+            def flush():
+                # Un échec d'insertion lève une exception : le fichier est signalé en erreur
+                inserted_ids = self.ingestion_service.bulk_save_emails_to_db(batch)
+                stats["imported"] += len(inserted_ids)
+                stats["already_exists"] += len(batch) - len(inserted_ids)
+                batch.clear()
+                if inserted_ids and on_batch_inserted:
+                    on_batch_inserted(inserted_ids)
+
+            try:
+                for msg in self._iter_messages(file):
+                    if msg is None:
+                        stats["skipped"] += 1
+                        continue
+
+                    batch.append(self._message_to_content(msg, user_id))
+                    stats["parsed"] += 1
+
+                    if len(batch) >= self.batch_size:
+                        flush()
+
+                if batch:
+                    flush()
+
+                stats["status"] = "imported"
+
+            except Exception as e:
+                logger.error(f"Failed to import {file.filename}: {e}")
+                stats["status"] = "error"
+                stats["error"] = str(e)
+
+            logger.info(f"Imported {stats['imported']}/{stats['parsed']} emails from {file.filename}")
+            results.append(stats)
+
+        return results
+
+    def _iter_messages(self, file: UploadFile) -> Iterator[Optional[Message]]:
+        """Itérer sur les messages d'un fichier, selon son format"""
+        stream = file.file
+        head = stream.read(5)
+        stream.seek(0)
+
+        if (file.filename or "").lower().endswith(".mbox") or head == b"From ":
+            yield from self._iter_mbox(stream)
+        else:
+            yield self._parse_eml(stream)
+
+    def _iter_mbox(self, stream: BinaryIO) -> Iterator[Optional[Message]]:
+        """
+        Découper une archive mbox message par message en lisant le flux ligne à ligne.
+        Seul le message courant est conservé en mémoire ; les messages dépassant
+        IMPORT_MAX_MESSAGE_MB sont ignorés (None).
+        """
+        parser: Optional[BytesFeedParser] = None
+        size = 0
+
+        for line in stream:
+            if line.startswith(b"From "):
+                if parser is not None:
+                    yield parser.close() if size <= self.max_message_bytes else None
+                parser = BytesFeedParser()
+                size = 0
+                continue
+
+            if parser is None:
+                # Fichier sans ligne de séparation initiale
+                parser = BytesFeedParser()
+
+            size += len(line)
+            if size > self.max_message_bytes:
+                continue
+
+            # Dés-échapper les lignes ">From " (format mboxrd)
+            if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                line = line[1:]
+            parser.feed(line)
+
+        if parser is not None:
+            yield parser.close() if size <= self.max_message_bytes else None
+
+    def _parse_eml(self, stream: BinaryIO) -> Optional[Message]:
+        """Parser un fichier .eml depuis le flux (lecture par blocs)"""
+        stream.seek(0, 2)
+        size = stream.tell()
+        stream.seek(0)
+        if size > self.max_message_bytes:
+            return None
+        return BytesParser().parse(stream)
+
+    def _message_to_content(self, msg: Message, user_id: Optional[UUID]) -> Dict[str, Any]:
+        """Convertir un message parsé au format produit par l'ingestion IMAP"""
+        content = self.ingestion_service.extract_email_content(msg)
+
+        message_id = msg.get("Message-ID")
+        if not message_id:
+            # Identifiant stable pour que les ré-imports restent idempotents
+            fingerprint = f"{msg.get('Date')}|{msg.get('From')}|{msg.get('Subject')}"
+            message_id = f"<import-{hashlib.sha1(fingerprint.encode('utf-8', errors='ignore')).hexdigest()}>"
+
+        try:
+            sent_at = email.utils.parsedate_to_datetime(msg["Date"]) if msg["Date"] else None
+        except Exception:
+            sent_at = None
+
+        content["message_id"] = message_id
+        content["sent_at"] = sent_at or datetime.now(timezone.utc)
+        content["raw_headers"] = str(msg.items())
+        content["user_id"] = user_id
+        return content
+
@@ -1,16 +1,49 @@
 import imaplib
 import email
 import email.header
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone, timedelta
+from uuid import UUID
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from app.models.models import Email
+from app.models.user_stats import UNASSIGNED_USER_ID
+from app.services.user_stats_service import UserStatsService
+from app.services.mime_body import html_to_text
+from app.services.email_body_store import EmailBodyStore
 from app.core.config import settings
 from loguru import logger
 import uuid
 import re
 
 
+class ImapAccount(BaseModel):
+    """Compte IMAP à ingérer"""
+    host: str = "imap.gmail.com"
+    user: str
+    password: str
+    folders: List[str] = Field(default_factory=lambda: ["INBOX"])
+    user_id: Optional[UUID] = None
+
+
+# Sémaphores partagés par serveur IMAP pour limiter le nombre de connexions simultanées
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def _get_host_semaphore(host: str) -> threading.BoundedSemaphore:
+    """Récupérer (ou créer) le sémaphore de connexions d'un serveur IMAP"""
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(settings.IMAP_MAX_CONNECTIONS_PER_HOST)
+        return _host_semaphores[host]
+
+
 class EmailIngestionService:
     """Service pour récupérer les emails depuis IMAP et les stocker en base"""
     
@@ -19,16 +52,38 @@ class EmailIngestionService:
         self.imap_host = settings.IMAP_HOST
         self.imap_user = settings.IMAP_USER
         self.imap_password = settings.IMAP_PASSWORD
+    
+    def get_accounts(self) -> List[ImapAccount]:
+        """Lister les comptes IMAP configurés (compte principal + IMAP_ACCOUNTS)"""
+        accounts = []
+        if self.imap_user and self.imap_password:
+            accounts.append(ImapAccount(
+                host=self.imap_host,
+                user=self.imap_user,
+                password=self.imap_password,
+                folders=settings.IMAP_FOLDERS
+            ))
         
-    def connect_imap(self) -> Optional[imaplib.IMAP4_SSL]:
+        for account_config in settings.IMAP_ACCOUNTS:
+            try:
+                accounts.append(ImapAccount(**{"folders": settings.IMAP_FOLDERS, **account_config}))
+            except Exception as e:
+                logger.error(f"Invalid IMAP account configuration: {e}")
+        
+        return accounts
+        
+    def connect_imap(self, account: Optional[ImapAccount] = None) -> Optional[imaplib.IMAP4_SSL]:
         """Se connecter au serveur IMAP"""
+        host = account.host if account else self.imap_host
+        user = account.user if account else self.imap_user
+        password = account.password if account else self.imap_password
         try:
-            mail = imaplib.IMAP4_SSL(self.imap_host)
-            mail.login(self.imap_user, self.imap_password)
-            logger.info(f"Connected to IMAP server {self.imap_host}")
+            mail = imaplib.IMAP4_SSL(host, timeout=settings.IMAP_TIMEOUT_SECONDS)
+            mail.login(user, password)
+            logger.info(f"Connected to IMAP server {host} as {user}")
             return mail
         except Exception as e:
-            logger.error(f"Failed to connect to IMAP: {e}")
+            logger.error(f"Failed to connect to IMAP {host} as {user}: {e}")
             return None
     
     def decode_header(self, header: str) -> str:
@@ -119,6 +174,10 @@ class EmailIngestionService:
             except Exception as e:
                 logger.warning(f"Failed to decode simple message: {e}")
         
+        # Message HTML uniquement : texte extrait du HTML
+        if not content['body'] and content['html_body']:
+            content['body'] = html_to_text(content['html_body'])
+        
         # Créer un snippet (résumé)
         if content['body']:
             # Nettoyer le texte et créer un résumé
@@ -148,15 +207,36 @@ class EmailIngestionService:
         
         return False
     
-    def fetch_recent_emails(self, days_back: int = 30, folder: str = 'INBOX') -> List[Dict[str, Any]]:
-        """Récupérer les emails récents depuis IMAP"""
-        mail = self.connect_imap()
+    def fetch_recent_emails(
+        self, 
+        days_back: int = 30, 
+        folder: str = 'INBOX',
+        account: Optional[ImapAccount] = None
+    ) -> List[Dict[str, Any]]:
+        """Récupérer les emails récents d'un dossier IMAP"""
+        host = account.host if account else self.imap_host
+        
+        # Limiter le nombre de connexions simultanées vers un même serveur
+        with _get_host_semaphore(host):
+            return self._fetch_folder(days_back, folder, account)
+    
+    def _fetch_folder(
+        self, 
+        days_back: int, 
+        folder: str, 
+        account: Optional[ImapAccount]
+    ) -> List[Dict[str, Any]]:
+        """Récupérer les emails d'un dossier sur une connexion dédiée"""
+        mail = self.connect_imap(account)
         if not mail:
             return []
         
         try:
-            # Sélectionner le dossier
-            mail.select(folder)
+            # Sélectionner le dossier (en lecture seule pour ne pas marquer les emails comme lus)
+            typ, _ = mail.select(f'"{folder}"', readonly=True)
+            if typ != 'OK':
+                logger.error(f"Failed to select IMAP folder {folder}")
+                return []
             
             # Calculer la date de début
             since_date = (datetime.now() - timedelta(days=days_back)).strftime('%d-%b-%Y')
@@ -172,7 +252,7 @@ class EmailIngestionService:
             email_list = []
             msgnums = msgnums[0].split()
             
-            logger.info(f"Found {len(msgnums)} emails in the last {days_back} days")
+            logger.info(f"Found {len(msgnums)} emails in {folder} in the last {days_back} days")
             
             # Traiter les emails (limiter à 100 pour éviter la surcharge)
             for num in msgnums[-100:]:  # Prendre les 100 plus récents
@@ -189,6 +269,9 @@ class EmailIngestionService:
                     # Ajouter des métadonnées
                     content['message_id'] = email_message.get('Message-ID', f'imap-{num.decode()}')
                     content['date'] = email_message.get('Date', '')
+                    content['folder'] = folder
+                    content['account'] = account.user if account else self.imap_user
+                    content['user_id'] = account.user_id if account else None
                     
                     # Parser la date
                     try:
@@ -214,7 +297,7 @@ class EmailIngestionService:
                     logger.warning(f"Failed to process email {num}: {e}")
                     continue
             
-            logger.info(f"Extracted {len(email_list)} recruitment emails")
+            logger.info(f"Extracted {len(email_list)} recruitment emails from {folder}")
             return email_list
             
         except Exception as e:
@@ -227,9 +310,68 @@ class EmailIngestionService:
             except:
                 pass
     
+    def fetch_all_accounts(self, days_back: int = 30, user_id: Optional[UUID] = None) -> List[Dict[str, Any]]:
+        """
+        Récupérer en parallèle les emails de tous les comptes et dossiers configurés
+        
+        Chaque compte dispose de son propre pool de workers (un dossier par connexion),
+        les connexions vers un même serveur sont bornées par IMAP_MAX_CONNECTIONS_PER_HOST
+        et les résultats sont fusionnés au fil de l'eau, si bien qu'une boîte lente
+        ne bloque pas les autres. Si user_id est fourni, seuls les comptes rattachés
+        à cet utilisateur sont lus.
+        """
+        accounts = self.get_accounts()
+        if user_id is not None:
+            accounts = [account for account in accounts if account.user_id == user_id]
+        if not accounts:
+            logger.warning("No IMAP account configured")
+            return []
+        
+        pools = []
+        futures = {}
+        
+        try:
+            for account in accounts:
+                pool = ThreadPoolExecutor(
+                    max_workers=max(1, min(settings.IMAP_WORKERS_PER_ACCOUNT, len(account.folders))),
+                    thread_name_prefix=f"imap-{account.user}"
+                )
+                pools.append(pool)
+                
+                for folder in account.folders:
+                    future = pool.submit(self.fetch_recent_emails, days_back, folder, account)
+                    futures[future] = (account.user, folder)
+            
+            # Fusionner les résultats dans l'ordre d'arrivée
+            email_list = []
+            seen_message_ids = set()
+            
+            for future in as_completed(futures):
+                account_user, folder = futures[future]
+                try:
+                    folder_emails = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to fetch {folder} for {account_user}: {e}")
+                    continue
+                
+                for content in folder_emails:
+                    # Un même message peut apparaître dans plusieurs dossiers/labels
+                    if content['message_id'] in seen_message_ids:
+                        continue
+                    seen_message_ids.add(content['message_id'])
+                    email_list.append(content)
+            
+            logger.info(f"Fetched {len(email_list)} recruitment emails from {len(accounts)} accounts")
+            return email_list
+            
+        finally:
+            for pool in pools:
+                pool.shutdown(wait=False)
+    
     def save_emails_to_db(self, emails: List[Dict[str, Any]]) -> int:
         """Sauvegarder les emails en base de données"""
         saved_count = 0
+        body_store = EmailBodyStore(self.db)
         
         for email_data in emails:
             try:
@@ -245,6 +387,7 @@ class EmailIngestionService:
                 # Créer un nouvel email
                 new_email = Email(
                     id=uuid.uuid4(),
+                    user_id=email_data.get('user_id'),
                     external_id=email_data['message_id'],
                     subject=email_data['subject'],
                     sender=email_data['sender'],
@@ -252,7 +395,8 @@ class EmailIngestionService:
                     cc=email_data['cc'] or [],
                     bcc=email_data['bcc'] or [],
                     sent_at=email_data['sent_at'],
-                    raw_body=email_data['body'],
+                    body_digest=body_store.store(email_data['body'], searchable=True),
+                    headers_digest=body_store.store(email_data.get('raw_headers')),
                     snippet=email_data['snippet'],
                     created_at=datetime.now(timezone.utc)
                 )
@@ -275,12 +419,103 @@ class EmailIngestionService:
         
         return saved_count
     
+    def bulk_save_emails_to_db(self, emails: List[Dict[str, Any]], chunk_size: int = 500) -> List[UUID]:
+        """
+        Sauvegarder un lot d'emails en base en quelques requêtes
+        
+        Le lot est dédoublonné en mémoire, les emails déjà présents sont écartés par
+        une requête d'existence par paquet, puis les nouveaux sont insérés via un
+        INSERT multi-lignes ... ON CONFLICT DO NOTHING.
+        
+        Returns:
+            Liste des ids des emails réellement insérés
+
+        Raises:
+            Exception: En cas d'échec de l'insertion (transaction annulée)
+        """
+        # Dédoublonner le lot sur le Message-ID
+        unique_emails = {}
+        for email_data in emails:
+            message_id = email_data.get('message_id')
+            if message_id and message_id not in unique_emails:
+                unique_emails[message_id] = email_data
+        
+        message_ids = list(unique_emails)
+        inserted_ids: List[UUID] = []
+        # INSERT Core : les compteurs des tableaux de bord sont mis à jour explicitement
+        inserted_per_user: Counter = Counter()
+        body_store = EmailBodyStore(self.db)
+        
+        try:
+            for start in range(0, len(message_ids), chunk_size):
+                chunk = message_ids[start:start + chunk_size]
+                
+                existing = set(self.db.execute(
+                    select(Email.external_id).where(Email.external_id.in_(chunk))
+                ).scalars())
+                
+                new_emails = [unique_emails[message_id] for message_id in chunk if message_id not in existing]
+                if not new_emails:
+                    continue
+                
+                # Corps et en-têtes dans le stockage compressé, la ligne ne garde que leur empreinte
+                body_digests = body_store.store_many(
+                    (email_data.get('body') for email_data in new_emails), searchable=True
+                )
+                headers_digests = body_store.store_many(email_data.get('raw_headers') for email_data in new_emails)
+                rows = [
+                    self._build_email_row(email_data, body_digest, headers_digest)
+                    for email_data, body_digest, headers_digest in zip(new_emails, body_digests, headers_digests)
+                ]
+                
+                stmt = insert(Email).values(rows).on_conflict_do_nothing().returning(Email.id, Email.user_id)
+                for email_id, user_id in self.db.execute(stmt):
+                    inserted_ids.append(email_id)
+                    inserted_per_user[(user_id or UNASSIGNED_USER_ID, "emails.total")] += 1
+            
+            if inserted_per_user:
+                UserStatsService.apply_deltas(self.db.connection(), inserted_per_user)
+            self.db.commit()
+            logger.info(f"Bulk saved {len(inserted_ids)} new emails "
+                       f"({len(emails) - len(inserted_ids)} duplicates skipped)")
+            
+        except Exception as e:
+            # Remontée à l'appelant : un échec ne doit pas passer pour un lot de doublons
+            logger.error(f"Failed to bulk save emails: {e}")
+            self.db.rollback()
+            raise
+        
+        return inserted_ids
+    
+    def _build_email_row(
+        self,
+        email_data: Dict[str, Any],
+        body_digest: Optional[str],
+        headers_digest: Optional[str]
+    ) -> Dict[str, Any]:
+        """Construire la ligne à insérer pour un email extrait"""
+        return {
+            "id": uuid.uuid4(),
+            "user_id": email_data.get('user_id'),
+            "external_id": email_data['message_id'],
+            "subject": email_data.get('subject'),
+            "sender": email_data.get('sender'),
+            "recipients": email_data.get('recipients') or [],
+            "cc": email_data.get('cc') or [],
+            "bcc": email_data.get('bcc') or [],
+            "sent_at": email_data.get('sent_at'),
+            "body_digest": body_digest,
+            "snippet": email_data.get('snippet'),
+            "headers_digest": headers_digest,
+            "created_at": datetime.now(timezone.utc)
+        }
+    
     def ingest_emails(self, days_back: int = 30) -> Dict[str, Any]:
         """Ingérer les emails depuis IMAP"""
         logger.info(f"Starting email ingestion for last {days_back} days")
         
-        # Récupérer les emails
-        emails = self.fetch_recent_emails(days_back)
+        # Récupérer les emails de tous les comptes et dossiers
+        emails = self.fetch_all_accounts(days_back)
         
         if not emails:
             return {
@@ -291,7 +526,7 @@ class EmailIngestionService:
             }
         
         # Sauvegarder en base
-        saved_count = self.save_emails_to_db(emails)
+        saved_count = len(self.bulk_save_emails_to_db(emails))
         
         return {
             "success": True,
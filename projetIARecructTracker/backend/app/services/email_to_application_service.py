@@ -44,12 +44,10 @@ class EmailToApplicationService:
         
         for email in emails_to_process:
             try:
-                application = self._create_or_link_application(email)
-                if application:
-                    email.application_id = application.id
-                    self.db.commit()
+                action = self.process_email(email)
+                if action:
                     results["processed"] += 1
-                    if hasattr(application, '_newly_created'):
+                    if action == "created":
                         results["created_applications"] += 1
                     else:
                         results["linked_applications"] += 1
@@ -60,6 +58,29 @@ class EmailToApplicationService:
                 
         return results
 
+    def process_email(self, email: Email) -> Optional[str]:
+        """
+        Crée ou lie la candidature d'un email classifié
+
+        Returns:
+            "created", "linked", ou None si l'email n'est pas concerné
+        """
+        if email.application_id or email.classification not in (
+            EmailClassification.INTERVIEW.value,
+            EmailClassification.OFFER.value,
+            EmailClassification.REQUEST.value,
+            EmailClassification.REJECTED.value
+        ):
+            return None
+
+        application = self._create_or_link_application(email)
+        if not application:
+            return None
+
+        email.application_id = application.id
+        self.db.commit()
+        return "created" if hasattr(application, '_newly_created') else "linked"
+
     def _create_or_link_application(self, email: Email) -> Optional[Application]:
         """
         Crée une nouvelle candidature ou lie à une existante basé sur l'email
@@ -68,14 +89,14 @@ class EmailToApplicationService:
         company_name = self._extract_company_name(email)
         job_title = self._extract_job_title(email)
         
-        # Chercher une candidature existante pour la même entreprise
-        existing_application = self.db.query(Application).filter(
-            Application.company_name.ilike(f"%{company_name}%")
-        ).first()
+        # Chercher la candidature la plus proche de l'utilisateur (index trigramme)
+        similar_applications = self.application_service.find_similar_applications(
+            company_name, email.user_id, job_title=job_title, limit=1
+        )
         
-        if existing_application:
+        if similar_applications:
             # Lier à la candidature existante
-            return existing_application
+            return similar_applications[0][0]
         
         # Créer une nouvelle candidature
         status = self._determine_status_from_classification(email.classification)
@@ -89,7 +110,7 @@ class EmailToApplicationService:
             notes=f"Créé automatiquement à partir de l'email: {email.subject}\n\nContenu: {email.snippet[:200]}..."
         )
         
-        application = self.application_service.create_application(application_data)
+        application = self.application_service.create_application(application_data, user_id=email.user_id)
         application._newly_created = True  # Marquer comme nouvellement créé
         
         return application
@@ -164,11 +185,13 @@ class EmailToApplicationService:
         
         return status_mapping.get(classification, ApplicationStatus.APPLIED)
 
-    def get_unprocessed_emails_count(self) -> int:
+    @staticmethod
+    def unprocessed_emails_criteria() -> tuple:
         """
-        Retourne le nombre d'emails classifiés qui n'ont pas encore de candidature associée
+        Critères des emails classifiés sans candidature associée
+        (partagés avec les requêtes asynchrones des endpoints)
         """
-        return self.db.query(Email).filter(
+        return (
             Email.application_id.is_(None),
             Email.classification.in_([
                 EmailClassification.INTERVIEW.value,
@@ -176,4 +199,10 @@ class EmailToApplicationService:
                 EmailClassification.REQUEST.value,
                 EmailClassification.REJECTED.value
             ])
-        ).count()
+        )
+
+    def get_unprocessed_emails_count(self) -> int:
+        """
+        Retourne le nombre d'emails classifiés qui n'ont pas encore de candidature associée
+        """
+        return self.db.query(Email).filter(*self.unprocessed_emails_criteria()).count()
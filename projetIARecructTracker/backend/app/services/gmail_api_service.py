@@ -3,13 +3,14 @@ Service pour interagir avec l'API Gmail en utilisant OAuth 2.0
 """
 import httpx
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-import base64
+from datetime import datetime, timedelta, timezone
 import email
 import json
 from sqlalchemy.orm import Session
 from app.models.models import User, Email
 from app.services.gmail_oauth_service import GmailOAuthService
+from app.services.mime_body import extract_gmail_body
+from app.services.email_body_store import EmailBodyStore
 import logging
 
 logger = logging.getLogger(__name__)
@@ -117,7 +118,8 @@ class GmailAPIService:
         self, 
         user: User, 
         max_emails: int = 100,
-        days_back: int = 30
+        days_back: int = 30,
+        since: Optional[datetime] = None
     ) -> Dict[str, Any]:
         """
         Synchronise les emails depuis Gmail vers la base de données
@@ -126,11 +128,19 @@ class GmailAPIService:
             user: Utilisateur dont synchroniser les emails
             max_emails: Nombre maximum d'emails à synchroniser
             days_back: Nombre de jours dans le passé à synchroniser
+            since: Synchronisation incrémentale : seuls les emails postérieurs
+                à cette date sont récupérés (prioritaire sur days_back)
         """
         try:
             # Construire une requête pour les emails récents
-            from_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y/%m/%d')
-            query = f"after:{from_date}"
+            if since:
+                # Les dates en base sont en UTC sans fuseau : ne pas les interpréter en heure locale
+                if since.tzinfo is None:
+                    since = since.replace(tzinfo=timezone.utc)
+                query = f"after:{int(since.timestamp())}"
+            else:
+                from_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y/%m/%d')
+                query = f"after:{from_date}"
             
             # Récupérer la liste des messages
             messages = await self.list_messages(user, max_emails, query)
@@ -138,6 +148,8 @@ class GmailAPIService:
             synced_count = 0
             skipped_count = 0
             error_count = 0
+            new_emails = []
+            body_store = EmailBodyStore(self.db)
             
             for message_info in messages:
                 try:
@@ -159,8 +171,11 @@ class GmailAPIService:
                     # Parser et sauvegarder l'email
                     email_data = self._parse_gmail_message(message_details, user.id)
                     if email_data:
+                        # Le corps va dans le stockage compressé, l'email ne garde que son empreinte
+                        email_data["body_digest"] = body_store.store(email_data.pop("body_text"), searchable=True)
                         email_obj = Email(**email_data)
                         self.db.add(email_obj)
+                        new_emails.append(email_obj)
                         synced_count += 1
                         
                 except Exception as e:
@@ -180,7 +195,8 @@ class GmailAPIService:
                 "synced_emails": synced_count,
                 "skipped_emails": skipped_count,
                 "errors": error_count,
-                "total_processed": len(messages)
+                "total_processed": len(messages),
+                "email_ids": [email_obj.id for email_obj in new_emails]
             }
             
         except Exception as e:
@@ -203,8 +219,8 @@ class GmailAPIService:
             # Parser la date
             sent_at = self._parse_email_date(date_header)
             
-            # Extraire le corps du message
-            body_text, body_html = self._extract_message_body(message_data["payload"])
+            # Extraire le corps du message (texte, ou HTML converti en texte à défaut)
+            body_text = extract_gmail_body(message_data["payload"])
             
             # Déterminer si c'est un email entrant ou sortant
             is_sent = sender.lower().find(headers.get("delivered-to", "").lower()) != -1
@@ -216,8 +232,7 @@ class GmailAPIService:
                 "sender": sender,
                 "recipient": recipient,
                 "sent_at": sent_at,
-                "raw_body": body_text,
-                "html_body": body_html,
+                "body_text": body_text,
                 "snippet": message_data.get("snippet", ""),
                 "thread_id": message_data.get("threadId"),
                 "is_sent": is_sent,
@@ -229,36 +244,6 @@ class GmailAPIService:
             logger.error(f"Erreur lors du parsing du message: {str(e)}")
             return None
 
-    def _extract_message_body(self, payload: Dict[str, Any]) -> tuple[Optional[str], Optional[str]]:
-        """
-        Extrait le corps du message (texte et HTML)
-        """
-        body_text = None
-        body_html = None
-        
-        def extract_from_part(part):
-            nonlocal body_text, body_html
-            
-            mime_type = part.get("mimeType", "")
-            
-            if mime_type == "text/plain" and not body_text:
-                data = part.get("body", {}).get("data")
-                if data:
-                    body_text = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                    
-            elif mime_type == "text/html" and not body_html:
-                data = part.get("body", {}).get("data")
-                if data:
-                    body_html = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                    
-            # Traiter les parties multiples
-            if "parts" in part:
-                for sub_part in part["parts"]:
-                    extract_from_part(sub_part)
-        
-        extract_from_part(payload)
-        return body_text, body_html
-
     def _parse_email_date(self, date_str: str) -> datetime:
         """
         Parse la date d'un email au format RFC 2822
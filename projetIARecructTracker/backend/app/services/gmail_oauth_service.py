@@ -1,20 +1,34 @@
 """
 Service pour gérer l'authentification OAuth 2.0 avec Gmail
 """
+import asyncio
 import os
 import secrets
 import json
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
+from uuid import UUID
 import httpx
+from sqlalchemy import delete, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.models.models import User
+from app.models.oauth_states import OAuthState
+from app.models.user_gmail import GmailRefreshFailure
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Durée de validité d'un state OAuth entre l'autorisation et le callback
+OAUTH_STATE_TTL = timedelta(minutes=10)
+
+# Rafraîchissements de token en cours, par boucle d'événements et par utilisateur :
+# les appels simultanés de ensure_valid_token pour un même utilisateur attendent
+# le rafraîchissement déjà lancé au lieu d'en lancer un autre
+_refresh_in_flight: Dict[Tuple[int, UUID], "asyncio.Future[bool]"] = {}
+
 
 class GmailOAuthService:
     """
@@ -39,9 +53,7 @@ class GmailOAuthService:
         self.auth_base_url = "https://accounts.google.com/o/oauth2/v2/auth"
         self.token_url = "https://oauth2.googleapis.com/token"
         self.userinfo_url = "https://www.googleapis.com/oauth2/v1/userinfo"
-        
-        # Stockage temporaire des states OAuth (en production, utiliser Redis)
-        self._oauth_states = {}
+
 
     def generate_authorization_url(self, user_id: int) -> Tuple[str, str]:
         """
@@ -53,12 +65,12 @@ class GmailOAuthService:
         # Générer un state unique pour sécuriser la requête
         state = secrets.token_urlsafe(32)
         
-        # Stocker le state avec l'user_id (temporairement)
-        self._oauth_states[state] = {
-            "user_id": user_id,
-            "created_at": datetime.utcnow(),
-            "expires_at": datetime.utcnow() + timedelta(minutes=10)
-        }
+        # Stocker le state avec l'user_id (table partagée entre processus),
+        # en purgeant au passage les states jamais utilisés
+        now = datetime.utcnow()
+        self.db.execute(delete(OAuthState).where(OAuthState.expires_at < now))
+        self.db.add(OAuthState(state=state, user_id=user_id, created_at=now, expires_at=now + OAUTH_STATE_TTL))
+        self.db.commit()
         
         # Paramètres OAuth
         params = {
@@ -89,21 +101,21 @@ class GmailOAuthService:
             Dict contenant les informations de l'utilisateur et le statut
         """
         try:
-            # Vérifier le state
-            if state not in self._oauth_states:
+            # Vérifier et consommer le state : la suppression garantit un usage unique,
+            # même si deux callbacks arrivent en même temps sur des processus différents
+            state_data = self.db.execute(
+                delete(OAuthState).where(OAuthState.state == state)
+                .returning(OAuthState.user_id, OAuthState.expires_at)
+            ).first()
+            self.db.commit()
+            if state_data is None:
                 raise ValueError("State OAuth invalide ou expiré")
-                
-            state_data = self._oauth_states[state]
             
             # Vérifier l'expiration
-            if datetime.utcnow() > state_data["expires_at"]:
-                del self._oauth_states[state]
+            if datetime.utcnow() > state_data.expires_at:
                 raise ValueError("State OAuth expiré")
                 
-            user_id = state_data["user_id"]
-            
-            # Nettoyer le state utilisé
-            del self._oauth_states[state]
+            user_id = state_data.user_id
             
             # Échanger le code contre des tokens
             token_data = await self._exchange_code_for_tokens(code)
@@ -128,7 +140,9 @@ class GmailOAuthService:
                 user.gmail_scopes = token_data["scope"]
             else:
                 user.gmail_scopes = " ".join(self.scopes)
-                
+            
+            # Nouvelle autorisation : l'échec de rafraîchissement précédent est résolu
+            self._clear_refresh_failure(user.id)
             self.db.commit()
             
             logger.info(f"Gmail OAuth connecté avec succès pour l'utilisateur {user_id}, email: {user_info.get('email')}")
@@ -215,6 +229,11 @@ class GmailOAuthService:
                 
                 if response.status_code != 200:
                     logger.error(f"Erreur refresh token: {response.status_code} - {response.text}")
+                    self._record_refresh_failure(
+                        user,
+                        f"{response.status_code} - {response.text[:500]}",
+                        requires_reauthorization=self._is_grant_rejected(response)
+                    )
                     return False
                     
                 token_data = response.json()
@@ -226,7 +245,8 @@ class GmailOAuthService:
                 # Nouveau refresh token s'il est fourni
                 if "refresh_token" in token_data:
                     user.gmail_refresh_token = token_data["refresh_token"]
-                    
+                
+                self._clear_refresh_failure(user.id)
                 self.db.commit()
                 
                 logger.info(f"Token Gmail rafraîchi avec succès pour l'utilisateur {user.id}")
@@ -234,7 +254,92 @@ class GmailOAuthService:
                 
         except Exception as e:
             logger.error(f"Erreur lors du rafraîchissement du token: {str(e)}")
+            self.db.rollback()
+            self._record_refresh_failure(user, str(e)[:500])
+            return False
+
+    def _clear_refresh_failure(self, user_id: UUID):
+        self.db.execute(delete(GmailRefreshFailure).where(GmailRefreshFailure.user_id == user_id))
+
+    @staticmethod
+    def _is_grant_rejected(response: httpx.Response) -> bool:
+        """
+        Refresh token refusé (invalid_grant : révoqué, expiré, mot de passe changé)
+
+        Seul ce refus demande une nouvelle autorisation ; les erreurs réseau et
+        les 5xx de Google sont passagères.
+        """
+        if response.status_code not in (400, 401):
             return False
+        try:
+            return response.json().get("error") == "invalid_grant"
+        except ValueError:
+            return False
+
+    def _record_refresh_failure(self, user: User, error: str, requires_reauthorization: bool = False):
+        """Conserver le dernier échec de rafraîchissement, signalé par get_oauth_status"""
+        try:
+            values = {
+                "user_id": user.id,
+                "error": error,
+                "failed_at": datetime.utcnow(),
+                "requires_reauthorization": requires_reauthorization
+            }
+            stmt = pg_insert(GmailRefreshFailure).values(**values)
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[GmailRefreshFailure.user_id],
+                set_={name: stmt.excluded[name] for name in values if name != "user_id"}
+            ))
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Impossible d'enregistrer l'échec de rafraîchissement pour {user.id}: {str(e)}")
+            self.db.rollback()
+
+    def get_users_with_expiring_tokens(self, limit: int) -> List[User]:
+        """
+        Comptes Gmail dont le token expire dans moins de GMAIL_TOKEN_REFRESH_AHEAD_MINUTES,
+        les plus proches de l'expiration d'abord
+
+        Un compte dont le dernier rafraîchissement a échoué n'est retenté qu'après
+        GMAIL_TOKEN_REFRESH_RETRY_MINUTES (refresh token révoqué : réautorisation nécessaire).
+        """
+        now = datetime.utcnow()
+        return self.db.query(User).outerjoin(
+            GmailRefreshFailure, GmailRefreshFailure.user_id == User.id
+        ).filter(
+            User.gmail_connected.is_(True),
+            User.gmail_refresh_token.isnot(None),
+            User.gmail_token_expires_at < now + timedelta(minutes=settings.GMAIL_TOKEN_REFRESH_AHEAD_MINUTES),
+            or_(
+                GmailRefreshFailure.failed_at.is_(None),
+                GmailRefreshFailure.failed_at < now - timedelta(minutes=settings.GMAIL_TOKEN_REFRESH_RETRY_MINUTES)
+            )
+        ).order_by(User.gmail_token_expires_at).limit(limit).all()
+
+    async def refresh_expiring_tokens(self) -> Dict[str, int]:
+        """
+        Rafraîchir par lots les tokens qui vont expirer, avant que la prochaine
+        synchronisation n'ait à le faire
+
+        Returns:
+            Nombre de tokens rafraîchis et d'échecs
+        """
+        refreshed = failed = 0
+        seen = set()
+        while True:
+            users = [
+                user for user in self.get_users_with_expiring_tokens(settings.GMAIL_TOKEN_REFRESH_BATCH_SIZE)
+                if user.id not in seen
+            ]
+            if not users:
+                break
+            for user in users:
+                seen.add(user.id)
+                if await self._refresh_coalesced(user):
+                    refreshed += 1
+                else:
+                    failed += 1
+        return {"refreshed": refreshed, "failed": failed}
 
     def is_token_valid(self, user: User) -> bool:
         """
@@ -257,11 +362,34 @@ class GmailOAuthService:
         if self.is_token_valid(user):
             return True
             
-        if user.gmail_refresh_token:
-            return await self.refresh_access_token(user)
-            
-        logger.warning(f"Utilisateur {user.id} n'a pas de token valide et pas de refresh token")
-        return False
+        if not user.gmail_refresh_token:
+            logger.warning(f"Utilisateur {user.id} n'a pas de token valide et pas de refresh token")
+            return False
+        
+        return await self._refresh_coalesced(user)
+
+    async def _refresh_coalesced(self, user: User) -> bool:
+        """Rafraîchir le token, ou attendre le rafraîchissement déjà en cours pour cet utilisateur"""
+        loop = asyncio.get_running_loop()
+        key = (id(loop), user.id)
+        in_flight = _refresh_in_flight.get(key)
+        if in_flight is not None:
+            # Rafraîchissement déjà en cours pour cet utilisateur : partager son résultat
+            if not await asyncio.shield(in_flight):
+                return False
+            # Relire les tokens enregistrés par l'autre requête
+            self.db.refresh(user)
+            return self.is_token_valid(user)
+        
+        future = loop.create_future()
+        _refresh_in_flight[key] = future
+        success = False
+        try:
+            success = await self.refresh_access_token(user)
+            return success
+        finally:
+            del _refresh_in_flight[key]
+            future.set_result(success)
 
     def disconnect_gmail(self, user: User) -> bool:
         """
@@ -274,6 +402,7 @@ class GmailOAuthService:
             user.gmail_connected = False
             user.gmail_email = None
             user.gmail_scopes = None
+            self._clear_refresh_failure(user.id)
             
             self.db.commit()
             
@@ -288,10 +417,15 @@ class GmailOAuthService:
         """
         Retourne le statut de la connexion OAuth Gmail pour un utilisateur
         """
+        failure = self.db.get(GmailRefreshFailure, user.id)
         return {
             "connected": user.gmail_connected,
             "email": user.gmail_email,
             "token_valid": self.is_token_valid(user),
             "expires_at": user.gmail_token_expires_at.isoformat() if user.gmail_token_expires_at else None,
-            "scopes": user.gmail_scopes.split(" ") if user.gmail_scopes else []
+            "scopes": user.gmail_scopes.split(" ") if user.gmail_scopes else [],
+            # Échec du rafraîchissement anticipé : signalé avant l'expiration du token
+            "refresh_error": failure.error if failure else None,
+            "refresh_failed_at": failure.failed_at.isoformat() if failure else None,
+            "requires_reauthorization": bool(user.gmail_connected and failure and failure.requires_reauthorization)
         }
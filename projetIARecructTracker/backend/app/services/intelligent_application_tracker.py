@@ -1,13 +1,18 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime
 from app.models.models import Email, Application
+from app.models.indexes import AUTO_CREATED_SOURCE_MARKER
 from app.models.schemas import (
     ApplicationCreate, ApplicationUpdate, ApplicationStatus, EmailClassification,
     UrgencyLevel, Priority
 )
 from app.services.application_service import ApplicationService
-import re
+from app.services.application_candidate_index import ApplicationCandidateIndex
+from app.services.user_stats_service import UserStatsService
+from app.nlp.rule_extractor import extract_application_fields
+from app.nlp.extraction_pool import email_tuples, extract_application_fields_batch
+from app.core.config import settings
 import logging
 from difflib import SequenceMatcher
 
@@ -26,18 +31,33 @@ class IntelligentApplicationTracker:
     
     def __init__(self, db: Session):
         self.db = db
-        self.application_service = ApplicationService(db)
+        # Les lots gèrent eux-mêmes leurs transactions (voir process_email_batch)
+        self.application_service = ApplicationService(db, autocommit=False)
+        # Candidatures créées pendant le lot en cours, par utilisateur
+        self._candidate_indexes: Dict[Any, ApplicationCandidateIndex] = {}
 
-    def process_email_batch(self, user_id: int, limit: int = 50) -> Dict[str, Any]:
+    def process_email_batch(self, user_id: int, limit: int = 50, commit_every: Optional[int] = None) -> Dict[str, Any]:
         """
         Traite un lot d'emails pour détecter et mettre à jour les candidatures de l'utilisateur spécifié
+        
+        Chaque email est traité dans un savepoint : une erreur n'annule que cet email.
+        Les modifications sont validées par paquets de `commit_every` emails
+        (TRACKER_COMMIT_CHUNK_SIZE par défaut) plutôt qu'à chaque écriture.
+        
+        L'extraction des informations est faite pour tout le lot avant les
+        écritures, sur plusieurs processus si EXTRACTION_PROCESSES > 1.
         """
+        commit_every = commit_every or settings.TRACKER_COMMIT_CHUNK_SIZE
+        
         # Récupérer les emails non traités de l'utilisateur
         emails = self.db.query(Email).filter(
             Email.user_id == user_id,
             Email.application_id.is_(None),
             Email.classification.isnot(None)
-        ).order_by(Email.sent_at.desc()).limit(limit).all()
+        ).options(selectinload(Email.body_blob)).order_by(Email.sent_at.desc()).limit(limit).all()
+        
+        self._candidate_indexes = {}
+        extracted_by_id = extract_application_fields_batch(email_tuples(emails))
         
         results = {
             "processed_emails": 0,
@@ -48,9 +68,10 @@ class IntelligentApplicationTracker:
             "errors": []
         }
         
-        for email in emails:
+        for position, email in enumerate(emails, start=1):
             try:
-                action_result = self._process_single_email(email)
+                with self.db.begin_nested():
+                    action_result = self._process_single_email(email, extracted_by_id.get(email.id))
                 results["processed_emails"] += 1
                 
                 if action_result["action"] == "created":
@@ -69,15 +90,20 @@ class IntelligentApplicationTracker:
                     "subject": email.subject,
                     "error": str(e)
                 })
-                
+            
+            if position % commit_every == 0:
+                self.db.commit()
+        
+        self.db.commit()
         return results
 
-    def _process_single_email(self, email: Email) -> Dict[str, Any]:
+    def _process_single_email(self, email: Email, extracted_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Traite un email individuel et détermine l'action à prendre
         """
-        # Extraire les informations clés de l'email
-        extracted_info = self._extract_email_information(email)
+        # Extraire les informations clés de l'email (sauf si déjà extraites pour le lot)
+        if extracted_info is None:
+            extracted_info = self._extract_email_information(email)
         
         # Chercher une candidature existante correspondante
         matching_application = self._find_matching_application(extracted_info, email.user_id)
@@ -86,7 +112,7 @@ class IntelligentApplicationTracker:
             # Mettre à jour la candidature existante si nécessaire
             updated = self._update_existing_application(matching_application, email, extracted_info)
             email.application_id = matching_application.id
-            self.db.commit()
+            self.db.flush()
             
             return {
                 "action": "updated" if updated else "linked",
@@ -101,7 +127,10 @@ class IntelligentApplicationTracker:
             # Créer une nouvelle candidature
             new_application = self._create_new_application(email, extracted_info)
             email.application_id = new_application.id
-            self.db.commit()
+            self.db.flush()
+            
+            # Les emails suivants du lot doivent pouvoir s'y rattacher
+            self._get_candidate_index(email.user_id).add(new_application)
             
             return {
                 "action": "created",
@@ -117,308 +146,12 @@ class IntelligentApplicationTracker:
         """
         Extrait toutes les informations pertinentes d'un email pour les candidatures
         """
-        content = f"{email.subject} {email.raw_body or email.snippet or ''}"
-        
-        info = {
-            "email_type": email.classification,
-            "sender_domain": self._extract_domain(email.sender),
-            "company_name": self._extract_company_name(email),
-            "job_title": self._extract_job_title(email),
-            "detected_status": self._detect_application_status(email),
-            "salary_info": self._extract_salary_info(content),
-            "interview_date": self._extract_interview_date(content),
-            "contact_person": self._extract_contact_person(email),
-            "urgency_level": self._assess_urgency(email),
-            "response_deadline": self._extract_deadline(content),
-            "job_reference": self._extract_job_reference(content),
-            "location": self._extract_location(content),
-            "keywords": self._extract_keywords(content)
-        }
-        
-        return info
-
-    def _extract_company_name(self, email: Email) -> str:
-        """
-        Extrait le nom de l'entreprise avec plusieurs stratégies
-        """
-        # 1. Depuis le domaine email
-        domain = self._extract_domain(email.sender)
-        if domain and domain not in ['gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com']:
-            # Nettoyer le domaine pour obtenir le nom de l'entreprise
-            company_from_domain = domain.replace('.com', '').replace('.fr', '').replace('.org', '')
-            company_from_domain = company_from_domain.split('.')[0].title()
-            
-        # 2. Depuis le contenu de l'email
-        content = f"{email.subject} {email.raw_body or email.snippet or ''}"
-        
-        # Patterns courants pour détecter les noms d'entreprise
-        company_patterns = [
-            r"équipe (\w+)",
-            r"société (\w+)",
-            r"entreprise (\w+)",
-            r"groupe (\w+)",
-            r"(\w+) recrute",
-            r"rejoindre (\w+)",
-            r"poste chez (\w+)",
-            r"candidature (\w+)",
-        ]
-        
-        for pattern in company_patterns:
-            match = re.search(pattern, content.lower())
-            if match:
-                return match.group(1).title()
-                
-        # 3. Si pas trouvé, utiliser le domaine nettoyé
-        if 'company_from_domain' in locals():
-            return company_from_domain
-            
-        # 4. Fallback sur l'expéditeur
-        sender_name = email.sender.split('@')[0] if '@' in email.sender else email.sender
-        return sender_name.title()
-
-    def _extract_job_title(self, email: Email) -> Optional[str]:
-        """
-        Extrait le titre du poste depuis l'email
-        """
-        content = f"{email.subject} {email.raw_body or email.snippet or ''}"
-        
-        # Patterns pour détecter les titres de poste
-        job_patterns = [
-            r"poste de ([^,\.\n]+)",
-            r"poste ([^,\.\n]+)",
-            r"développeur ([^,\.\n]+)",
-            r"ingénieur ([^,\.\n]+)",
-            r"chef de projet ([^,\.\n]+)",
-            r"manager ([^,\.\n]+)",
-            r"analyste ([^,\.\n]+)",
-            r"consultant ([^,\.\n]+)",
-            r"pour le poste ([^,\.\n]+)",
-            r"offre d'emploi ([^,\.\n]+)",
-            r"candidature ([^,\.\n]+)",
-        ]
-        
-        for pattern in job_patterns:
-            match = re.search(pattern, content.lower())
-            if match:
-                job_title = match.group(1).strip()
-                # Nettoyer le titre
-                job_title = re.sub(r'[^\w\s-]', '', job_title)
-                return job_title.title()
-                
-        # Si rien trouvé dans le contenu, utiliser des mots-clés du sujet
-        subject_lower = email.subject.lower()
-        if any(keyword in subject_lower for keyword in ['développeur', 'developer', 'ingénieur', 'engineer']):
-            return "Développeur"
-        elif any(keyword in subject_lower for keyword in ['manager', 'chef', 'lead']):
-            return "Manager"
-        elif any(keyword in subject_lower for keyword in ['analyste', 'analyst']):
-            return "Analyste"
-            
-        return "Poste non spécifié"
-
-    def _detect_application_status(self, email: Email) -> ApplicationStatus:
-        """
-        Détecte le statut de candidature basé sur le type d'email et le contenu
-        """
-        content = f"{email.subject} {email.raw_body or email.snippet or ''}".lower()
-        
-        # Mapping des classifications email vers les statuts d'application
-        if email.classification == EmailClassification.ACK.value:
-            return ApplicationStatus.ACKNOWLEDGED
-        elif email.classification == EmailClassification.REJECTED.value:
-            return ApplicationStatus.REJECTED
-        elif email.classification == EmailClassification.INTERVIEW.value:
-            return ApplicationStatus.INTERVIEW
-        elif email.classification == EmailClassification.OFFER.value:
-            return ApplicationStatus.OFFER
-        elif email.classification == EmailClassification.REQUEST.value:
-            # Pour les demandes, déterminer s'il s'agit d'une candidature sortante
-            if any(keyword in content for keyword in ['votre candidature', 'votre cv', 'candidature envoyée']):
-                return ApplicationStatus.APPLIED
-            else:
-                return ApplicationStatus.SCREENING
-        else:
-            # Détection basée sur les mots-clés du contenu
-            if any(keyword in content for keyword in ['rejeté', 'refusé', 'pas retenu', 'n\'avons pas']):
-                return ApplicationStatus.REJECTED
-            elif any(keyword in content for keyword in ['entretien', 'interview', 'rencontre', 'rendez-vous']):
-                return ApplicationStatus.INTERVIEW
-            elif any(keyword in content for keyword in ['offre', 'proposition', 'contrat']):
-                return ApplicationStatus.OFFER
-            elif any(keyword in content for keyword in ['reçu', 'accusé', 'bien reçue']):
-                return ApplicationStatus.ACKNOWLEDGED
-            else:
-                return ApplicationStatus.APPLIED
-
-    def _extract_salary_info(self, content: str) -> Optional[str]:
-        """
-        Extrait les informations de salaire du contenu
-        """
-        salary_patterns = [
-            r'(\d+\.?\d*k?)\s*€?\s*(?:par an|annuel|k€)',
-            r'salaire.*?(\d+\.?\d*k?)\s*€',
-            r'rémunération.*?(\d+\.?\d*k?)\s*€',
-            r'(\d+)\s*à\s*(\d+)\s*k€',
-        ]
-        
-        for pattern in salary_patterns:
-            match = re.search(pattern, content.lower())
-            if match:
-                return match.group(0)
-        return None
-
-    def _extract_interview_date(self, content: str) -> Optional[datetime]:
-        """
-        Extrait la date d'entretien du contenu
-        """
-        # Patterns pour détecter les dates
-        date_patterns = [
-            r'(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',
-            r'(\d{1,2})\s+(janvier|février|mars|avril|mai|juin|juillet|août|septembre|octobre|novembre|décembre)\s+(\d{4})',
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, content.lower())
-            if match:
-                try:
-                    if len(match.groups()) == 3:
-                        if match.group(2).isdigit():
-                            # Format DD/MM/YYYY
-                            day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
-                            return datetime(year, month, day)
-                        else:
-                            # Format avec nom de mois
-                            months = {
-                                'janvier': 1, 'février': 2, 'mars': 3, 'avril': 4,
-                                'mai': 5, 'juin': 6, 'juillet': 7, 'août': 8,
-                                'septembre': 9, 'octobre': 10, 'novembre': 11, 'décembre': 12
-                            }
-                            day, month_name, year = int(match.group(1)), match.group(2), int(match.group(3))
-                            month = months.get(month_name, 1)
-                            return datetime(year, month, day)
-                except ValueError:
-                    continue
-        return None
-
-    def _extract_contact_person(self, email: Email) -> Optional[str]:
-        """
-        Extrait le nom de la personne de contact
-        """
-        sender = email.sender
-        if '@' in sender:
-            name_part = sender.split('@')[0]
-            # Nettoyer et formater le nom
-            name_parts = re.split(r'[.\-_]', name_part)
-            if len(name_parts) >= 2:
-                return ' '.join(part.title() for part in name_parts[:2])
-        return None
-
-    def _assess_urgency(self, email: Email) -> str:
-        """
-        Évalue le niveau d'urgence basé sur le contenu
-        """
-        content = f"{email.subject} {email.raw_body or email.snippet or ''}".lower()
-        
-        urgent_keywords = ['urgent', 'rapidement', 'dès que possible', 'immédiatement']
-        high_keywords = ['bientôt', 'prochainement', 'dans les plus brefs délais']
-        
-        if any(keyword in content for keyword in urgent_keywords):
-            return "URGENT"
-        elif any(keyword in content for keyword in high_keywords):
-            return "HIGH"
-        else:
-            return "NORMAL"
-
-    def _extract_deadline(self, content: str) -> Optional[datetime]:
-        """
-        Extrait la date limite de réponse
-        """
-        deadline_patterns = [
-            r'avant le (\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',
-            r'deadline.*?(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',
-            r'réponse.*?(\d{1,2})\s+jours?',
-        ]
-        
-        for pattern in deadline_patterns:
-            match = re.search(pattern, content.lower())
-            if match:
-                try:
-                    if 'jours' in pattern:
-                        days = int(match.group(1))
-                        return datetime.now() + timedelta(days=days)
-                    else:
-                        day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
-                        return datetime(year, month, day)
-                except ValueError:
-                    continue
-        return None
-
-    def _extract_job_reference(self, content: str) -> Optional[str]:
-        """
-        Extrait la référence du poste
-        """
-        ref_patterns = [
-            r'ref[erence]*[:\s]*([A-Za-z0-9\-_]+)',
-            r'référence[:\s]*([A-Za-z0-9\-_]+)',
-            r'job[:\s]*([A-Za-z0-9\-_]+)',
-        ]
-        
-        for pattern in ref_patterns:
-            match = re.search(pattern, content.lower())
-            if match:
-                return match.group(1).upper()
-        return None
-
-    def _extract_location(self, content: str) -> Optional[str]:
-        """
-        Extrait la localisation du poste
-        """
-        location_patterns = [
-            r'localisation[:\s]*([^,\.\n]+)',
-            r'lieu[:\s]*([^,\.\n]+)',
-            r'basé[e]? à ([^,\.\n]+)',
-            r'situé[e]? à ([^,\.\n]+)',
-            r'télétravail',
-            r'remote',
-            r'paris|lyon|marseille|toulouse|nantes|strasbourg|bordeaux|lille',
-        ]
-        
-        for pattern in location_patterns:
-            match = re.search(pattern, content.lower())
-            if match:
-                if match.group(0) in ['télétravail', 'remote']:
-                    return 'Télétravail'
-                else:
-                    return match.group(1).title() if hasattr(match, 'group') and len(match.groups()) > 0 else match.group(0).title()
-        return None
-
-    def _extract_keywords(self, content: str) -> List[str]:
-        """
-        Extrait les mots-clés techniques pertinents
-        """
-        tech_keywords = [
-            'python', 'java', 'javascript', 'react', 'angular', 'vue', 'node.js',
-            'machine learning', 'ia', 'intelligence artificielle', 'data science',
-            'sql', 'postgresql', 'mongodb', 'aws', 'azure', 'docker', 'kubernetes',
-            'agile', 'scrum', 'devops', 'ci/cd', 'git'
-        ]
-        
-        found_keywords = []
-        content_lower = content.lower()
-        
-        for keyword in tech_keywords:
-            if keyword in content_lower:
-                found_keywords.append(keyword)
-                
-        return found_keywords
-
-    def _extract_domain(self, email_address: str) -> Optional[str]:
-        """
-        Extrait le domaine d'une adresse email
-        """
-        if '@' in email_address:
-            return email_address.split('@')[1].lower()
-        return None
+        return extract_application_fields(
+            email.subject,
+            email.body_text or email.snippet,
+            email.sender,
+            email.classification
+        )
 
     def _find_matching_application(self, extracted_info: Dict[str, Any], user_id: int) -> Optional[Application]:
         """
@@ -430,11 +163,20 @@ class IntelligentApplicationTracker:
         if not company_name:
             return None
             
-        # Recherche par nom d'entreprise (similarité) pour l'utilisateur spécifique
-        applications = self.db.query(Application).filter(
-            Application.user_id == user_id,
-            Application.company_name.isnot(None)
-        ).all()
+        # Candidats récupérés par l'index trigramme en base, complétés par les
+        # candidatures créées pendant le lot ; seuls ceux-ci sont scorés exactement
+        applications = [
+            application for application, _ in self.application_service.find_similar_applications(
+                company_name, user_id, job_title=job_title, limit=10
+            )
+        ]
+        known_ids = {application.id for application in applications}
+        applications += [
+            application for application in self._get_candidate_index(user_id).candidates(
+                company_name, extracted_info.get("sender_domain")
+            )
+            if application.id not in known_ids
+        ]
         
         best_match = None
         best_score = 0
@@ -460,6 +202,14 @@ class IntelligentApplicationTracker:
                 
         return best_match
 
+    def _get_candidate_index(self, user_id: int) -> ApplicationCandidateIndex:
+        """
+        Index en mémoire des candidatures créées pendant le lot pour cet utilisateur
+        """
+        if user_id not in self._candidate_indexes:
+            self._candidate_indexes[user_id] = ApplicationCandidateIndex()
+        return self._candidate_indexes[user_id]
+
     def _update_existing_application(self, application: Application, email: Email, extracted_info: Dict[str, Any]) -> bool:
         """
         Met à jour une candidature existante avec les nouvelles informations
@@ -511,9 +261,6 @@ class IntelligentApplicationTracker:
                 application.notes = salary_note
                 updated = True
         
-        if updated:
-            self.db.commit()
-            
         return updated
 
     def _create_new_application(self, email: Email, extracted_info: Dict[str, Any]) -> Application:
@@ -525,7 +272,7 @@ class IntelligentApplicationTracker:
             company_name=extracted_info.get("company_name", "Entreprise inconnue"),
             location=extracted_info.get("location"),
             status=extracted_info.get("detected_status", ApplicationStatus.APPLIED),
-            source=f"Détecté automatiquement - Email de {email.sender}",
+            source=f"{AUTO_CREATED_SOURCE_MARKER} - Email de {email.sender}",
             contact_person=extracted_info.get("contact_person"),
             notes=self._generate_application_notes(email, extracted_info),
             job_reference=extracted_info.get("job_reference"),
@@ -554,7 +301,7 @@ class IntelligentApplicationTracker:
             notes += f"⚡ Niveau d'urgence: {extracted_info['urgency_level']}\n"
         
         # Ajouter un extrait du contenu de l'email
-        snippet = email.snippet or email.raw_body
+        snippet = email.snippet or email.body_text
         if snippet:
             notes += f"\n📝 Extrait de l'email:\n{snippet[:300]}..."
         
@@ -563,28 +310,23 @@ class IntelligentApplicationTracker:
     def get_processing_summary(self, user_id: int) -> Dict[str, Any]:
         """
         Retourne un résumé du traitement des candidatures pour un utilisateur spécifique
+        
+        Lu depuis les compteurs matérialisés de l'utilisateur (UserStatsService) :
+        coût constant, indépendant du nombre de candidatures et d'emails.
         """
-        total_applications = self.db.query(Application).filter(Application.user_id == user_id).count()
-        total_emails = self.db.query(Email).filter(Email.user_id == user_id).count()
-        linked_emails = self.db.query(Email).filter(
-            Email.user_id == user_id,
-            Email.application_id.isnot(None)
-        ).count()
+        counters = UserStatsService(self.db).get_counters(user_id)
+        total_applications = counters.get("applications.total", 0)
+        total_emails = counters.get("emails.total", 0)
+        linked_emails = counters.get("emails.linked", 0)
         
         # Applications par statut pour l'utilisateur
-        status_breakdown = {}
-        for status in ApplicationStatus:
-            count = self.db.query(Application).filter(
-                Application.user_id == user_id,
-                Application.status == status.value
-            ).count()
-            status_breakdown[status.value] = count
+        status_breakdown = {
+            status.value: counters.get(f"applications.status.{status.value}", 0)
+            for status in ApplicationStatus
+        }
         
         # Applications créées automatiquement vs manuellement pour l'utilisateur
-        auto_created = self.db.query(Application).filter(
-            Application.user_id == user_id,
-            Application.source.like('%Détecté automatiquement%')
-        ).count()
+        auto_created = counters.get("applications.auto_created", 0)
         
         return {
             "total_applications": total_applications,
@@ -0,0 +1,233 @@
+"""
+File de jobs persistée dans PostgreSQL (SELECT ... FOR UPDATE SKIP LOCKED)
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import UUID
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.jobs import Job, JobStatus, JobType
+from loguru import logger
+
+
+class JobQueue:
+    """
+    File de jobs durable : les jobs sont des lignes de la table `jobs`,
+    réclamées par les workers avec FOR UPDATE SKIP LOCKED pour qu'un job
+    ne soit jamais traité par deux workers à la fois.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self,
+        job_type: JobType,
+        payload: Optional[Dict[str, Any]] = None,
+        user_id: Optional[UUID] = None,
+        parent_id: Optional[UUID] = None
+    ) -> Job:
+        """Ajouter un job à la file"""
+        job = Job(
+            job_type=job_type.value,
+            payload=payload or {},
+            user_id=user_id,
+            parent_id=parent_id,
+            max_attempts=settings.JOB_MAX_ATTEMPTS
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+
+        logger.info(f"Enqueued job {job.id} ({job.job_type})")
+        return job
+
+    def enqueue_many(
+        self,
+        job_type: JobType,
+        payloads: Iterable[Dict[str, Any]],
+        user_id: Optional[UUID] = None,
+        parent_id: Optional[UUID] = None
+    ) -> int:
+        """Ajouter plusieurs jobs du même type en un seul INSERT"""
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "job_type": job_type.value,
+                "status": JobStatus.PENDING.value,
+                "payload": payload,
+                "attempts": 0,
+                "max_attempts": settings.JOB_MAX_ATTEMPTS,
+                "user_id": user_id,
+                "parent_id": parent_id,
+                "run_after": now,
+                "created_at": now,
+                "updated_at": now
+            }
+            for payload in payloads
+        ]
+        if not rows:
+            return 0
+
+        self.db.execute(insert(Job).values(rows))
+        self.db.commit()
+
+        logger.info(f"Enqueued {len(rows)} {job_type.value} jobs")
+        return len(rows)
+
+    def enqueue_email_analysis(
+        self,
+        email_ids: Iterable[UUID],
+        user_id: Optional[UUID] = None,
+        parent_id: Optional[UUID] = None,
+        create_applications: bool = False
+    ) -> int:
+        """Planifier l'analyse NLP d'emails nouvellement insérés"""
+        return self.enqueue_many(
+            JobType.EMAIL_INSERTED,
+            (
+                {"email_id": str(email_id), "create_applications": create_applications}
+                for email_id in email_ids
+            ),
+            user_id=user_id,
+            parent_id=parent_id
+        )
+
+    def claim(self) -> Optional[Job]:
+        """
+        Réclamer le prochain job disponible
+
+        Les lignes déjà verrouillées par un autre worker sont ignorées (SKIP LOCKED),
+        le job passe en RUNNING dans la même transaction.
+        """
+        job = self.db.query(Job).filter(
+            Job.status == JobStatus.PENDING.value,
+            Job.run_after <= datetime.utcnow()
+        ).order_by(Job.run_after).with_for_update(skip_locked=True).limit(1).first()
+
+        if not job:
+            self.db.rollback()
+            return None
+
+        job.status = JobStatus.RUNNING.value
+        job.locked_at = datetime.utcnow()
+        job.attempts += 1
+        self.db.commit()
+        return job
+
+    def complete(self, job: Job, result: Optional[Dict[str, Any]] = None):
+        """Marquer un job comme terminé"""
+        job.status = JobStatus.DONE.value
+        job.result = result
+        job.error = None
+        job.finished_at = datetime.utcnow()
+        self.db.commit()
+
+    def fail(self, job: Job, error: str):
+        """
+        Enregistrer l'échec d'un job : il est replanifié avec un délai exponentiel
+        tant que le nombre maximum de tentatives n'est pas atteint
+        """
+        job.error = error
+        if job.attempts < job.max_attempts:
+            job.status = JobStatus.PENDING.value
+            job.run_after = datetime.utcnow() + timedelta(seconds=30 * 2 ** job.attempts)
+            logger.warning(f"Job {job.id} failed (attempt {job.attempts}/{job.max_attempts}), retrying: {error}")
+        else:
+            job.status = JobStatus.FAILED.value
+            job.finished_at = datetime.utcnow()
+            logger.error(f"Job {job.id} failed permanently: {error}")
+        self.db.commit()
+
+    def heartbeat(self, job_id: UUID) -> bool:
+        """
+        Signaler qu'un job RUNNING est toujours en cours (rafraîchit locked_at)
+
+        Returns:
+            False si le job n'est plus RUNNING (récupéré comme abandonné)
+        """
+        result = self.db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.RUNNING.value)
+            .values(locked_at=datetime.utcnow())
+        )
+        self.db.commit()
+        return bool(result.rowcount)
+
+    def requeue_stale_jobs(self) -> int:
+        """
+        Récupérer les jobs RUNNING dont le worker a disparu (plus de heartbeat
+        depuis JOB_LOCK_TIMEOUT_MINUTES)
+
+        Ils sont remis en file tant que le nombre maximum de tentatives n'est
+        pas atteint, sinon marqués FAILED : un job qui fait tomber son worker
+        (mémoire, crash) n'est pas relancé indéfiniment.
+        """
+        now = datetime.utcnow()
+        stale = (
+            Job.status == JobStatus.RUNNING.value,
+            Job.locked_at < now - timedelta(minutes=settings.JOB_LOCK_TIMEOUT_MINUTES)
+        )
+        failed = self.db.execute(
+            update(Job)
+            .where(*stale, Job.attempts >= Job.max_attempts)
+            .values(
+                status=JobStatus.FAILED.value,
+                locked_at=None,
+                finished_at=now,
+                error="Worker lost while running the job (maximum attempts reached)"
+            )
+        )
+        requeued = self.db.execute(
+            update(Job)
+            .where(*stale)
+            .values(status=JobStatus.PENDING.value, locked_at=None)
+        )
+        self.db.commit()
+
+        if failed.rowcount:
+            logger.error(f"Marked {failed.rowcount} stale jobs as failed (maximum attempts reached)")
+        if requeued.rowcount:
+            logger.warning(f"Requeued {requeued.rowcount} stale jobs")
+        return failed.rowcount + requeued.rowcount
+
+    def get_job(self, job_id: UUID, user_id: Optional[UUID] = None) -> Optional[Job]:
+        """Récupérer un job (optionnellement restreint à un utilisateur)"""
+        query = self.db.query(Job).filter(Job.id == job_id)
+        if user_id is not None:
+            query = query.filter(Job.user_id == user_id)
+        return query.first()
+
+    def get_progress(self, job: Job) -> Dict[str, Any]:
+        """Statut d'un job et avancement de ses sous-jobs"""
+        children = dict(
+            self.db.query(Job.status, func.count(Job.id))
+            .filter(Job.parent_id == job.id)
+            .group_by(Job.status)
+            .all()
+        )
+        total = sum(children.values())
+        remaining = children.get(JobStatus.PENDING.value, 0) + children.get(JobStatus.RUNNING.value, 0)
+
+        return {
+            "job_id": str(job.id),
+            "job_type": job.job_type,
+            "status": job.status,
+            "attempts": job.attempts,
+            "error": job.error,
+            "result": job.result,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+            "progress": {
+                "total": total,
+                "pending": children.get(JobStatus.PENDING.value, 0),
+                "running": children.get(JobStatus.RUNNING.value, 0),
+                "done": children.get(JobStatus.DONE.value, 0),
+                "failed": children.get(JobStatus.FAILED.value, 0),
+                "percent": round((total - remaining) / total * 100, 1) if total else None
+            },
+            "completed": job.status in (JobStatus.DONE.value, JobStatus.FAILED.value) and remaining == 0
+        }
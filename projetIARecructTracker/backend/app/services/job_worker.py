@@ -0,0 +1,168 @@
+"""
+Worker de la file de jobs : exécute les traitements NLP et d'ingestion hors des requêtes HTTP
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.jobs import Job, JobType
+from app.models.models import Email
+from app.services.job_queue import JobQueue
+import app.services.user_stats_service  # noqa: F401  (écouteurs de mise à jour des statistiques)
+import app.services.application_insights_service  # noqa: F401  (écouteur de recalcul des insights)
+import app.models.email_bodies  # noqa: F401  (Email.body_text, corps compressés chargés à la demande)
+from loguru import logger
+
+
+async def handle_email_inserted(db: Session, job: Job) -> Dict[str, Any]:
+    """Analyse NLP complète d'un email nouvellement inséré"""
+    from app.nlp.registry import get_nlp_services
+    from app.services.email_to_application_service import EmailToApplicationService
+
+    email = db.query(Email).filter(Email.id == job.payload["email_id"]).first()
+    if not email:
+        return {"skipped": "email not found"}
+
+    # Services NLP construits une fois par processus worker, réutilisés entre les jobs
+    orchestrator = get_nlp_services().orchestrator(db)
+    result = await orchestrator.process_email_complete(email)
+    if not result.get("processing_success"):
+        raise RuntimeError(result.get("error", "NLP processing failed"))
+
+    if job.payload.get("create_applications"):
+        action = EmailToApplicationService(db).process_email(email)
+        result["application_action"] = action
+
+    return {
+        "email_id": result["email_id"],
+        "classification": email.classification,
+        "application_id": str(email.application_id) if email.application_id else None,
+        "actions_taken": result.get("actions_taken", []),
+        "application_action": result.get("application_action")
+    }
+
+
+async def handle_imap_ingestion(db: Session, job: Job) -> Dict[str, Any]:
+    """Ingestion IMAP, puis création d'un sous-job d'analyse par email inséré"""
+    from app.services.email_ingestion import EmailIngestionService
+
+    payload = job.payload
+    ingestion_service = EmailIngestionService(db)
+
+    # L'ingestion IMAP est bloquante : l'exécuter hors de la boucle d'événements.
+    # Un job demandé par un utilisateur ne lit que ses propres comptes IMAP
+    emails = await asyncio.to_thread(
+        ingestion_service.fetch_all_accounts, payload.get("days_back", 30), job.user_id
+    )
+    email_ids = ingestion_service.bulk_save_emails_to_db(emails)
+
+    analysis_jobs = 0
+    if email_ids and payload.get("analyze_after_ingestion", True):
+        analysis_jobs = JobQueue(db).enqueue_email_analysis(
+            email_ids,
+            user_id=job.user_id,
+            parent_id=job.id,
+            create_applications=payload.get("create_applications", True)
+        )
+
+    return {
+        "emails_found": len(emails),
+        "emails_saved": len(email_ids),
+        "analysis_jobs": analysis_jobs
+    }
+
+
+JOB_HANDLERS: Dict[str, Callable[[Session, Job], Awaitable[Dict[str, Any]]]] = {
+    JobType.EMAIL_INSERTED.value: handle_email_inserted,
+    JobType.IMAP_INGESTION.value: handle_imap_ingestion,
+}
+
+
+class JobWorker:
+    """Boucle de traitement : réclame un job, l'exécute, enregistre le résultat"""
+
+    def __init__(self, name: str = "worker", poll_interval: Optional[float] = None):
+        self.name = name
+        self.poll_interval = poll_interval or settings.JOB_WORKER_POLL_SECONDS
+        self._stopping = False
+
+    def stop(self):
+        self._stopping = True
+
+    async def run_forever(self):
+        logger.info(f"Job worker {self.name} started")
+        iterations = 0
+
+        while not self._stopping:
+            # Récupérer régulièrement les jobs abandonnés par un worker arrêté brutalement
+            if iterations % 100 == 0:
+                self._requeue_stale_jobs()
+            iterations += 1
+
+            processed = await self.run_once()
+            if not processed:
+                await asyncio.sleep(self.poll_interval)
+
+        logger.info(f"Job worker {self.name} stopped")
+
+    async def run_once(self) -> bool:
+        """Traiter un job ; retourne False si la file est vide"""
+        db = SessionLocal()
+        try:
+            queue = JobQueue(db)
+            job = queue.claim()
+            if not job:
+                return False
+
+            handler = JOB_HANDLERS.get(job.job_type)
+            if handler is None:
+                queue.fail(job, f"Unknown job type: {job.job_type}")
+                return True
+
+            heartbeat = asyncio.create_task(self._heartbeat(job.id))
+            try:
+                result = await handler(db, job)
+                queue.complete(job, result)
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.job_type}) failed in {self.name}: {e}")
+                db.rollback()
+                queue.fail(job, str(e))
+            finally:
+                heartbeat.cancel()
+
+            return True
+        finally:
+            db.close()
+
+    async def _heartbeat(self, job_id):
+        """
+        Rafraîchir locked_at pendant l'exécution d'un job, pour qu'un job long
+        (ingestion IMAP) ne soit pas repris par un autre worker
+        """
+        interval = settings.JOB_LOCK_TIMEOUT_MINUTES * 60 / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self._send_heartbeat, job_id)
+            except Exception as e:
+                logger.error(f"Heartbeat failed for job {job_id}: {e}")
+
+    @staticmethod
+    def _send_heartbeat(job_id):
+        # Session dédiée : celle du job est utilisée par le handler
+        db = SessionLocal()
+        try:
+            if not JobQueue(db).heartbeat(job_id):
+                logger.warning(f"Job {job_id} is no longer running (reclaimed as stale)")
+        finally:
+            db.close()
+
+    def _requeue_stale_jobs(self):
+        db = SessionLocal()
+        try:
+            JobQueue(db).requeue_stale_jobs()
+        except Exception as e:
+            logger.error(f"Failed to requeue stale jobs: {e}")
+        finally:
+            db.close()
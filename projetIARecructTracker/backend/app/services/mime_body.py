@@ -0,0 +1,147 @@
+"""
+Extraction du corps texte des messages (payload MIME de l'API Gmail, HTML)
+
+Seule la première partie exploitable est décodée : la première partie
+text/plain, sinon la première partie text/html convertie en texte. Le décodage
+base64 est borné à EMAIL_BODY_MAX_BYTES : seul le préfixe nécessaire de la
+chaîne encodée est décodé, quelle que soit la taille du message.
+"""
+import base64
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+# Balises dont le contenu n'est jamais du texte affiché
+_SKIPPED_TAGS = {"script", "style", "head", "title", "noscript", "template"}
+# Balises qui séparent des blocs de texte
+_BLOCK_TAGS = {
+    "br", "p", "div", "tr", "li", "ul", "ol", "table", "section", "article",
+    "header", "footer", "blockquote", "pre", "hr", "h1", "h2", "h3", "h4", "h5", "h6"
+}
+
+_CHARSET_PATTERN = re.compile(r'charset\s*=\s*"?([\w.:-]+)"?', re.IGNORECASE)
+_INLINE_SPACES = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\s*\n\s*(?:\n\s*)+")
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Convertisseur HTML -> texte en flux, arrêté dès que `max_chars` caractères sont produits"""
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.length = 0
+        self.chunks: List[str] = []
+        self._skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._append(data)
+
+    def _append(self, text: str):
+        if not self.full:
+            self.chunks.append(text)
+            self.length += len(text)
+
+    def text(self) -> str:
+        text = _INLINE_SPACES.sub(" ", "".join(self.chunks))
+        return _BLANK_LINES.sub("\n\n", text).strip()[:self.max_chars]
+
+
+def html_to_text(html: str, max_chars: Optional[int] = None, chunk_size: int = 16384) -> str:
+    """Texte affiché d'un document HTML, sans scripts ni styles, borné à `max_chars` caractères"""
+    parser = _HTMLTextExtractor(max_chars or settings.EMAIL_BODY_MAX_BYTES)
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        if parser.full:
+            break
+    else:
+        parser.close()
+    return parser.text()
+
+
+def decode_base64url(data: str, max_bytes: Optional[int] = None) -> bytes:
+    """
+    Décoder au plus `max_bytes` octets d'une chaîne base64url (avec ou sans padding)
+
+    Seul le préfixe utile (4 caractères encodés pour 3 octets) est décodé.
+    """
+    max_bytes = max_bytes or settings.EMAIL_BODY_MAX_BYTES
+    needed = (max_bytes + 2) // 3 * 4
+    if len(data) > needed:
+        data = data[:needed]
+    else:
+        data += "=" * (-len(data) % 4)
+    return base64.urlsafe_b64decode(data)[:max_bytes]
+
+
+def _part_charset(part: Dict[str, Any]) -> str:
+    for header in part.get("headers", ()):
+        if header.get("name", "").lower() == "content-type":
+            match = _CHARSET_PATTERN.search(header.get("value", ""))
+            if match:
+                return match.group(1)
+    return "utf-8"
+
+
+def _decode_part(part: Dict[str, Any], max_bytes: int) -> str:
+    raw = decode_base64url(part["body"]["data"], max_bytes)
+    try:
+        return raw.decode(_part_charset(part), errors="ignore")
+    except LookupError:
+        # Jeu de caractères inconnu de Python
+        return raw.decode("utf-8", errors="ignore")
+
+
+def extract_gmail_body(payload: Dict[str, Any], max_bytes: Optional[int] = None) -> Optional[str]:
+    """
+    Corps texte d'un payload de message Gmail (format `full`)
+
+    Parcours itératif des parties dans l'ordre du document, arrêté à la
+    première partie text/plain ; à défaut, la première partie text/html est
+    convertie en texte. Les pièces jointes (partie avec nom de fichier) sont ignorées.
+    """
+    max_bytes = max_bytes or settings.EMAIL_BODY_MAX_BYTES
+    html_part = None
+    stack = [payload]
+
+    while stack:
+        part = stack.pop()
+        sub_parts = part.get("parts")
+        if sub_parts:
+            # Empilées à l'envers pour être visitées dans l'ordre
+            stack.extend(reversed(sub_parts))
+            continue
+        if part.get("filename") or not part.get("body", {}).get("data"):
+            continue
+
+        mime_type = part.get("mimeType", "")
+        if mime_type == "text/plain":
+            return _decode_part(part, max_bytes)
+        if mime_type == "text/html" and html_part is None:
+            html_part = part
+
+    if html_part is not None:
+        return html_to_text(_decode_part(html_part, max_bytes), max_chars=max_bytes)
+    return None
@@ -0,0 +1,72 @@
+"""
+Hachage scrypt des mots de passe dans un pool de threads borné
+
+scrypt est volontairement coûteux en CPU et en mémoire : une rafale de
+connexions exécutée directement dans les threads de l'API les occuperait tous.
+Les calculs passent donc par un pool dédié de PASSWORD_HASH_WORKERS threads
+(hashlib.scrypt libère le GIL), et au-delà de PASSWORD_HASH_MAX_PENDING calculs
+en cours ou en attente les nouvelles demandes sont refusées immédiatement
+(PasswordHashingBusy, traduite en 503 par les endpoints).
+
+Les paramètres de coût sont configurables ; un hash créé avec d'autres
+paramètres est vérifié normalement puis recalculé avec les paramètres courants
+(voir verify_and_update).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app.core.config import settings
+
+# Utiliser scrypt qui n'a pas de limite de longueur pour éviter les problèmes bcrypt
+pwd_context = CryptContext(
+    schemes=["scrypt"],
+    deprecated="auto",
+    scrypt__rounds=settings.PASSWORD_SCRYPT_ROUNDS,
+    scrypt__block_size=settings.PASSWORD_SCRYPT_BLOCK_SIZE,
+    scrypt__parallelism=settings.PASSWORD_SCRYPT_PARALLELISM
+)
+
+
+class PasswordHashingBusy(Exception):
+    """Trop de calculs de hash en cours : la demande est refusée sans attendre"""
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_pending = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+
+def _submit(function, *args):
+    """Exécuter `function` dans le pool et attendre son résultat"""
+    if not _pending.acquire(blocking=False):
+        raise PasswordHashingBusy("Trop de demandes d'authentification en cours")
+    try:
+        future = _executor.submit(function, *args)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return future.result()
+
+
+def hash_password(password: str) -> str:
+    """Hasher un mot de passe avec les paramètres scrypt courants"""
+    return _submit(pwd_context.hash, password)
+
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Vérifier un mot de passe
+
+    Returns:
+        (valide, nouveau hash à enregistrer si les paramètres du hash stocké ne
+        sont plus les paramètres courants, sinon None)
+    """
+    return _submit(pwd_context.verify_and_update, password, hashed_password)
+
+
+def shutdown_password_hashing():
+    _executor.shutdown(wait=False, cancel_futures=True)
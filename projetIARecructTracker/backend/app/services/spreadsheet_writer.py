@@ -0,0 +1,166 @@
+"""
+Écriture en flux de tableurs CSV et XLSX
+
+Les lignes sont consommées une à une et le fichier est produit par morceaux
+d'octets, à passer tels quels à une StreamingResponse : la mémoire utilisée ne
+dépend pas du nombre de lignes et le premier octet part immédiatement.
+
+Le XLSX est un classeur minimal (une feuille, chaînes inline) écrit avec
+zipfile sur un flux non positionnable, sans dépendance supplémentaire.
+"""
+import csv
+import io
+import re
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, List
+from xml.sax.saxutils import escape
+
+# Nombre de lignes écrites entre deux morceaux envoyés au client
+ROWS_PER_CHUNK = 200
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+# Caractères de contrôle interdits en XML 1.0
+_ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Flux d'écriture non positionnable dont on récupère les octets au fur et à mesure"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # zipfile a besoin de la position courante, pas de seek
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def _cell_xml(reference: str, value: Any) -> str:
+    if value is None or value == "":
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row_xml(row_number: int, values: List[Any], letters: List[str]) -> bytes:
+    cells = "".join(_cell_xml(f"{letter}{row_number}", value) for letter, value in zip(letters, values))
+    return f'<row r="{row_number}">{cells}</row>'.encode("utf-8")
+
+
+def iter_xlsx(rows: Iterable[Dict[str, Any]], columns: List[str], sheet_name: str = "Feuille1") -> Iterator[bytes]:
+    """Classeur XLSX d'une feuille (ligne d'en-tête `columns`), produit par morceaux"""
+    sink = _ChunkSink()
+    letters = [_column_letter(index) for index in range(len(columns))]
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(sheet_name=escape(sheet_name[:31])))
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        yield sink.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(_SHEET_HEADER.encode("utf-8"))
+            sheet.write(_row_xml(1, columns, letters))
+            for row_number, row in enumerate(rows, start=2):
+                sheet.write(_row_xml(row_number, [row.get(column) for column in columns], letters))
+                if row_number % ROWS_PER_CHUNK == 0:
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            sheet.write(_SHEET_FOOTER.encode("utf-8"))
+
+    yield sink.drain()
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    """Fichier CSV UTF-8 (avec BOM, pour l'ouverture directe dans Excel), produit par morceaux"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    yield "\ufeff".encode("utf-8") + buffer.getvalue().encode("utf-8")
+
+    buffer.seek(0)
+    buffer.truncate()
+    for row_number, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if row_number % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
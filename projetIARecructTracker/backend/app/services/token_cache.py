@@ -0,0 +1,112 @@
+"""
+Cache en mémoire des tokens vérifiés -> instantané de l'utilisateur
+
+Évite, pour chaque requête authentifiée, le décodage du JWT et la lecture de
+l'utilisateur en base. Une entrée vit au plus AUTH_CACHE_TTL_SECONDS (et jamais
+au-delà de l'expiration du token) ; elle est invalidée dans ce processus à la
+déconnexion et à toute modification de l'utilisateur (mot de passe, connexion
+ou déconnexion Gmail...). Les autres processus la conservent au plus le TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+from uuid import UUID
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.core.config import settings
+from app.models.models import User
+
+
+class TokenUserCache:
+    """LRU à durée de vie limitée : token -> valeurs des colonnes de l'utilisateur"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[UUID, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return snapshot
+
+    def put(self, token: str, user: User, token_expires_at: Optional[float] = None):
+        """
+        Args:
+            token_expires_at: expiration du token (timestamp Unix), qui borne celle de l'entrée
+        """
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        lifetime = self.ttl_seconds
+        if token_expires_at is not None:
+            lifetime = min(lifetime, token_expires_at - time.time())
+        if lifetime <= 0:
+            return
+
+        snapshot = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (time.monotonic() + lifetime, snapshot)
+            self._tokens_by_user.setdefault(snapshot["id"], set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            self._remove(token)
+
+    def invalidate_user(self, user_id: UUID):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user_id = entry[1]["id"]
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+    @staticmethod
+    def attach(db: Session, snapshot: Dict[str, Any]) -> User:
+        """
+        Utilisateur persistant de la session construit depuis l'instantané, sans requête
+
+        merge(load=False) rattache l'objet tel quel : ses modifications ultérieures
+        sont flushées normalement, et il est rechargé de la base après un commit.
+        """
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+token_user_cache = TokenUserCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User):
+    """Toute modification de l'utilisateur rend ses instantanés en cache obsolètes"""
+    token_user_cache.invalidate_user(target.id)
@@ -0,0 +1,259 @@
+"""
+Statistiques matérialisées par utilisateur (table user_stat_counters)
+
+Les compteurs sont maintenus incrémentalement par un écouteur `after_flush` de
+la session : toute création, suppression ou modification du statut, de la
+source, de la classification ou du rattachement d'une candidature ou d'un
+email, quel que soit le service qui l'effectue (ApplicationService,
+EmailService, orchestrateur NLP, tracker), met à jour les compteurs dans la
+même transaction.
+
+Les écritures en masse (Query.update, insert Core) échappent à l'écouteur :
+UserStatsService.reconcile recalcule les compteurs depuis les tables sources,
+périodiquement via le scheduler, et à l'initialisation de la base
+(init_database.py, y compris quand le scheduler est désactivé).
+"""
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import String, cast, delete, event, func, inspect, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.core.database import lift_statement_timeout
+from app.models.indexes import AUTO_CREATED_SOURCE_MARKER
+from app.models.models import Application, Email
+from app.models.user_stats import UNASSIGNED_USER_ID, UserStatCounter
+from loguru import logger
+
+# Attributs dont dépendent les compteurs, par modèle
+TRACKED_ATTRIBUTES = {
+    Application: ("user_id", "status", "source"),
+    Email: ("user_id", "classification", "application_id"),
+}
+
+# Verrou consultatif PostgreSQL du recalcul (entier signé, voir app.core.scheduler)
+RECONCILE_LOCK_KEY = zlib.crc32(b"user-stats-reconcile") - 2 ** 31
+
+CounterKey = Tuple[UUID, str]
+
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+
+def _counters(obj, values: Dict[str, Any]) -> Counter:
+    """Compteurs auxquels contribue une candidature ou un email dans l'état `values`"""
+    user_id = values["user_id"] or UNASSIGNED_USER_ID
+    counters = Counter()
+
+    if isinstance(obj, Application):
+        counters[(user_id, "applications.total")] += 1
+        status = _enum_value(values["status"])
+        if status:
+            counters[(user_id, f"applications.status.{status}")] += 1
+        if values["source"] and AUTO_CREATED_SOURCE_MARKER in values["source"]:
+            counters[(user_id, "applications.auto_created")] += 1
+    else:
+        counters[(user_id, "emails.total")] += 1
+        classification = _enum_value(values["classification"])
+        if classification:
+            counters[(user_id, "emails.classified")] += 1
+            counters[(user_id, f"emails.classification.{classification}")] += 1
+        if values["application_id"]:
+            counters[(user_id, "emails.linked")] += 1
+
+    return counters
+
+
+def _current_values(obj, names) -> Dict[str, Any]:
+    return {name: getattr(obj, name) for name in names}
+
+
+def _previous_values(obj, names) -> Dict[str, Any]:
+    """Valeurs au début du flush (l'historique des attributs est encore disponible dans after_flush)"""
+    state = inspect(obj)
+    values = {}
+    for name in names:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            # Attribut affecté alors que l'ancienne valeur était vide
+            values[name] = None
+    return values
+
+
+def _has_tracked_changes(obj, names) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_values(session: Session, flush_context, instances):
+    """Charger les attributs suivis des objets supprimés tant que la ligne existe encore"""
+    for obj in session.deleted:
+        names = TRACKED_ATTRIBUTES.get(type(obj))
+        if names:
+            _current_values(obj, names)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_counters(session: Session, flush_context):
+    """Appliquer les variations de compteurs du flush dans la même transaction"""
+    deltas = Counter()
+
+    for obj in session.new:
+        names = TRACKED_ATTRIBUTES.get(type(obj))
+        if names:
+            deltas.update(_counters(obj, _current_values(obj, names)))
+
+    for obj in session.deleted:
+        names = TRACKED_ATTRIBUTES.get(type(obj))
+        if names:
+            deltas.subtract(_counters(obj, _previous_values(obj, names)))
+
+    for obj in session.dirty:
+        names = TRACKED_ATTRIBUTES.get(type(obj))
+        if names and _has_tracked_changes(obj, names):
+            deltas.subtract(_counters(obj, _previous_values(obj, names)))
+            deltas.update(_counters(obj, _current_values(obj, names)))
+
+    deltas = {key: value for key, value in deltas.items() if value}
+    if deltas:
+        UserStatsService.apply_deltas(session.connection(), deltas)
+
+
+def _require_previous_values(target, value, oldvalue, initiator):
+    """Écouteur vide : seule l'option active_history compte"""
+
+
+# Sans historique actif, affecter un attribut expiré (après un commit) ne
+# charge pas l'ancienne valeur : le compteur à décrémenter serait inconnu
+for _model, _names in TRACKED_ATTRIBUTES.items():
+    for _name in _names:
+        event.listen(getattr(_model, _name), "set", _require_previous_values, active_history=True)
+
+
+class UserStatsService:
+    """Lecture et recalcul des statistiques matérialisées par utilisateur"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def apply_deltas(connection, deltas: Dict[CounterKey, int]):
+        """
+        Upsert `value = value + delta` des compteurs modifiés
+
+        Les lignes sont triées pour que deux transactions concurrentes les
+        verrouillent dans le même ordre (pas d'interblocage).
+        """
+        now = datetime.utcnow()
+        stmt = pg_insert(UserStatCounter).values([
+            {"user_id": user_id, "name": name, "value": value, "updated_at": now}
+            for (user_id, name), value in sorted(deltas.items(), key=lambda item: (str(item[0][0]), item[0][1]))
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserStatCounter.user_id, UserStatCounter.name],
+            set_={"value": UserStatCounter.value + stmt.excluded.value, "updated_at": stmt.excluded.updated_at}
+        )
+        connection.execute(stmt)
+
+    @staticmethod
+    def counters_statement(user_id: Optional[UUID] = None):
+        """
+        Requête des compteurs d'un utilisateur, ou de la somme sur tous les
+        utilisateurs (partagée avec les endpoints asynchrones)
+        """
+        if user_id is not None:
+            return select(UserStatCounter.name, UserStatCounter.value).where(UserStatCounter.user_id == user_id)
+        return select(
+            UserStatCounter.name, func.sum(UserStatCounter.value).label("value")
+        ).group_by(UserStatCounter.name)
+
+    def get_counters(self, user_id: Optional[UUID] = None) -> Dict[str, int]:
+        rows = self.db.execute(self.counters_statement(user_id)).all()
+        return {row.name: int(row.value) for row in rows}
+
+    def reconcile(self, user_id: Optional[UUID] = None) -> int:
+        """
+        Recalculer les compteurs (d'un utilisateur ou de tous) depuis les tables sources
+
+        La suppression et le recalcul sont faits dans une transaction, sous un
+        verrou consultatif pour qu'un seul recalcul s'exécute à la fois. Le
+        recalcul écrase les compteurs créés entre-temps par une transaction
+        concurrente (premier email d'un utilisateur, nouvelle classification).
+
+        Returns:
+            Nombre de compteurs écrits
+        """
+        acquired = self.db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RECONCILE_LOCK_KEY}
+        ).scalar()
+        if not acquired:
+            logger.info("User stats reconciliation already running, skipping")
+            self.db.rollback()
+            return 0
+
+        try:
+            lift_statement_timeout(self.db)
+            delete_stmt = delete(UserStatCounter)
+            if user_id is not None:
+                delete_stmt = delete_stmt.where(UserStatCounter.user_id == user_id)
+            self.db.execute(delete_stmt)
+
+            insert_stmt = pg_insert(UserStatCounter).from_select(
+                ["user_id", "name", "value", "updated_at"],
+                self._recount_statement(user_id)
+            )
+            result = self.db.execute(insert_stmt.on_conflict_do_update(
+                index_elements=[UserStatCounter.user_id, UserStatCounter.name],
+                set_={"value": insert_stmt.excluded.value, "updated_at": insert_stmt.excluded.updated_at}
+            ))
+            self.db.commit()
+            return result.rowcount
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _recount_statement(self, user_id: Optional[UUID]):
+        now = literal(datetime.utcnow())
+
+        def counts(model, name, *criteria, group_by=None):
+            owner = func.coalesce(model.user_id, UNASSIGNED_USER_ID)
+            stmt = select(owner, name, func.count(model.id), now).where(*criteria)
+            if user_id is not None:
+                stmt = stmt.where(model.user_id == user_id)
+            return stmt.group_by(owner, *([group_by] if group_by is not None else []))
+
+        def prefixed(prefix, column):
+            return literal(prefix) + cast(column, String)
+
+        return union_all(
+            counts(Application, literal("applications.total")),
+            counts(
+                Application, prefixed("applications.status.", Application.status),
+                Application.status.isnot(None), group_by=Application.status
+            ),
+            counts(Application, literal("applications.auto_created"), Application.is_auto_created),
+            counts(Email, literal("emails.total")),
+            counts(Email, literal("emails.classified"), Email.classification.isnot(None)),
+            counts(
+                Email, prefixed("emails.classification.", Email.classification),
+                Email.classification.isnot(None), group_by=Email.classification
+            ),
+            counts(Email, literal("emails.linked"), Email.application_id.isnot(None)),
+        )
+
+    @staticmethod
+    def breakdown(counters: Dict[str, int], prefix: str) -> Dict[str, int]:
+        """Compteurs `prefix.<clé>` sous forme {clé: valeur}"""
+        return {
+            name[len(prefix) + 1:]: value
+            for name, value in counters.items()
+            if name.startswith(f"{prefix}.") and value
+        }
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark de sauvegarde des emails : boucle ORM (save_emails_to_db)
+contre le chemin bulk (bulk_save_emails_to_db)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import time
+import uuid
+from datetime import datetime, timezone
+
+from app.core.database import SessionLocal
+from app.models.models import Email
+from app.services.email_ingestion import EmailIngestionService
+
+BENCH_PREFIX = "bench-save-"
+
+
+def build_emails(count: int):
+    """Générer des emails synthétiques au format produit par l'ingestion IMAP"""
+    run_id = uuid.uuid4().hex[:8]
+    emails = []
+    for i in range(count):
+        body = f"Bonjour, nous avons bien reçu votre candidature n°{i}. " * 20
+        emails.append({
+            "message_id": f"<{BENCH_PREFIX}{run_id}-{i}@example.com>",
+            "subject": f"Candidature Développeur Python #{i}",
+            "sender": f"rh{i % 50}@entreprise{i % 50}.com",
+            "recipients": ["candidat@example.com"],
+            "cc": [],
+            "bcc": [],
+            "sent_at": datetime.now(timezone.utc),
+            "body": body,
+            "snippet": body[:200] + "...",
+        })
+    return emails
+
+
+def cleanup(db):
+    db.query(Email).filter(Email.external_id.like(f"<{BENCH_PREFIX}%")).delete(synchronize_session=False)
+    db.commit()
+
+
+def run(label: str, save, emails) -> float:
+    start = time.perf_counter()
+    saved = save(emails)
+    elapsed = time.perf_counter() - start
+    saved_count = saved if isinstance(saved, int) else len(saved)
+    rate = saved_count / elapsed if elapsed > 0 else float("inf")
+    print(f"{label:<10} {saved_count:>7} lignes en {elapsed:7.3f}s  ->  {rate:10.0f} lignes/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=5000, help="Nombre d'emails par passe")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        cleanup(db)
+        service = EmailIngestionService(db)
+
+        print(f"Sauvegarde de {args.count} emails")
+        orm_rate = run("ORM", service.save_emails_to_db, build_emails(args.count))
+        bulk_rate = run("Bulk", service.bulk_save_emails_to_db, build_emails(args.count))
+        print(f"Accélération : x{bulk_rate / orm_rate:.1f}")
+    finally:
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de l'extraction par règles des emails : implémentation
+précédente d'IntelligentApplicationTracker (motif par motif, texte remis en
+minuscules dans chaque méthode) contre app.nlp.rule_extractor, et extraction
+du lot complet sur plusieurs processus (app.nlp.extraction_pool)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from app.models.schemas import ApplicationStatus, EmailClassification
+from app.nlp.rule_extractor import extract_application_fields
+from app.nlp.extraction_pool import extract_application_fields_batch, shutdown_extraction_pool
+
+
+# --- Implémentation précédente, conservée à l'identique pour comparaison ---
+
+def legacy_extract(subject, body, sender, classification):
+    content = f"{subject} {body or ''}"
+    return {
+        "email_type": classification,
+        "sender_domain": legacy_domain(sender),
+        "company_name": legacy_company_name(subject, body, sender),
+        "job_title": legacy_job_title(subject, body),
+        "detected_status": legacy_status(subject, body, classification),
+        "salary_info": legacy_salary(content),
+        "interview_date": legacy_interview_date(content),
+        "contact_person": legacy_contact_person(sender),
+        "urgency_level": legacy_urgency(subject, body),
+        "response_deadline": legacy_deadline(content),
+        "job_reference": legacy_job_reference(content),
+        "location": legacy_location(content),
+        "keywords": legacy_keywords(content)
+    }
+
+
+def legacy_domain(email_address):
+    if '@' in email_address:
+        return email_address.split('@')[1].lower()
+    return None
+
+
+def legacy_company_name(subject, body, sender):
+    domain = legacy_domain(sender)
+    company_from_domain = None
+    if domain and domain not in ['gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com']:
+        company_from_domain = domain.replace('.com', '').replace('.fr', '').replace('.org', '')
+        company_from_domain = company_from_domain.split('.')[0].title()
+    content = f"{subject} {body or ''}"
+    for pattern in [r"équipe (\w+)", r"société (\w+)", r"entreprise (\w+)", r"groupe (\w+)",
+                    r"(\w+) recrute", r"rejoindre (\w+)", r"poste chez (\w+)", r"candidature (\w+)"]:
+        match = re.search(pattern, content.lower())
+        if match:
+            return match.group(1).title()
+    if company_from_domain:
+        return company_from_domain
+    sender_name = sender.split('@')[0] if '@' in sender else sender
+    return sender_name.title()
+
+
+def legacy_job_title(subject, body):
+    content = f"{subject} {body or ''}"
+    for pattern in [r"poste de ([^,\.\n]+)", r"poste ([^,\.\n]+)", r"développeur ([^,\.\n]+)",
+                    r"ingénieur ([^,\.\n]+)", r"chef de projet ([^,\.\n]+)", r"manager ([^,\.\n]+)",
+                    r"analyste ([^,\.\n]+)", r"consultant ([^,\.\n]+)", r"pour le poste ([^,\.\n]+)",
+                    r"offre d'emploi ([^,\.\n]+)", r"candidature ([^,\.\n]+)"]:
+        match = re.search(pattern, content.lower())
+        if match:
+            return re.sub(r'[^\w\s-]', '', match.group(1).strip()).title()
+    subject_lower = subject.lower()
+    if any(keyword in subject_lower for keyword in ['développeur', 'developer', 'ingénieur', 'engineer']):
+        return "Développeur"
+    elif any(keyword in subject_lower for keyword in ['manager', 'chef', 'lead']):
+        return "Manager"
+    elif any(keyword in subject_lower for keyword in ['analyste', 'analyst']):
+        return "Analyste"
+    return "Poste non spécifié"
+
+
+def legacy_status(subject, body, classification):
+    content = f"{subject} {body or ''}".lower()
+    if classification == EmailClassification.ACK.value:
+        return ApplicationStatus.ACKNOWLEDGED
+    elif classification == EmailClassification.REJECTED.value:
+        return ApplicationStatus.REJECTED
+    elif classification == EmailClassification.INTERVIEW.value:
+        return ApplicationStatus.INTERVIEW
+    elif classification == EmailClassification.OFFER.value:
+        return ApplicationStatus.OFFER
+    elif classification == EmailClassification.REQUEST.value:
+        if any(keyword in content for keyword in ['votre candidature', 'votre cv', 'candidature envoyée']):
+            return ApplicationStatus.APPLIED
+        return ApplicationStatus.SCREENING
+    if any(keyword in content for keyword in ['rejeté', 'refusé', 'pas retenu', 'n\'avons pas']):
+        return ApplicationStatus.REJECTED
+    elif any(keyword in content for keyword in ['entretien', 'interview', 'rencontre', 'rendez-vous']):
+        return ApplicationStatus.INTERVIEW
+    elif any(keyword in content for keyword in ['offre', 'proposition', 'contrat']):
+        return ApplicationStatus.OFFER
+    elif any(keyword in content for keyword in ['reçu', 'accusé', 'bien reçue']):
+        return ApplicationStatus.ACKNOWLEDGED
+    return ApplicationStatus.APPLIED
+
+
+def legacy_salary(content):
+    for pattern in [r'(\d+\.?\d*k?)\s*€?\s*(?:par an|annuel|k€)', r'salaire.*?(\d+\.?\d*k?)\s*€',
+                    r'rémunération.*?(\d+\.?\d*k?)\s*€', r'(\d+)\s*à\s*(\d+)\s*k€']:
+        match = re.search(pattern, content.lower())
+        if match:
+            return match.group(0)
+    return None
+
+
+def legacy_interview_date(content):
+    months = {'janvier': 1, 'février': 2, 'mars': 3, 'avril': 4, 'mai': 5, 'juin': 6, 'juillet': 7,
+              'août': 8, 'septembre': 9, 'octobre': 10, 'novembre': 11, 'décembre': 12}
+    for pattern in [r'(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',
+                    r'(\d{1,2})\s+(janvier|février|mars|avril|mai|juin|juillet|août|septembre|octobre|novembre|décembre)\s+(\d{4})']:
+        match = re.search(pattern, content.lower())
+        if match:
+            try:
+                if match.group(2).isdigit():
+                    return datetime(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+                return datetime(int(match.group(3)), months.get(match.group(2), 1), int(match.group(1)))
+            except ValueError:
+                continue
+    return None
+
+
+def legacy_contact_person(sender):
+    if '@' in sender:
+        name_parts = re.split(r'[.\-_]', sender.split('@')[0])
+        if len(name_parts) >= 2:
+            return ' '.join(part.title() for part in name_parts[:2])
+    return None
+
+
+def legacy_urgency(subject, body):
+    content = f"{subject} {body or ''}".lower()
+    if any(keyword in content for keyword in ['urgent', 'rapidement', 'dès que possible', 'immédiatement']):
+        return "URGENT"
+    elif any(keyword in content for keyword in ['bientôt', 'prochainement', 'dans les plus brefs délais']):
+        return "HIGH"
+    return "NORMAL"
+
+
+def legacy_deadline(content):
+    for pattern in [r'avant le (\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',
+                    r'deadline.*?(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})', r'réponse.*?(\d{1,2})\s+jours?']:
+        match = re.search(pattern, content.lower())
+        if match:
+            try:
+                if 'jours' in pattern:
+                    return datetime.now() + timedelta(days=int(match.group(1)))
+                return datetime(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+            except ValueError:
+                continue
+    return None
+
+
+def legacy_job_reference(content):
+    for pattern in [r'ref[erence]*[:\s]*([A-Za-z0-9\-_]+)', r'référence[:\s]*([A-Za-z0-9\-_]+)',
+                    r'job[:\s]*([A-Za-z0-9\-_]+)']:
+        match = re.search(pattern, content.lower())
+        if match:
+            return match.group(1).upper()
+    return None
+
+
+def legacy_location(content):
+    for pattern in [r'localisation[:\s]*([^,\.\n]+)', r'lieu[:\s]*([^,\.\n]+)', r'basé[e]? à ([^,\.\n]+)',
+                    r'situé[e]? à ([^,\.\n]+)', r'télétravail', r'remote',
+                    r'paris|lyon|marseille|toulouse|nantes|strasbourg|bordeaux|lille']:
+        match = re.search(pattern, content.lower())
+        if match:
+            if match.group(0) in ['télétravail', 'remote']:
+                return 'Télétravail'
+            return match.group(1).title() if len(match.groups()) > 0 else match.group(0).title()
+    return None
+
+
+def legacy_keywords(content):
+    tech_keywords = [
+        'python', 'java', 'javascript', 'react', 'angular', 'vue', 'node.js',
+        'machine learning', 'ia', 'intelligence artificielle', 'data science',
+        'sql', 'postgresql', 'mongodb', 'aws', 'azure', 'docker', 'kubernetes',
+        'agile', 'scrum', 'devops', 'ci/cd', 'git'
+    ]
+    content_lower = content.lower()
+    return [keyword for keyword in tech_keywords if keyword in content_lower]
+
+
+# --- Jeu de données synthétique ---
+
+SENTENCES = [
+    "Nous avons bien reçu votre candidature pour le poste de Développeur Python.",
+    "Notre équipe Datalab recrute un ingénieur Data, basé à Lyon.",
+    "Nous souhaitons vous rencontrer pour un entretien le 12/03/2025 à 14h.",
+    "Malheureusement nous n'avons pas retenu votre profil.",
+    "Salaire proposé : 45k€ par an, télétravail partiel possible.",
+    "Merci de nous faire un retour avant le 30/04/2025, réponse sous 5 jours.",
+    "Référence: DEV-2025-042. Stack : Java, JavaScript, Docker, Kubernetes, SQL et Git.",
+    "Vous rejoindrez la société Acme dans le cadre d'une mission agile / scrum.",
+    "Nous revenons vers vous rapidement avec une proposition de contrat.",
+    "Localisation : Paris La Défense. Entretien prévu le 3 mars 2025.",
+]
+SENDERS = ["jean.dupont@acme.fr", "rh@capgemini.com", "recrutement@gmail.com", "talent-team@datalab.io"]
+CLASSIFICATIONS = [c.value for c in EmailClassification] + [None]
+
+
+def build_emails(count, seed=42):
+    rng = random.Random(seed)
+    emails = []
+    for _ in range(count):
+        body = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(5, 40)))
+        emails.append((rng.choice(SENTENCES)[:60], body, rng.choice(SENDERS), rng.choice(CLASSIFICATIONS)))
+    return emails
+
+
+def comparable(result):
+    """Les échéances relatives (« sous N jours ») dépendent de l'heure d'exécution"""
+    result = dict(result)
+    if result["response_deadline"]:
+        result["response_deadline"] = result["response_deadline"].date()
+    return result
+
+
+def run(label, extract, emails):
+    start = time.perf_counter()
+    for email in emails:
+        extract(*email)
+    elapsed = time.perf_counter() - start
+    per_email_us = elapsed / len(emails) * 1_000_000
+    print(f"{label:<10} {len(emails):>7} emails en {elapsed:7.3f}s  ->  {per_email_us:8.1f} µs/email")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=5000, help="Nombre d'emails synthétiques")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Processus pour l'extraction par lot")
+    args = parser.parse_args()
+
+    emails = build_emails(args.count)
+
+    mismatches = sum(
+        comparable(legacy_extract(*email)) != comparable(extract_application_fields(*email))
+        for email in emails
+    )
+    print(f"Résultats différents : {mismatches}/{len(emails)}")
+
+    legacy_time = run("Précédent", legacy_extract, emails)
+    compiled_time = run("Compilé", extract_application_fields, emails)
+    print(f"Accélération : x{legacy_time / compiled_time:.1f}")
+
+    if args.processes > 1:
+        batch = [(index, *email) for index, email in enumerate(emails)]
+        # Premier appel : démarrage des processus du pool, exclu de la mesure
+        extract_application_fields_batch(batch[:args.processes], processes=args.processes)
+        start = time.perf_counter()
+        extract_application_fields_batch(batch, processes=args.processes)
+        pool_time = time.perf_counter() - start
+        shutdown_extraction_pool()
+        print(f"{f'Pool x{args.processes}':<10} {len(emails):>7} emails en {pool_time:7.3f}s  ->  "
+              f"{pool_time / len(emails) * 1_000_000:8.1f} µs/email  (x{compiled_time / pool_time:.1f})")
+
+
+if __name__ == "__main__":
+    main()
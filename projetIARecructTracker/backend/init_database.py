@@ -4,7 +4,16 @@ Script pour initialiser les tables de la base de données
 """
 from sqlalchemy import create_engine, inspect
 from app.core.config import settings
-from app.models.models import Base
+from app.core.database import SessionLocal
+from app.core.schema_upgrade import upgrade_schema
+import app.models.jobs  # noqa: F401  (enregistre la table jobs dans les métadonnées)
+import app.models.indexes  # noqa: F401  (index pg_trgm sur applications)
+import app.models.user_stats  # noqa: F401  (compteurs des tableaux de bord)
+import app.models.application_insights  # noqa: F401  (métriques précalculées des candidatures)
+import app.models.revoked_tokens  # noqa: F401  (tokens révoqués à la déconnexion)
+import app.models.oauth_states  # noqa: F401  (states OAuth Gmail en attente)
+import app.models.user_gmail  # noqa: F401  (échecs de rafraîchissement des tokens Gmail)
+import app.models.email_bodies  # noqa: F401  (corps d'emails compressés)
 from loguru import logger
 
 def create_tables():
@@ -15,8 +24,10 @@ def create_tables():
         # Créer l'engine avec l'URL de base de données
         engine = create_engine(settings.DATABASE_URL)
         
-        # Créer toutes les tables
-        Base.metadata.create_all(bind=engine)
+        # Créer toutes les tables, et ajouter aux tables existantes les colonnes
+        # et index déclarés depuis leur création (create_all ne les modifie pas)
+        with engine.begin() as conn:
+            upgrade_schema(conn)
         
         # Vérifier les tables créées
         inspector = inspect(engine)
@@ -33,6 +44,23 @@ def create_tables():
         logger.error(f"❌ Erreur lors de la création des tables: {e}")
         return False
 
+def backfill_user_stats():
+    """Calculer les compteurs des tableaux de bord pour les données existantes"""
+    from app.services.user_stats_service import UserStatsService
+
+    db = SessionLocal()
+    try:
+        logger.info("📊 Calcul des statistiques des tableaux de bord...")
+        written = UserStatsService(db).reconcile()
+        logger.info(f"📊 {written} compteurs écrits")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Erreur lors du calcul des statistiques: {e}")
+        return False
+    finally:
+        db.close()
+
 def test_tables():
     """Tester l'accès aux tables"""
     try:
@@ -59,6 +87,7 @@ if __name__ == "__main__":
     success = create_tables()
     if success:
         test_tables()
+        backfill_user_stats()
         logger.success("🎉 Initialisation terminée avec succès")
     else:
         logger.error("💥 Échec de l'initialisation")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Script pour déplacer les corps et en-têtes bruts des emails existants vers le
+stockage compressé (table email_bodies), puis supprimer les textes orphelins
+
+À lancer avant de démarrer la nouvelle version de l'API : il ajoute d'abord
+les colonnes body_digest / headers_digest à la table emails.
+
+Peut être relancé sans risque : seuls les emails dont le corps est encore
+stocké dans la table emails sont traités.
+"""
+import sys
+from app.core.database import SessionLocal, engine
+from app.core.schema_upgrade import upgrade_schema
+from app.services.email_body_store import EmailBodyStore
+from loguru import logger
+
+def migrate(batch_size: int = 500):
+    """Migrer les corps d'emails par lots puis nettoyer les textes orphelins"""
+    db = SessionLocal()
+    try:
+        logger.info("🔧 Mise à jour du schéma (tables, colonnes et index ajoutés)...")
+        with engine.begin() as conn:
+            upgrade_schema(conn)
+
+        store = EmailBodyStore(db)
+
+        logger.info("📦 Migration des corps d'emails vers le stockage compressé...")
+        migrated = store.migrate_inline_bodies(batch_size)
+        logger.success(f"✅ {migrated} emails migrés")
+
+        deleted = store.delete_orphans()
+        logger.info(f"🧹 {deleted} textes orphelins supprimés")
+        logger.info("💡 Lancer VACUUM sur la table emails pour libérer l'espace")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la migration des corps d'emails: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    if not migrate(batch_size):
+        exit(1)
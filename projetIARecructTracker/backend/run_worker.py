@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Script pour lancer les workers de la file de jobs (analyse NLP, ingestion IMAP)
+"""
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+from loguru import logger
+
+
+def run_worker(name: str):
+    """Point d'entrée d'un processus worker"""
+    from app.services.job_worker import JobWorker
+
+    worker = JobWorker(name=name)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    try:
+        asyncio.run(worker.run_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=1, help="Nombre de processus workers")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker("worker-1")
+    else:
+        # spawn : chaque worker crée son propre pool de connexions
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=run_worker, args=(f"worker-{i + 1}",), name=f"worker-{i + 1}")
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        logger.info(f"Started {len(processes)} job workers")
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+                process.join()
@@ -4,7 +4,8 @@ set -e
 # Create additional databases or setup initial configuration if needed
 echo "PostgreSQL initialization complete for AI Recruit Tracker"
 
-# Enable UUID extension
+# Enable UUID and trigram (fuzzy matching) extensions
 psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
     CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
 EOSQL